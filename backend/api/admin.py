@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from .models import CustomUser, HennaType, Order
+from .search import search_users
 
 # ----------------------------
 # Admin User personnalisé
@@ -18,6 +19,11 @@ class CustomUserAdmin(UserAdmin):
     add_fieldsets = UserAdmin.add_fieldsets + (
         ('معلومات إضافية', {'fields': ('phone_number', 'gender', 'age', 'language_preference')}),
     )
+    
+    def get_search_results(self, request, queryset, search_term):
+        # Recherche par préfixe sur search_text (index FTS5 / trigramme)
+        # au lieu de LIKE '%...%' sur quatre colonnes
+        return search_users(queryset, search_term), False
 
 
 # ----------------------------
@@ -28,6 +34,7 @@ class HennaTypeAdmin(admin.ModelAdmin):
     list_display = ['name_ar', 'name_fr', 'price', 'is_available', 'created_at']
     list_filter = ['is_available', 'created_at']
     search_fields = ['name_ar', 'name_fr']
+    # Chaque modification passe par save() : le cache du catalogue est invalidé
     list_editable = ['is_available', 'price']
 
 
@@ -36,20 +43,20 @@ class HennaTypeAdmin(admin.ModelAdmin):
 # ----------------------------
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
-    list_display = ['id', 'client', 'henna_type', 'status', 'created_at']
+    list_display = ['id', 'client', 'henna_name', 'henna_price', 'status', 'created_at']
     list_filter = ['status', 'created_at']
     search_fields = ['client__first_name', 'client__last_name', 'client__phone_number']
     list_editable = ['status']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['henna_name', 'henna_price', 'version', 'created_at', 'updated_at']
     
     fieldsets = (
         ('معلومات الطلب', {
-            'fields': ('client', 'henna_type', 'status')
+            'fields': ('client', 'henna_type', 'henna_name', 'henna_price', 'status')
         }),
         ('التفاصيل', {
             'fields': ('notes', 'address', 'appointment_date')
         }),
         ('التواريخ', {
-            'fields': ('created_at', 'updated_at')
+            'fields': ('version', 'created_at', 'updated_at')
         }),
     )
\ No newline at end of file
@@ -0,0 +1,106 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import DailyOrderRollup, Order
+
+
+# ----------------------------
+# Analyses sur les agrégats quotidiens
+# ----------------------------
+# Lecture de DailyOrderRollup uniquement : le coût dépend du nombre de
+# jours (× statuts × types), pas du nombre de commandes. Chiffre
+# d'affaires = somme des prix figés hors Order.UNBILLED_STATUSES.
+
+class AnalyticsError(ValueError):
+    """Paramètre d'analyse invalide"""
+
+
+def parse_day_range(date_from=None, date_to=None):
+    """Bornes inclusives (AAAA-MM-JJ) ; par défaut les ANALYTICS_DEFAULT_DAYS derniers jours"""
+    days = {}
+    for name, value in (('from', date_from), ('to', date_to)):
+        try:
+            # ValueError : format valide mais date impossible (2024-02-30)
+            day = parse_date(value) if value else None
+        except ValueError:
+            day = None
+        if value and day is None:
+            raise AnalyticsError(f"{name} : date attendue (AAAA-MM-JJ)")
+        days[name] = day
+
+    end = days['to'] or timezone.localdate()
+    start = days['from'] or end - timedelta(days=getattr(settings, 'ANALYTICS_DEFAULT_DAYS', 30) - 1)
+    if start > end:
+        raise AnalyticsError("from doit précéder to")
+    if (end - start).days >= getattr(settings, 'ANALYTICS_MAX_DAYS', 1096):
+        raise AnalyticsError("plage de dates trop longue")
+    return start, end
+
+
+def rollups(start, end, status=None, henna_type=None, using=None):
+    queryset = DailyOrderRollup._default_manager.db_manager(using).filter(day__range=(start, end))
+    if status:
+        queryset = queryset.filter(status=status)
+    if henna_type:
+        queryset = queryset.filter(henna_type_id=henna_type)
+    return queryset
+
+
+def time_series(start, end, status=None, henna_type=None, using=None):
+    """Une entrée par jour de la plage (jours sans commande compris) et les totaux"""
+    rows = (
+        rollups(start, end, status, henna_type, using)
+        .values('day', 'status')
+        .annotate(orders=Sum('order_count'), total=Sum('total_price'))
+        .order_by()
+    )
+    statuses = [value for value, _ in Order.STATUS_CHOICES]
+    series = {}
+    day = start
+    while day <= end:
+        series[day] = {
+            'day': day,
+            'orders': 0,
+            'revenue': Decimal('0'),
+            'by_status': dict.fromkeys(statuses, 0),
+        }
+        day += timedelta(days=1)
+
+    for row in rows:
+        point = series[row['day']]
+        point['orders'] += row['orders']
+        point['by_status'][row['status']] += row['orders']
+        if row['status'] not in Order.UNBILLED_STATUSES:
+            point['revenue'] += row['total']
+
+    points = list(series.values())
+    totals = {
+        'orders': sum(point['orders'] for point in points),
+        'revenue': sum((point['revenue'] for point in points), Decimal('0')),
+    }
+    return points, totals
+
+
+def top_henna_types(start, end, limit=10, by='revenue', using=None):
+    """Les `limit` types de henné qui rapportent le plus (ou les plus commandés), hors annulations"""
+    rows = (
+        rollups(start, end, using=using)
+        .exclude(status__in=Order.UNBILLED_STATUSES)
+        .values('henna_type', 'henna_type__name_ar')
+        .annotate(orders=Sum('order_count'), revenue=Sum('total_price'))
+        .order_by('-' + by, 'henna_type')[:limit]
+    )
+    return [
+        {
+            'henna_type': row['henna_type'],
+            'name': row['henna_type__name_ar'],
+            'orders': row['orders'],
+            'revenue': row['revenue'],
+        }
+        for row in rows
+    ]
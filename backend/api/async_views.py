@@ -0,0 +1,134 @@
+import copy
+import functools
+
+from django.http import HttpResponse, JsonResponse
+from rest_framework.authtoken.models import Token as AuthToken
+
+from .authentication import token_cache
+from .cache import aget_catalog_entry, etag_matches
+from .metrics import serialization_timer
+from .models import DashboardStats, HennaType, Order
+from .serializers import HennaTypeSerializer, OrderSerializer
+
+
+# ========================================
+# Vues asynchrones (ASGI) des endpoints de lecture
+# ========================================
+# Mêmes réponses que les vues DRF de views.py, mais l'attente de la base
+# passe par l'ORM async : sous un serveur ASGI (uvicorn, daphne...) une
+# requête n'occupe pas de thread pendant ses requêtes SQL. Sous WSGI
+# elles restent fonctionnelles, exécutées via async_to_sync.
+
+async def aauthenticate(request):
+    """
+    Authentification Token (via token_cache) puis session.
+    Retourne (utilisateur, None) ou (None, message d'erreur).
+    """
+    parts = request.headers.get('Authorization', '').split()
+    if parts and parts[0].lower() == 'token':
+        if len(parts) != 2:
+            return None, "Invalid token header."
+        key = parts[1]
+        entry = token_cache.get(key)
+        if entry is None:
+            token = await AuthToken.objects.select_related('user').filter(key=key).afirst()
+            if token is None:
+                return None, "Invalid token."
+            if not token.user.is_active:
+                return None, "User inactive or deleted."
+            token_cache.set(key, token.user, token)
+            user = token.user
+        else:
+            user = entry[0]
+        return copy.copy(user), None
+
+    user = await request.auser()
+    if user.is_authenticated:
+        return user, None
+    return None, "Authentication credentials were not provided."
+
+
+def async_api(admin=False):
+    """Équivalent de @api_view(['GET']) + IsAuthenticated / IsAdminUser"""
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return JsonResponse(
+                    {"detail": f'Method "{request.method}" not allowed.'},
+                    status=405, headers={'Allow': 'GET'}
+                )
+            user, error = await aauthenticate(request)
+            if user is None:
+                return JsonResponse({"detail": error}, status=401, headers={'WWW-Authenticate': 'Token'})
+            if admin and not user.is_staff:
+                return JsonResponse(
+                    {"detail": "You do not have permission to perform this action."},
+                    status=403
+                )
+            request.user = user
+            return await view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def json_response(data, **kwargs):
+    with serialization_timer():
+        return JsonResponse(data, safe=False, json_dumps_params={'ensure_ascii': False}, **kwargs)
+
+
+# ----------------------------
+# Types de henné
+# ----------------------------
+@async_api()
+async def henna_types_list_api(request):
+    """Liste tous les types de henné disponibles (cache + ETag)"""
+    async def abuild():
+        serializer = HennaTypeSerializer(
+            HennaType.objects.filter(is_available=True),
+            many=True,
+            context={'request': request}
+        )
+        return await serializer.ato_representation(serializer.instance)
+
+    data, etag = await aget_catalog_entry(request, 'list', abuild)
+    if etag_matches(request, etag):
+        return HttpResponse(status=304, headers={'ETag': etag})
+    return json_response(data, headers={'ETag': etag})
+
+
+# ----------------------------
+# Commandes client
+# ----------------------------
+@async_api()
+async def my_orders_api(request):
+    """Liste des commandes de l'utilisateur connecté"""
+    queryset = OrderSerializer.setup_eager_loading(Order.objects.filter(client=request.user))
+    # Relations chargées en jointure : la sérialisation ne touche plus la base
+    orders = [order async for order in queryset]
+    return json_response(OrderSerializer(orders, many=True).data)
+
+
+@async_api()
+async def order_detail_api(request, pk):
+    """Détails d'une commande"""
+    queryset = OrderSerializer.setup_eager_loading(Order.objects.filter(pk=pk, client=request.user))
+    order = await queryset.afirst()
+    if order is None:
+        return json_response({"error": "الطلب غير موجود"}, status=404)
+    return json_response(OrderSerializer(order).data)
+
+
+# ----------------------------
+# Dashboard admin
+# ----------------------------
+@async_api(admin=True)
+async def admin_dashboard_api(request):
+    """Dashboard admin - statistiques générales (compteurs maintenus)"""
+    stats = await DashboardStats.asnapshot()
+    return json_response({
+        "total_orders": stats['total_orders'],
+        "pending_orders": stats['pending_orders'],
+        "completed_orders": stats['completed_orders'],
+        "total_clients": stats['total_clients']
+    })
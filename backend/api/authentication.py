@@ -0,0 +1,135 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+
+
+# ----------------------------
+# Cache LRU + TTL en mémoire
+# ----------------------------
+class TokenCache:
+    """
+    Cache borné (LRU) clé de token -> (utilisateur, token), avec expiration.
+
+    Propre au processus. Avec `revocations` (alias d'un cache partagé :
+    Redis, Memcached...), les invalidations y sont publiées et chaque
+    succès local y est vérifié, si bien qu'un token révoqué sur un worker
+    l'est aussitôt sur les autres. Sans alias, seul le TTL borne la durée
+    de vie d'une entrée sur les autres workers.
+    """
+
+    def __init__(self, max_size=10000, ttl=300, revocations=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.revocations = revocations
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+        if self._revoked(key, entry):
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    self._remove(key)
+                self.misses += 1
+            return None
+        with self._lock:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, user, token):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, (user, token), time.time())
+            self._keys_by_user.setdefault(user.pk, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, key):
+        with self._lock:
+            self._remove(key)
+        if self.revocations:
+            caches[self.revocations].set(f'token-revoked:{key}', True, self.ttl)
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._remove(key)
+        if self.revocations:
+            caches[self.revocations].set(f'token-user-changed:{user_id}', time.time(), self.ttl)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+    def _revoked(self, key, entry):
+        """Token supprimé, ou utilisateur modifié après la mise en cache, sur un autre worker"""
+        if not self.revocations:
+            return False
+        user_key = f'token-user-changed:{entry[1][0].pk}'
+        marks = caches[self.revocations].get_many([f'token-revoked:{key}', user_key])
+        return f'token-revoked:{key}' in marks or marks.get(user_key, 0) >= entry[2]
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        user_id = entry[1][0].pk
+        keys = self._keys_by_user.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[user_id]
+
+
+def _make_token_cache():
+    options = getattr(settings, 'TOKEN_AUTH_CACHE', {})
+    return TokenCache(
+        max_size=options.get('MAX_SIZE', 10000),
+        ttl=options.get('TTL', 300),
+        revocations=options.get('REVOCATION_CACHE_ALIAS'),
+    )
+
+
+token_cache = _make_token_cache()
+
+
+# ----------------------------
+# Authentification par token avec cache
+# ----------------------------
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication sans requête en régime établi : le couple
+    (utilisateur, token) est servi depuis `token_cache`, invalidé quand le
+    token est supprimé ou l'utilisateur modifié (voir api/signals.py).
+    """
+
+    def authenticate_credentials(self, key):
+        entry = token_cache.get(key)
+        if entry is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, user, token)
+        else:
+            user, token = entry
+        # Copie : une vue peut modifier request.user sans toucher au cache
+        return copy.copy(user), token
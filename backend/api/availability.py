@@ -0,0 +1,137 @@
+import bisect
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+
+# ----------------------------
+# Calendrier des créneaux réservés
+# ----------------------------
+# Les commandes confirmées ou en cours occupent un créneau de durée fixe
+# à partir de leur appointment_date. Le calendrier est gardé en mémoire,
+# trié par début de créneau : une recherche coûte O(log n + k) sans
+# toucher à la table des commandes. Il est mis à jour à chaque écriture
+# d'une commande (api/signals.py) et rechargé périodiquement, ce qui
+# borne l'écart entre plusieurs workers.
+
+BLOCKING_STATUSES = ('confirmed', 'in_progress')
+
+
+def slot_duration():
+    return timedelta(minutes=getattr(settings, 'APPOINTMENT_SLOT_MINUTES', 60))
+
+
+class SlotCalendar:
+    def __init__(self, duration):
+        self.duration = duration
+        self._entries = []      # [(début, order_id)] trié
+        self._by_order = {}     # order_id -> début
+        self._lock = threading.RLock()
+
+    def load(self, rows):
+        """Remplace le contenu par `rows` = [(order_id, début)]"""
+        with self._lock:
+            self._by_order = dict(rows)
+            self._entries = sorted((start, order_id) for order_id, start in self._by_order.items())
+
+    def apply(self, order_id, start):
+        """Place (ou retire si start=None) le créneau d'une commande"""
+        with self._lock:
+            previous = self._by_order.pop(order_id, None)
+            if previous is not None:
+                index = bisect.bisect_left(self._entries, (previous, order_id))
+                if index < len(self._entries) and self._entries[index] == (previous, order_id):
+                    del self._entries[index]
+            if start is not None:
+                self._by_order[order_id] = start
+                bisect.insort(self._entries, (start, order_id))
+
+    def busy(self, start, end):
+        """Créneaux [début, fin) qui chevauchent [start, end)"""
+        with self._lock:
+            # Durée fixe : seuls les débuts dans ]start - durée, end[ chevauchent
+            low = bisect.bisect_right(self._entries, (start - self.duration, float('inf')))
+            high = bisect.bisect_left(self._entries, (end, -1))
+            return [
+                (slot_start, slot_start + self.duration, order_id)
+                for slot_start, order_id in self._entries[low:high]
+            ]
+
+    def is_free(self, start, exclude_order_id=None):
+        return not any(
+            order_id != exclude_order_id
+            for _, _, order_id in self.busy(start, start + self.duration)
+        )
+
+    def free_intervals(self, start, end):
+        """Intervalles libres [début, fin) entre start et end"""
+        free = []
+        cursor = start
+        for slot_start, slot_end, _ in self.busy(start, end):
+            if slot_start > cursor:
+                free.append((cursor, slot_start))
+            cursor = max(cursor, slot_end)
+        if cursor < end:
+            free.append((cursor, end))
+        return free
+
+    def free_slots(self, start, end):
+        """Débuts de créneaux libres, alignés sur la durée d'un créneau"""
+        step = self.duration
+        slots = []
+        for free_start, free_end in self.free_intervals(start, end):
+            # Alignement sur la grille (minuit UTC + k * durée)
+            midnight = free_start.replace(hour=0, minute=0, second=0, microsecond=0)
+            offset = (free_start - midnight) % step
+            slot = free_start if not offset else free_start + (step - offset)
+            while slot + step <= free_end:
+                slots.append(slot)
+                slot += step
+        return slots
+
+
+_calendar = None
+_loaded_at = 0.0
+_load_lock = threading.Lock()
+
+
+def load_booked_slots(calendar):
+    """Charge les créneaux à venir (index partiel order_booked_slot_idx)"""
+    from .models import Order
+
+    since = timezone.now() - calendar.duration
+    rows = Order.objects.filter(
+        status__in=BLOCKING_STATUSES,
+        appointment_date__gte=since,
+    ).values_list('id', 'appointment_date')
+    calendar.load(rows)
+
+
+def get_calendar():
+    global _calendar, _loaded_at
+    refresh = getattr(settings, 'AVAILABILITY_REFRESH_SECONDS', 300)
+    if _calendar is None or time.monotonic() - _loaded_at > refresh:
+        with _load_lock:
+            if _calendar is None or time.monotonic() - _loaded_at > refresh:
+                calendar = SlotCalendar(slot_duration())
+                load_booked_slots(calendar)
+                _calendar, _loaded_at = calendar, time.monotonic()
+    return _calendar
+
+
+def reset_calendar():
+    """Force un rechargement complet au prochain accès"""
+    global _calendar
+    with _load_lock:
+        _calendar = None
+
+
+def record_order(order_id, status, appointment_date):
+    """Répercute l'état d'une commande dans le calendrier chargé"""
+    if _calendar is None:
+        return  # sera lu au premier chargement
+    blocking = status in BLOCKING_STATUSES and appointment_date is not None
+    _calendar.apply(order_id, appointment_date if blocking else None)
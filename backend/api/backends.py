@@ -1,24 +1,39 @@
 from django.contrib.auth.backends import ModelBackend
-from .models import CustomUser
+from django.db.models import Q
+from .models import CustomUser, normalize_phone_number
 
 class PhoneBackend(ModelBackend):
     """
     Backend d'authentification personnalisé qui permet de se connecter
-    avec username OU phone_number
+    avec username OU phone_number, en une seule requête
     """
     def authenticate(self, request, username=None, password=None, **kwargs):
-        try:
-            # Essayer d'abord avec username
-            user = CustomUser.objects.get(username=username)
-        except CustomUser.DoesNotExist:
-            try:
-                # Essayer avec phone_number
-                user = CustomUser.objects.get(phone_number=username)
-            except CustomUser.DoesNotExist:
-                return None
+        if username is None:
+            username = kwargs.get(CustomUser.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
         
-        # Vérifier le mot de passe
+        query = Q(username=username)
+        phone_number = normalize_phone_number(username)
+        if phone_number:
+            query |= Q(phone_number=phone_number)
+        
+        users = list(CustomUser._default_manager.filter(query)[:2])
+        # Priorité au username si l'identifiant correspond à deux comptes
+        user = next(
+            (u for u in users if u.username == username),
+            users[0] if users else None
+        )
+        
+        if user is None:
+            # Hachage factice : un identifiant inconnu coûte autant
+            # qu'un mauvais mot de passe (pas d'énumération par le temps)
+            CustomUser().set_password(password)
+            return None
+        
+        # Vérifier le mot de passe ; un hachage dont l'algorithme ou le
+        # coût ne suit plus PASSWORD_HASHING est réécrit au passage
         if user.check_password(password) and self.user_can_authenticate(user):
             return user
         
-        return None
\ No newline at end of file
+        return None
@@ -0,0 +1,116 @@
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .routers import primary_reads
+
+
+# ----------------------------
+# Cache du catalogue de henné
+# ----------------------------
+# Les entrées sont indexées par version du catalogue : modifier ou
+# supprimer un HennaType incrémente la version, ce qui rend toutes les
+# anciennes entrées inaccessibles (elles expirent ensuite d'elles-mêmes).
+# Les entrées se construisent sur le primaire : lue sur un réplica en
+# retard, une donnée périmée resterait en cache sous la nouvelle version.
+
+CATALOG_VERSION_KEY = 'catalog:version'
+
+
+def get_catalog_cache():
+    return caches[getattr(settings, 'CATALOG_CACHE_ALIAS', 'default')]
+
+
+def get_catalog_version():
+    cache = get_catalog_cache()
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # Version perdue (éviction, redémarrage) : repartir d'une valeur neuve
+        cache.add(CATALOG_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    cache = get_catalog_cache()
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        cache.set(CATALOG_VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def get_request_language(request):
+    """Langue de l'utilisateur connecté ('ar' par défaut)"""
+    lang = getattr(request.user, 'language_preference', None)
+    return lang if lang in ('ar', 'fr') else 'ar'
+
+
+def make_etag(data):
+    """ETag fort : empreinte du contenu sérialisé"""
+    payload = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True, ensure_ascii=False)
+    return '"%s"' % hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+def etag_matches(request, etag):
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    candidates = [value.strip() for value in header.split(',')]
+    return '*' in candidates or etag in candidates
+
+
+def catalog_key(request, name, version):
+    # Les URLs d'images sont absolues : l'hôte fait partie de la clé
+    return 'catalog:%s:%s:%s:%s' % (
+        version,
+        get_request_language(request),
+        request.build_absolute_uri('/'),
+        name,
+    )
+
+
+def get_catalog_entry(request, name, build):
+    """
+    Retourne (data, etag) pour une vue du catalogue, depuis le cache ou
+    en appelant `build()`. Si `build()` retourne None, rien n'est mis en
+    cache (ex. 404).
+    """
+    cache = get_catalog_cache()
+    key = catalog_key(request, name, get_catalog_version())
+    entry = cache.get(key)
+    if entry is None:
+        with primary_reads():
+            data = build()
+        if data is None:
+            return None, None
+        entry = (data, make_etag(data))
+        cache.set(key, entry, timeout=getattr(settings, 'CATALOG_CACHE_TIMEOUT', 3600))
+    return entry
+
+
+async def aget_catalog_version():
+    cache = get_catalog_cache()
+    version = await cache.aget(CATALOG_VERSION_KEY)
+    if version is None:
+        await cache.aadd(CATALOG_VERSION_KEY, time.time_ns(), timeout=None)
+        version = await cache.aget(CATALOG_VERSION_KEY)
+    return version
+
+
+async def aget_catalog_entry(request, name, abuild):
+    """Variante asynchrone de get_catalog_entry (`abuild` est une coroutine)"""
+    cache = get_catalog_cache()
+    key = catalog_key(request, name, await aget_catalog_version())
+    entry = await cache.aget(key)
+    if entry is None:
+        with primary_reads():
+            data = await abuild()
+        if data is None:
+            return None, None
+        entry = (data, make_etag(data))
+        await cache.aset(key, entry, timeout=getattr(settings, 'CATALOG_CACHE_TIMEOUT', 3600))
+    return entry
@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+
+# ----------------------------
+# Vérifications de configuration
+# ----------------------------
+# Caches propres à chaque processus : un marqueur posé par un worker y est
+# invisible pour les autres
+PROCESS_LOCAL_CACHES = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+@register(Tags.caches)
+def check_sticky_cache(app_configs, **kwargs):
+    """
+    Avec des réplicas, la fenêtre collante (api/routers.py) exige un cache
+    partagé : erreur en PostgreSQL (plusieurs workers), avertissement avec
+    un réplica SQLite local.
+    """
+    replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+    if not replicas:
+        return []
+    alias = getattr(settings, 'DB_STICKY_CACHE_ALIAS', 'default')
+    backend = settings.CACHES.get(alias, {}).get('BACKEND')
+    if backend is not None and backend not in PROCESS_LOCAL_CACHES:
+        return []
+    postgres = any(
+        'postgresql' in settings.DATABASES[replica]['ENGINE'] for replica in replicas
+    )
+    level = Error if postgres else Warning
+    return [level(
+        f"DB_STICKY_CACHE_ALIAS ({alias!r}) ne désigne pas un cache partagé entre workers",
+        hint=(
+            "Définir HAN_REDIS_URL (alias 'shared') ou désigner un cache "
+            "Redis/Memcached via HAN_DB_STICKY_CACHE_ALIAS : sinon un client "
+            "peut relire un réplica en retard juste après avoir écrit."
+        ),
+        obj='settings.DB_STICKY_CACHE_ALIAS',
+        id='api.E001' if postgres else 'api.W001',
+    )]
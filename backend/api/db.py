@@ -0,0 +1,24 @@
+from django.conf import settings
+
+
+# ----------------------------
+# Profil SQLite (production)
+# ----------------------------
+# Appliqué à chaque nouvelle connexion (signal connection_created, voir
+# api/signals.py). journal_mode=WAL est persistant dans le fichier ; les
+# autres PRAGMAs valent pour la connexion. Avec CONN_MAX_AGE > 0 le coût
+# n'est payé qu'à l'ouverture d'une connexion réutilisée ensuite.
+
+def sqlite_pragmas():
+    return getattr(settings, 'SQLITE_PRAGMAS', {})
+
+
+def configure_sqlite(connection):
+    """Exécute les PRAGMAs du profil sur une connexion SQLite"""
+    if connection.vendor != 'sqlite':
+        return
+    # Curseur brut : hors execute_wrapper, ces requêtes ne comptent pas
+    # dans les budgets de la requête HTTP qui ouvre la connexion
+    raw = connection.connection
+    for name, value in sqlite_pragmas().items():
+        raw.execute(f'PRAGMA {name} = {value}')
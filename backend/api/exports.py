@@ -0,0 +1,140 @@
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import CustomUser, Order
+
+
+# ----------------------------
+# Export en flux (CSV / JSONL)
+# ----------------------------
+# Les lignes sont lues par paquets avec .iterator(chunk_size=...) et
+# écrites au fil de l'eau : la mémoire reste constante quel que soit le
+# nombre de lignes.
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+# (nom de colonne, lookup values_list)
+ORDER_COLUMNS = [
+    ('id', 'id'),
+    ('client_id', 'client_id'),
+    ('client_first_name', 'client__first_name'),
+    ('client_last_name', 'client__last_name'),
+    ('client_phone', 'client__phone_number'),
+    ('henna_type_id', 'henna_type_id'),
+    ('henna_name', 'henna_name'),
+    ('henna_price', 'henna_price'),
+    ('status', 'status'),
+    ('notes', 'notes'),
+    ('address', 'address'),
+    ('appointment_date', 'appointment_date'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+]
+
+CLIENT_COLUMNS = [
+    ('id', 'id'),
+    ('username', 'username'),
+    ('first_name', 'first_name'),
+    ('last_name', 'last_name'),
+    ('phone_number', 'phone_number'),
+    ('gender', 'gender'),
+    ('age', 'age'),
+    ('language_preference', 'language_preference'),
+    ('created_at', 'created_at'),
+]
+
+
+class ExportError(ValueError):
+    """Paramètre de filtre invalide"""
+
+
+def _day_bounds(value, name):
+    try:
+        # ValueError : format valide mais date impossible (2024-02-30)
+        day = parse_date(value) if value else None
+    except ValueError:
+        day = None
+    if value and day is None:
+        raise ExportError(f"{name} : date attendue (AAAA-MM-JJ)")
+    if day is None:
+        return None
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def filter_by_created_at(queryset, date_from=None, date_to=None):
+    """Bornes inclusives en jours ; comparaison directe sur created_at (indexable)"""
+    start = _day_bounds(date_from, 'from')
+    end = _day_bounds(date_to, 'to')
+    if start:
+        queryset = queryset.filter(created_at__gte=start)
+    if end:
+        queryset = queryset.filter(created_at__lt=end + timedelta(days=1))
+    return queryset
+
+
+def export_orders_queryset(status=None, date_from=None, date_to=None):
+    queryset = Order.objects.order_by('-created_at', '-id')
+    if status:
+        if status not in dict(Order.STATUS_CHOICES):
+            raise ExportError("status invalide")
+        queryset = queryset.filter(status=status)
+    return filter_by_created_at(queryset, date_from, date_to), ORDER_COLUMNS
+
+
+def export_clients_queryset(date_from=None, date_to=None):
+    queryset = CustomUser.objects.filter(is_staff=False).order_by('id')
+    return filter_by_created_at(queryset, date_from, date_to), CLIENT_COLUMNS
+
+
+class _Echo:
+    """Pseudo-fichier : csv.writer retourne la ligne au lieu de la bufferiser"""
+
+    def write(self, value):
+        return value
+
+
+def iter_rows(queryset, columns):
+    chunk_size = getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+    return queryset.values_list(*[lookup for _, lookup in columns]).iterator(chunk_size=chunk_size)
+
+
+# Débuts de cellule interprétés comme formule par les tableurs
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def csv_cell(value):
+    """Valeur CSV ; les textes pris pour une formule sont préfixés d'une apostrophe"""
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def iter_csv(queryset, columns):
+    writer = csv.writer(_Echo())
+    yield '\ufeff'  # BOM : Excel lit l'arabe correctement
+    yield writer.writerow([name for name, _ in columns])
+    for row in iter_rows(queryset, columns):
+        yield writer.writerow(csv_cell(value) for value in row)
+
+
+def iter_jsonl(queryset, columns):
+    names = [name for name, _ in columns]
+    for row in iter_rows(queryset, columns):
+        yield json.dumps(dict(zip(names, row)), cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def iter_export(queryset, columns, export_format):
+    if export_format == 'jsonl':
+        return iter_jsonl(queryset, columns)
+    return iter_csv(queryset, columns)
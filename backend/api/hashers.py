@@ -0,0 +1,61 @@
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher, PBKDF2PasswordHasher, ScryptPasswordHasher,
+)
+
+
+# ----------------------------
+# Hachage des mots de passe piloté par les settings
+# ----------------------------
+# Les paramètres sont lus dans settings.PASSWORD_HASHING à chaque appel.
+# Quand ils changent, must_update() devient vrai pour les anciens hachages
+# et check_password() les réécrit à la connexion suivante (PhoneBackend).
+
+def get_policy(hasher):
+    return getattr(settings, 'PASSWORD_HASHING', {}).get(hasher, {})
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return get_policy('PBKDF2').get('ITERATIONS', PBKDF2PasswordHasher.iterations)
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    @property
+    def time_cost(self):
+        return get_policy('ARGON2').get('TIME_COST', Argon2PasswordHasher.time_cost)
+
+    @property
+    def memory_cost(self):
+        return get_policy('ARGON2').get('MEMORY_COST', Argon2PasswordHasher.memory_cost)
+
+    @property
+    def parallelism(self):
+        return get_policy('ARGON2').get('PARALLELISM', Argon2PasswordHasher.parallelism)
+
+
+class TunedScryptPasswordHasher(ScryptPasswordHasher):
+    @property
+    def work_factor(self):
+        return get_policy('SCRYPT').get('WORK_FACTOR', ScryptPasswordHasher.work_factor)
+
+    @property
+    def block_size(self):
+        return get_policy('SCRYPT').get('BLOCK_SIZE', ScryptPasswordHasher.block_size)
+
+    @property
+    def parallelism(self):
+        return get_policy('SCRYPT').get('PARALLELISM', ScryptPasswordHasher.parallelism)
+
+    @property
+    def maxmem(self):
+        # Mémoire requise par scrypt : 128 * N * r * p, avec marge
+        return 256 * self.work_factor * self.block_size * self.parallelism
+
+
+TUNED_HASHERS = {
+    'pbkdf2': TunedPBKDF2PasswordHasher,
+    'argon2': TunedArgon2PasswordHasher,
+    'scrypt': TunedScryptPasswordHasher,
+}
@@ -0,0 +1,56 @@
+import hashlib
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+
+# ----------------------------
+# Requêtes idempotentes (en-tête Idempotency-Key)
+# ----------------------------
+def request_fingerprint(data):
+    payload = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def run_idempotent(request, key, handler):
+    """
+    Exécute `handler()` (-> Response) une seule fois par (utilisateur, clé).
+    Une nouvelle tentative avec la même clé rejoue la réponse enregistrée.
+    La clé et les écritures du handler sont dans la même transaction :
+    si le handler échoue, la clé n'est pas consommée.
+    """
+    fingerprint = request_fingerprint(request.data)
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                record = IdempotencyKey.objects.create(
+                    user=request.user, key=key, request_hash=fingerprint
+                )
+        except IntegrityError:
+            record = IdempotencyKey.objects.get(user=request.user, key=key)
+            if record.request_hash != fingerprint:
+                return Response(
+                    {"error": "Idempotency-Key déjà utilisée pour une autre requête"},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                )
+            if record.status_code is None:
+                return Response(
+                    {"error": "Requête déjà en cours de traitement"},
+                    status=status.HTTP_409_CONFLICT
+                )
+            return Response(
+                record.response_body,
+                status=record.status_code,
+                headers={'Idempotent-Replayed': 'true'}
+            )
+
+        response = handler()
+        record.status_code = response.status_code
+        record.response_body = response.data
+        record.save(update_fields=['status_code', 'response_body'])
+        return response
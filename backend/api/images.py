@@ -0,0 +1,122 @@
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+# ----------------------------
+# Variantes responsives de HennaType.image
+# ----------------------------
+# Chaque image est déclinée en plusieurs largeurs et formats. Le chemin
+# d'une variante dépend du contenu de l'original : une image identique
+# réutilise les mêmes fichiers et les URLs peuvent être mises en cache
+# indéfiniment côté client.
+
+DEFAULT_WIDTHS = (320, 640, 1080)
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'IMAGE_VARIANT_WORKERS', 2),
+            thread_name_prefix='image-variants',
+        )
+    return _executor
+
+
+def variant_widths():
+    return tuple(getattr(settings, 'IMAGE_VARIANT_WIDTHS', DEFAULT_WIDTHS))
+
+
+def variant_path(source_name, digest, width, ext):
+    directory = source_name.rsplit('/', 1)[0] if '/' in source_name else ''
+    prefix = f'{directory}/' if directory else ''
+    return f'{prefix}variants/{digest[:16]}/{width}w.{ext}'
+
+
+def build_variants(field_file):
+    """
+    Génère les variantes d'une image et retourne leur carte
+    {format: {largeur: chemin}}. Les fichiers déjà présents sont réutilisés.
+    """
+    from PIL import Image
+
+    storage = field_file.storage
+    with storage.open(field_file.name, 'rb') as source:
+        content = source.read()
+    digest = hashlib.sha256(content).hexdigest()
+
+    original = Image.open(BytesIO(content))
+    original.load()
+    if original.mode not in ('RGB', 'RGBA'):
+        original = original.convert('RGBA' if 'A' in original.getbands() else 'RGB')
+
+    variants = {ext: {} for ext in FORMATS}
+    for width in variant_widths():
+        # Pas d'agrandissement au-delà de l'original
+        width = min(width, original.width)
+        key = str(width)
+        if key in variants['jpeg']:
+            continue
+        height = max(1, round(original.height * width / original.width))
+        resized = original.resize((width, height), Image.LANCZOS)
+
+        for ext, (pil_format, options) in FORMATS.items():
+            path = variant_path(field_file.name, digest, width, ext)
+            if not storage.exists(path):
+                image = resized
+                if pil_format == 'JPEG' and image.mode != 'RGB':
+                    image = image.convert('RGB')
+                buffer = BytesIO()
+                image.save(buffer, pil_format, **options)
+                storage.save(path, ContentFile(buffer.getvalue()))
+            variants[ext][key] = path
+    return variants
+
+
+def generate_variants(henna_type_id):
+    """Calcule et enregistre les variantes d'un HennaType (sans re-déclencher save())"""
+    from .cache import bump_catalog_version
+    from .models import HennaType
+
+    henna_type = HennaType.objects.filter(pk=henna_type_id).only('image').first()
+    if henna_type is None or not henna_type.image:
+        return None
+    variants = build_variants(henna_type.image)
+    # Ne pas écraser si l'image a changé entre-temps
+    updated = HennaType.objects.filter(
+        pk=henna_type_id, image=henna_type.image.name
+    ).update(image_variants=variants)
+    if updated:
+        bump_catalog_version()
+    return variants
+
+
+def _run_in_background(henna_type_id):
+    try:
+        generate_variants(henna_type_id)
+    except Exception:
+        logger.exception("Échec de génération des variantes pour HennaType %s", henna_type_id)
+    finally:
+        # Connexions propres au thread du pool
+        connections.close_all()
+
+
+def schedule_variants(henna_type_id):
+    """Planifie la génération en arrière-plan (le save de l'admin n'attend pas)"""
+    if getattr(settings, 'IMAGE_VARIANTS_ASYNC', True):
+        return get_executor().submit(_run_in_background, henna_type_id)
+    return generate_variants(henna_type_id)
@@ -0,0 +1,55 @@
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+# ----------------------------
+# Outils de mesure de charge
+# ----------------------------
+def percentile(sorted_values, p):
+    """Percentile p (0-100) par interpolation linéaire sur une liste triée"""
+    if not sorted_values:
+        return None
+    rank = (len(sorted_values) - 1) * p / 100
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def summarize(latencies, elapsed, errors=0):
+    """Latences en secondes -> statistiques en millisecondes"""
+    values = sorted(latencies)
+    return {
+        'requests': len(values),
+        'errors': errors,
+        'throughput_rps': round(len(values) / elapsed, 1) if elapsed else None,
+        'p50_ms': round(percentile(values, 50) * 1000, 2) if values else None,
+        'p95_ms': round(percentile(values, 95) * 1000, 2) if values else None,
+        'p99_ms': round(percentile(values, 99) * 1000, 2) if values else None,
+    }
+
+
+def http_get(url, headers, timeout=30):
+    """GET -> (latence en secondes, code HTTP ou None si erreur réseau)"""
+    request = urllib.request.Request(url, headers=headers)
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            code = response.status
+    except urllib.error.HTTPError as e:
+        code = e.code
+    except OSError:
+        code = None
+    return time.perf_counter() - start, code
+
+
+def run_concurrent(urls, headers, concurrency):
+    """Envoie toutes les `urls` avec `concurrency` requêtes en vol"""
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        start = time.perf_counter()
+        results = list(pool.map(lambda url: http_get(url, headers), urls))
+        elapsed = time.perf_counter() - start
+    ok = [latency for latency, code in results if code is not None and code < 400]
+    return summarize(ok, elapsed, errors=len(results) - len(ok))
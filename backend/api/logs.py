@@ -0,0 +1,146 @@
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+logger = logging.getLogger('api')
+
+
+# ----------------------------
+# Masquage des champs sensibles
+# ----------------------------
+SENSITIVE_MARKERS = ('password', 'token', 'secret', 'authorization', 'cookie', 'csrf', 'session')
+REDACTED = '[redacted]'
+
+
+def is_sensitive(key):
+    key = str(key).lower()
+    return any(marker in key for marker in SENSITIVE_MARKERS)
+
+
+def redact(value):
+    """Copie de `value` où les valeurs des clés sensibles sont masquées"""
+    if isinstance(value, dict) or hasattr(value, 'items'):
+        return {
+            key: REDACTED if is_sensitive(key) else redact(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    return value
+
+
+# ----------------------------
+# Format JSON
+# ----------------------------
+# Attributs standard d'un LogRecord : tout le reste vient de `extra=`
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+
+
+class JsonFormatter(logging.Formatter):
+    """Un objet JSON par ligne ; les champs `extra` sont ajoutés (masqués)"""
+
+    def format(self, record):
+        payload = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                payload[key] = REDACTED if is_sensitive(key) else redact(value)
+        if record.exc_info:
+            payload['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload['exc'] = record.exc_text
+        return json.dumps(payload, cls=DjangoJSONEncoder, ensure_ascii=False, default=str)
+
+
+# ----------------------------
+# Écriture non bloquante
+# ----------------------------
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # À l'arrêt on peut attendre une place : le thread vide la file
+        self.queue.put(self._sentinel)
+
+    def stop(self):
+        if self._thread is not None:
+            super().stop()
+
+
+class QueueLogHandler(logging.handlers.QueueHandler):
+    """
+    Le thread de la requête ne fait que déposer l'enregistrement dans une
+    file bornée ; un QueueListener le formate (JSON) et l'écrit. File
+    pleine : l'enregistrement est abandonné et compté dans `dropped`
+    plutôt que de bloquer la requête.
+    """
+
+    def __init__(self, stream=None, max_size=10000):
+        super().__init__(queue.Queue(maxsize=max_size))
+        self.dropped = 0
+        target = logging.StreamHandler(stream or sys.stdout)
+        target.setFormatter(JsonFormatter())
+        self.listener = _Listener(self.queue, target, respect_handler_level=True)
+        self.listener.start()
+        atexit.register(self.listener.stop)
+
+    def prepare(self, record):
+        # Message résolu ici (les arguments peuvent changer ensuite), mais
+        # la mise en forme JSON et l'écriture restent au listener
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        self.listener.stop()
+        super().close()
+
+
+# ----------------------------
+# Échantillonnage par endpoint
+# ----------------------------
+def sample_rate(endpoint):
+    rates = getattr(settings, 'LOG_SAMPLING', {})
+    return rates.get(endpoint, rates.get('default', 1.0))
+
+
+def should_log(endpoint, level=logging.INFO):
+    """Les avertissements et erreurs sont toujours gardés ; le reste est échantillonné"""
+    if level >= logging.WARNING:
+        return True
+    rate = sample_rate(endpoint)
+    return rate >= 1.0 or random.random() < rate
+
+
+def endpoint_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None else None
+
+
+def log_event(request, event, level=logging.INFO, exc_info=False, **fields):
+    """Journalise un événement métier d'une vue, échantillonné selon son endpoint"""
+    endpoint = endpoint_name(request)
+    if not logger.isEnabledFor(level) or not should_log(endpoint, level):
+        return
+    logger.log(level, event, exc_info=exc_info, extra={'event': event, 'endpoint': endpoint, **fields})
@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from api.models import DailyOrderRollup
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcule les agrégats quotidiens des commandes à partir de la table "
+        "des commandes : tous les jours, ou la plage --from/--to (corrige la dérive)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', help="AAAA-MM-JJ (inclus)")
+        parser.add_argument('--to', dest='date_to', help="AAAA-MM-JJ (inclus)")
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        days = None
+        if options['date_from'] or options['date_to']:
+            try:
+                start = parse_date(options['date_from'] or '')
+                end = parse_date(options['date_to'] or '')
+            except ValueError:
+                start = end = None
+            if start is None or end is None or start > end:
+                raise CommandError("--from et --to : deux dates AAAA-MM-JJ, from <= to")
+            days = [start + timedelta(days=n) for n in range((end - start).days + 1)]
+
+        created = DailyOrderRollup.rebuild_days(days, using=options['database'])
+        self.stdout.write(self.style.SUCCESS(f"{created} ligne(s) d'agrégats reconstruite(s)"))
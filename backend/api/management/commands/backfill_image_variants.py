@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from api.images import generate_variants
+from api.models import HennaType
+
+
+class Command(BaseCommand):
+    help = "Génère les variantes d'images manquantes des types de henné existants"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help="Régénère aussi les types qui ont déjà des variantes",
+        )
+
+    def handle(self, *args, **options):
+        queryset = HennaType.objects.exclude(image='')
+        if not options['force']:
+            queryset = queryset.filter(image_variants={})
+
+        done = failed = 0
+        for pk in queryset.values_list('pk', flat=True).iterator():
+            try:
+                generate_variants(pk)
+                done += 1
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"HennaType {pk}: {e}")
+        self.stdout.write(self.style.SUCCESS(f"{done} type(s) traité(s), {failed} échec(s)"))
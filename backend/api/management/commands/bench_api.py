@@ -0,0 +1,324 @@
+import json
+import platform
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import get_resolver
+from django.utils import timezone
+from rest_framework.authtoken.models import Token as AuthToken
+
+from api.authentication import token_cache
+from api.cache import get_catalog_cache
+from api.loadtest import summarize
+from api.models import ClientSummary, CustomUser, DailyOrderRollup, DashboardStats, HennaType, Order
+from api.search import build_search_text
+
+PASSWORD = 'bench-secret-123'
+
+
+# ----------------------------
+# Scénarios par route
+# ----------------------------
+class Route:
+    """
+    Requête de benchmark pour un nom d'URL de api/urls.py.
+    `path` et `data` peuvent être des fonctions de l'itération ;
+    `user` : None (anonyme), 'client', 'admin' ou 'fresh' (utilisateur
+    et token neufs à chaque itération, pour les routes qui les consomment).
+    """
+
+    def __init__(self, method, path, user='client', data=None):
+        self.method = method
+        self.path = path
+        self.user = user
+        self.data = data
+
+    def resolve(self, value, iteration):
+        return value(iteration) if callable(value) else value
+
+
+def build_routes(bench):
+    client, admin = bench.client_user, bench.admin
+    order_id = bench.client_order_id
+    henna_id = bench.henna_ids[0]
+    day = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=3)
+    # Le mot de passe « change » vers lui-même : la route reste rejouable
+    same_password = {'old_password': PASSWORD, 'new_password': PASSWORD}
+
+    return {
+        'hello_api': Route('get', '/api/hello/', user=None),
+        'register_api': Route('post', '/api/register/', user=None, data=lambda i: {
+            'username': f'bench_new_{bench.run_id}_{i}', 'password': PASSWORD,
+            'first_name': 'Bench', 'last_name': 'User',
+            'phone_number': f'+2229{bench.run_id % 1000:03d}{i:05d}',
+            'gender': 'F', 'age': 25,
+        }),
+        'login_api': Route('post', '/api/login/', user=None, data={
+            'username': client.username, 'password': PASSWORD,
+        }),
+        'logout_api': Route('post', '/api/logout/', user='fresh'),
+        'profile_api': Route('get', '/api/profile/'),
+        'change_password_api': Route('post', '/api/profile/change-password/', user='fresh', data=same_password),
+        'change_language_api': Route('post', '/api/profile/change-language/', data={'language': 'ar'}),
+        'henna_types_list': Route('get', '/api/henna-types/'),
+        'henna_type_detail': Route('get', f'/api/henna-types/{henna_id}/'),
+        'create_order': Route('post', '/api/orders/create/', data={'henna_type': henna_id, 'notes': 'bench'}),
+        'bulk_create_orders': Route('post', '/api/orders/bulk-create/', data={
+            'orders': [{'henna_type': henna_id}] * 10,
+        }),
+        'my_orders': Route('get', '/api/orders/my-orders/'),
+        'order_detail': Route('get', f'/api/orders/{order_id}/'),
+        'availability': Route('get', '/api/appointments/availability/', data={
+            'start': day.isoformat().replace('+00:00', 'Z'),
+            'end': (day + timedelta(days=1)).isoformat().replace('+00:00', 'Z'),
+        }),
+        'admin_dashboard': Route('get', '/api/admin/dashboard/', user='admin'),
+        'admin_orders_list': Route('get', '/api/admin/orders/', user='admin'),
+        'admin_order_detail': Route('get', f'/api/admin/orders/{order_id}/', user='admin'),
+        'admin_orders_batch_status': Route('post', '/api/admin/orders/batch-status/', user='admin', data={
+            'status': 'cancelled', 'ids': bench.batch_order_ids,
+        }),
+        'admin_clients_list': Route('get', '/api/admin/clients/?q=client+1&sort=-lifetime_spend', user='admin'),
+        'admin_export_orders': Route('get', '/api/admin/export/orders/', user='admin', data={'status': 'completed'}),
+        'admin_export_clients': Route('get', '/api/admin/export/clients/', user='admin'),
+        'admin_analytics_timeseries': Route('get', '/api/admin/analytics/timeseries/', user='admin'),
+        'admin_analytics_top_henna_types': Route('get', '/api/admin/analytics/top-henna-types/', user='admin'),
+        'admin_metrics': Route('get', '/api/admin/metrics/', user='admin'),
+        'async_henna_types_list': Route('get', '/api/async/henna-types/'),
+        'async_my_orders': Route('get', '/api/async/orders/my-orders/'),
+        'async_order_detail': Route('get', f'/api/async/orders/{order_id}/'),
+        'async_admin_dashboard': Route('get', '/api/async/admin/dashboard/', user='admin'),
+    }
+
+
+def api_url_names():
+    """Noms des routes de api/urls.py"""
+    resolver = get_resolver('api.urls')
+    return [pattern.name for pattern in resolver.url_patterns if pattern.name]
+
+
+# ----------------------------
+# Commande
+# ----------------------------
+class Command(BaseCommand):
+    help = (
+        "Suite de benchmark de l'API : crée une base de test, la remplit "
+        "(volumes configurables), appelle chaque route de api/urls.py via le "
+        "client de test et rapporte p50/p95/p99, débit et requêtes SQL par appel. "
+        "--compare signale les régressions par rapport à un JSON précédent."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--henna-types', type=int, default=50)
+        parser.add_argument('--orders', type=int, default=20000)
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--routes', nargs='+', help="sous-ensemble de noms de routes")
+        parser.add_argument('--output', help="fichier de résultats JSON")
+        parser.add_argument('--compare', help="JSON de référence")
+        parser.add_argument('--threshold', type=float, default=20.0,
+                            help="régression si p95 augmente de plus de N %% (défaut 20)")
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self.seed(options)
+            results = self.run_routes(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            'meta': {
+                'timestamp': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'volumes': {
+                    'users': options['users'],
+                    'henna_types': options['henna_types'],
+                    'orders': options['orders'],
+                },
+                'iterations': options['iterations'],
+            },
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(f"Résultats écrits dans {options['output']}")
+
+        if options['compare']:
+            self.compare(report, options['compare'], options['threshold'])
+
+    # ----------------------------
+    # Données
+    # ----------------------------
+    def seed(self, options):
+        rng = random.Random(options['seed'])
+        self.run_id = rng.randrange(10 ** 6)
+        password = make_password(PASSWORD)
+        token_cache.clear()
+        get_catalog_cache().clear()
+
+        users = [
+            CustomUser(
+                username=f'bench_{i}', password=password,
+                first_name=f'Client {i}', last_name='Bench',
+                phone_number=f'+2221{i:08d}', gender=rng.choice('MF'),
+                age=rng.randint(18, 60), language_preference=rng.choice(['ar', 'fr']),
+            )
+            for i in range(max(options['users'], 1))
+        ]
+        # bulk_create ne passe pas par save() : search_text calculé ici
+        for user in users:
+            user.search_text = build_search_text(user)
+        users = CustomUser.objects.bulk_create(users, batch_size=1000)
+        self.client_user = users[0]
+        self.admin = CustomUser.objects.create_user(
+            username='bench_admin', password=PASSWORD, phone_number='+22200000099',
+            gender='M', age=30, is_staff=True,
+        )
+
+        henna_types = HennaType.objects.bulk_create([
+            HennaType(
+                name_ar=f'حناء {i}', name_fr=f'Henné {i}',
+                description_ar='وصف', description_fr='Description',
+                image=f'henna_types/bench_{i}.jpg',
+                price=Decimal(1000 + 50 * i),
+            )
+            for i in range(max(options['henna_types'], 1))
+        ], batch_size=1000)
+        self.henna_ids = [henna.pk for henna in henna_types]
+
+        statuses = [value for value, _ in Order.STATUS_CHOICES]
+        orders = []
+        for i in range(max(options['orders'], 1)):
+            henna_type = rng.choice(henna_types)
+            orders.append(Order(
+                client=users[i % len(users)] if i % 10 else self.client_user,
+                henna_type=henna_type,
+                henna_name=henna_type.name_ar,
+                henna_price=henna_type.price,
+                status=rng.choice(statuses),
+                notes='bench',
+            ))
+        Order.objects.bulk_create(orders, batch_size=2000)
+        self.client_order_id = Order.objects.filter(client=self.client_user).values_list('pk', flat=True)[0]
+        self.batch_order_ids = list(Order.objects.exclude(client=self.client_user).values_list('pk', flat=True)[:50])
+        DashboardStats.rebuild()
+        ClientSummary.rebuild()
+        DailyOrderRollup.rebuild_days()
+
+        self.tokens = {
+            'client': AuthToken.objects.create(user=self.client_user).key,
+            'admin': AuthToken.objects.create(user=self.admin).key,
+        }
+        self.fresh_count = 0
+
+    def fresh_token(self):
+        self.fresh_count += 1
+        user = CustomUser.objects.create_user(
+            username=f'bench_fresh_{self.fresh_count}', password=PASSWORD,
+            phone_number=f'+2228{self.fresh_count:08d}', gender='F', age=25,
+        )
+        return AuthToken.objects.create(user=user).key
+
+    # ----------------------------
+    # Mesures
+    # ----------------------------
+    def run_routes(self, options):
+        routes = build_routes(self)
+        names = options['routes'] or api_url_names()
+        results = {}
+
+        for name in names:
+            route = routes.get(name)
+            if route is None:
+                self.stdout.write(self.style.WARNING(f"{name:<26} | pas de scénario, ignorée"))
+                continue
+
+            latencies, queries, errors = [], [], 0
+            total = options['warmup'] + options['iterations']
+            for iteration in range(total):
+                latency, query_count, ok = self.call(route, iteration)
+                if iteration < options['warmup']:
+                    continue
+                if ok:
+                    latencies.append(latency)
+                    queries.append(query_count)
+                else:
+                    errors += 1
+
+            stats = summarize(latencies, sum(latencies), errors=errors)
+            stats['queries_per_request'] = round(sum(queries) / len(queries), 2) if queries else None
+            results[name] = stats
+            self.stdout.write(
+                f"{name:<26} | p50 {stats['p50_ms']} ms | p95 {stats['p95_ms']} ms"
+                f" | p99 {stats['p99_ms']} ms | {stats['throughput_rps']} req/s"
+                f" | {stats['queries_per_request']} requêtes SQL | erreurs {errors}"
+            )
+        return results
+
+    def call(self, route, iteration):
+        headers = {}
+        if route.user == 'fresh':
+            headers['HTTP_AUTHORIZATION'] = f'Token {self.fresh_token()}'
+        elif route.user:
+            headers['HTTP_AUTHORIZATION'] = f'Token {self.tokens[route.user]}'
+
+        client = Client()
+        method = getattr(client, route.method)
+        path = route.resolve(route.path, iteration)
+        data = route.resolve(route.data, iteration)
+        kwargs = {'content_type': 'application/json'} if route.method != 'get' else {}
+        if route.method != 'get':
+            data = json.dumps(data or {})
+
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            response = method(path, data, **kwargs, **headers) if data else method(path, **kwargs, **headers)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            latency = time.perf_counter() - start
+        return latency, len(ctx.captured_queries), response.status_code < 400
+
+    # ----------------------------
+    # Comparaison (CI)
+    # ----------------------------
+    def compare(self, report, baseline_path, threshold):
+        with open(baseline_path) as baseline_file:
+            baseline_report = json.load(baseline_file)
+        baseline = baseline_report['results']
+        if baseline_report.get('meta', {}).get('volumes') != report['meta']['volumes']:
+            self.stderr.write(self.style.WARNING("Volumes différents de la référence : comparaison indicative"))
+
+        regressions = []
+        for name, current in report['results'].items():
+            previous = baseline.get(name)
+            if not previous or not previous.get('p95_ms') or not current.get('p95_ms'):
+                continue
+            growth = (current['p95_ms'] - previous['p95_ms']) / previous['p95_ms'] * 100
+            if growth > threshold:
+                regressions.append(f"{name}: p95 {previous['p95_ms']} -> {current['p95_ms']} ms (+{growth:.0f}%)")
+            if (current['queries_per_request'] or 0) > (previous.get('queries_per_request') or 0):
+                regressions.append(
+                    f"{name}: requêtes SQL {previous.get('queries_per_request')} -> {current['queries_per_request']}"
+                )
+
+        if regressions:
+            for line in regressions:
+                self.stderr.write(line)
+            raise CommandError(f"{len(regressions)} régression(s) détectée(s)")
+        self.stdout.write(self.style.SUCCESS("Aucune régression"))
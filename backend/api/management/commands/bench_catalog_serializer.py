@@ -0,0 +1,70 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.test import APIRequestFactory
+
+from api.models import CustomUser, HennaType
+from api.serializers import HennaTypeSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare le coût par ligne de HennaTypeSerializer (mode objet vs mode "
+        "compilé). Les données de test sont créées puis annulées (rollback)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 10000])
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--lang', choices=['ar', 'fr'], default='fr')
+
+    def handle(self, *args, **options):
+        for size in options['sizes']:
+            with transaction.atomic():
+                self.seed(size)
+                request = self.make_request(options['lang'])
+                queryset = HennaType.objects.all()
+
+                legacy = self.measure(options['repeat'], lambda: HennaTypeSerializer(
+                    list(queryset.all()), many=True, context={'request': request}
+                ).data)
+                compiled = self.measure(options['repeat'], lambda: HennaTypeSerializer(
+                    queryset.all(), many=True, context={'request': request}
+                ).data)
+
+                self.stdout.write(
+                    f"{size:>7} lignes | objet: {legacy / size * 1e6:8.2f} µs/ligne"
+                    f" | compilé: {compiled / size * 1e6:8.2f} µs/ligne"
+                    f" | x{legacy / compiled:.1f}"
+                )
+                transaction.set_rollback(True)
+
+    def seed(self, size):
+        HennaType.objects.bulk_create([
+            HennaType(
+                name_ar=f'حناء {i}',
+                name_fr=f'Henné {i}' if i % 2 else '',
+                description_ar='وصف ' * 20,
+                description_fr='Description ' * 20 if i % 2 else '',
+                image=f'henna_types/bench_{i}.jpg',
+                price=Decimal('1500.00') + i,
+            )
+            for i in range(size)
+        ], batch_size=500)
+
+    def make_request(self, lang):
+        request = APIRequestFactory().get('/api/henna-types/', HTTP_HOST='localhost')
+        request.user = CustomUser(username='bench', language_preference=lang)
+        return request
+
+    def measure(self, repeat, func):
+        """Meilleur temps sur `repeat` exécutions (secondes)"""
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
@@ -0,0 +1,54 @@
+import itertools
+import json
+
+from django.core.management.base import BaseCommand
+
+from api.loadtest import run_concurrent
+
+
+HOT_PATHS = [
+    'henna-types/',
+    'orders/my-orders/',
+    'admin/dashboard/',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure débit et latence d'un serveur en marche à différents niveaux "
+        "de concurrence, pour comparer un déploiement WSGI et ASGI.\n\n"
+        "Exemple :\n"
+        "  gunicorn han_backend.wsgi -w 4 -b :8000\n"
+        "  uvicorn han_backend.asgi:application --workers 4 --port 8001\n"
+        "  manage.py bench_concurrency --url http://127.0.0.1:8000/api/ --token T\n"
+        "  manage.py bench_concurrency --url http://127.0.0.1:8001/api/async/ --token T"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000/api/', help="préfixe des endpoints")
+        parser.add_argument('--token', help="token d'un compte admin (pour le dashboard)")
+        parser.add_argument('--paths', nargs='+', default=HOT_PATHS)
+        parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 8, 32, 64])
+        parser.add_argument('--requests', type=int, default=500, help="requêtes par niveau")
+        parser.add_argument('--json', help="fichier de résultats JSON")
+
+    def handle(self, *args, **options):
+        headers = {'Authorization': f"Token {options['token']}"} if options['token'] else {}
+        base = options['url'].rstrip('/') + '/'
+        urls = [base + path.lstrip('/') for path in options['paths']]
+
+        results = []
+        for concurrency in options['concurrency']:
+            batch = list(itertools.islice(itertools.cycle(urls), options['requests']))
+            stats = run_concurrent(batch, headers, concurrency)
+            stats['concurrency'] = concurrency
+            results.append(stats)
+            self.stdout.write(
+                f"c={concurrency:>4} | {stats['throughput_rps']} req/s"
+                f" | p50 {stats['p50_ms']} ms | p95 {stats['p95_ms']} ms"
+                f" | p99 {stats['p99_ms']} ms | erreurs {stats['errors']}"
+            )
+
+        if options['json']:
+            with open(options['json'], 'w') as output:
+                json.dump({'url': base, 'paths': options['paths'], 'results': results}, output, indent=2)
@@ -0,0 +1,89 @@
+import math
+import os
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+
+from api.hashers import TUNED_HASHERS
+
+
+def _hash_once(algorithm):
+    hasher = TUNED_HASHERS[algorithm]()
+    start = time.perf_counter()
+    hasher.encode('bench-password-123', hasher.salt())
+    return time.perf_counter() - start
+
+
+def _available(algorithm):
+    hasher = TUNED_HASHERS[algorithm]()
+    if hasher.library is None:
+        return True
+    try:
+        hasher._load_library()
+    except ValueError:
+        return False
+    return True
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure le temps de hachage des mots de passe par cœur pour chaque "
+        "algorithme de PASSWORD_HASHING, et propose un coût pour un budget de latence."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--algorithms', nargs='+', choices=list(TUNED_HASHERS), default=list(TUNED_HASHERS))
+        parser.add_argument('--rounds', type=int, default=5, help="hachages par cœur")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--budget-ms', type=float, help="latence cible d'un hachage (ms)")
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        rounds = options['rounds']
+        self.stdout.write(f"{workers} cœur(s), {rounds} hachage(s) par cœur")
+
+        for algorithm in options['algorithms']:
+            if not _available(algorithm):
+                self.stdout.write(f"{algorithm:>7} | bibliothèque absente, ignoré")
+                continue
+
+            # Un seul cœur : latence d'un hachage
+            single = statistics.median(_hash_once(algorithm) for _ in range(rounds))
+
+            # Tous les cœurs : débit soutenu (workers CPU-bound en parallèle)
+            with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+                start = time.perf_counter()
+                list(pool.map(_hash_once, [algorithm] * (rounds * workers)))
+                elapsed = time.perf_counter() - start
+            throughput = rounds * workers / elapsed
+
+            line = (
+                f"{algorithm:>7} | {self.describe_cost(algorithm)}"
+                f" | {single * 1000:8.1f} ms/hachage"
+                f" | {throughput:7.1f} hachages/s ({throughput / workers:.1f}/cœur)"
+            )
+            if options['budget_ms']:
+                line += f" | pour {options['budget_ms']:g} ms : {self.suggest(algorithm, single, options['budget_ms'] / 1000)}"
+            self.stdout.write(line)
+
+    def describe_cost(self, algorithm):
+        hasher = TUNED_HASHERS[algorithm]()
+        if algorithm == 'pbkdf2':
+            return f"ITERATIONS={hasher.iterations}"
+        if algorithm == 'argon2':
+            return f"TIME_COST={hasher.time_cost} MEMORY_COST={hasher.memory_cost}"
+        return f"WORK_FACTOR={hasher.work_factor}"
+
+    def suggest(self, algorithm, measured, budget):
+        """Le coût est ~linéaire en itérations / time_cost / work_factor"""
+        ratio = budget / measured
+        hasher = TUNED_HASHERS[algorithm]()
+        if algorithm == 'pbkdf2':
+            return f"ITERATIONS={max(1, int(hasher.iterations * ratio / 1000) * 1000)}"
+        if algorithm == 'argon2':
+            return f"TIME_COST={max(1, int(hasher.time_cost * ratio))}"
+        work_factor = 2 ** max(1, int(math.log2(hasher.work_factor * ratio)))
+        return f"WORK_FACTOR={work_factor}"
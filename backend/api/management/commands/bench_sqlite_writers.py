@@ -0,0 +1,160 @@
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from rest_framework.test import APIClient
+
+from api.loadtest import summarize
+from api.models import CustomUser, DashboardStats, HennaType, Order
+
+
+# Profil d'origine : connexion par requête, DEFERRED, aucun PRAGMA
+BASELINE = {
+    'CONN_MAX_AGE': 0,
+    'OPTIONS': {},
+    'SQLITE_PRAGMAS': {},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark d'écrivains concurrents sur SQLite : N threads créent des "
+        "commandes via /api/orders/create/ (et des lecteurs lisent leurs "
+        "commandes) sur une base fichier temporaire. Compare le profil "
+        "d'origine et le profil de settings.py, et vérifie qu'aucune commande "
+        "n'est perdue (réponses 201 = lignes en base = compteur du dashboard)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=16)
+        parser.add_argument('--orders-per-writer', type=int, default=25)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--profile', choices=['baseline', 'tuned', 'both'], default='both')
+
+    def handle(self, *args, **options):
+        profiles = ['baseline', 'tuned'] if options['profile'] == 'both' else [options['profile']]
+        quiet = [logging.getLogger(name) for name in ('api', 'django.request')]
+        levels = [logger.level for logger in quiet]
+        for logger in quiet:
+            logger.setLevel(logging.CRITICAL)
+
+        setup_test_environment()
+        try:
+            for profile in profiles:
+                self.run_profile(profile, options)
+        finally:
+            teardown_test_environment()
+            for logger, level in zip(quiet, levels):
+                logger.setLevel(level)
+
+    # ----------------------------
+    # Un profil sur une base neuve
+    # ----------------------------
+    def run_profile(self, profile, options):
+        settings_dict = connection.settings_dict
+        saved = {key: settings_dict.get(key) for key in ('CONN_MAX_AGE', 'OPTIONS', 'TEST')}
+        directory = tempfile.mkdtemp(prefix='han-bench-')
+        overrides = {}
+        if profile == 'baseline':
+            settings_dict['CONN_MAX_AGE'] = BASELINE['CONN_MAX_AGE']
+            settings_dict['OPTIONS'] = BASELINE['OPTIONS']
+            overrides['SQLITE_PRAGMAS'] = BASELINE['SQLITE_PRAGMAS']
+        settings_dict['TEST'] = dict(saved['TEST'] or {}, NAME=os.path.join(directory, 'bench.sqlite3'))
+
+        old_name = settings_dict['NAME']
+        try:
+            with override_settings(**overrides):
+                connection.close()
+                connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+                try:
+                    self.stdout.write(self.describe(profile))
+                    self.run_writers(profile, options)
+                finally:
+                    connection.creation.destroy_test_db(old_name, verbosity=0)
+        finally:
+            settings_dict.update(saved)
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def describe(self, profile):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            journal_mode = cursor.fetchone()[0]
+        mode = connection.settings_dict['OPTIONS'].get('transaction_mode', 'DEFERRED')
+        return f"[{profile}] journal_mode={journal_mode} transaction_mode={mode}"
+
+    def run_writers(self, profile, options):
+        user = CustomUser.objects.create_user(
+            username='bench_writer', password='bench-secret-123',
+            phone_number='+22200000077', gender='F', age=30,
+        )
+        henna = HennaType.objects.create(
+            name_ar='حناء', description_ar='وصف', image='henna_types/bench.jpg', price=Decimal('1000'),
+        )
+        connection.close()
+
+        attempted = options['writers'] * options['orders_per_writer']
+        latencies, statuses = [], []
+        lock = threading.Lock()
+        done = threading.Event()
+
+        def writer(index):
+            api = APIClient(raise_request_exception=False)
+            api.force_authenticate(user)
+            for number in range(options['orders_per_writer']):
+                start = time.perf_counter()
+                response = api.post('/api/orders/create/', {
+                    'henna_type': henna.pk, 'notes': f'bench-{index}-{number}',
+                }, format='json')
+                latency = time.perf_counter() - start
+                close_old_connections()  # fin de requête : respecte CONN_MAX_AGE
+                with lock:
+                    statuses.append(response.status_code)
+                    if response.status_code == 201:
+                        latencies.append(latency)
+            connection.close()
+
+        def reader():
+            api = APIClient(raise_request_exception=False)
+            api.force_authenticate(user)
+            while not done.is_set():
+                api.get('/api/orders/my-orders/')
+                close_old_connections()
+            connection.close()
+
+        readers = [threading.Thread(target=reader) for _ in range(options['readers'])]
+        writers = [threading.Thread(target=writer, args=(i,)) for i in range(options['writers'])]
+        for thread in readers:
+            thread.start()
+        start = time.perf_counter()
+        for thread in writers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        done.set()
+        for thread in readers:
+            thread.join()
+
+        created = statuses.count(201)
+        stored = Order.objects.filter(notes__startswith='bench-').count()
+        counter = DashboardStats.snapshot()['total_orders']
+        stats = summarize(latencies, elapsed, errors=len(statuses) - created)
+        self.stdout.write(
+            f"[{profile}] {created}/{attempted} commandes créées | en base {stored}"
+            f" | compteur {counter} | {stats['throughput_rps']} écritures/s"
+            f" | p50 {stats['p50_ms']} ms | p95 {stats['p95_ms']} ms | p99 {stats['p99_ms']} ms"
+        )
+        lost = attempted - stored
+        if lost or counter != stored:
+            self.stdout.write(self.style.WARNING(
+                f"[{profile}] {lost} commande(s) perdue(s), compteur {'OK' if counter == stored else 'désynchronisé'}"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"[{profile}] aucune commande perdue"))
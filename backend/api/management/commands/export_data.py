@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.exports import (
+    EXPORT_FORMATS, ExportError, export_clients_queryset,
+    export_orders_queryset, iter_export,
+)
+
+
+class Command(BaseCommand):
+    help = "Exporte les commandes ou les clients en CSV/JSONL, en flux (mémoire constante)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=['orders', 'clients'])
+        parser.add_argument('--format', choices=list(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--status', help="commandes uniquement")
+        parser.add_argument('--from', dest='date_from', help="AAAA-MM-JJ (inclus)")
+        parser.add_argument('--to', dest='date_to', help="AAAA-MM-JJ (inclus)")
+        parser.add_argument('-o', '--output', help="fichier de sortie (stdout par défaut)")
+
+    def handle(self, *args, **options):
+        try:
+            if options['dataset'] == 'orders':
+                queryset, columns = export_orders_queryset(
+                    status=options['status'],
+                    date_from=options['date_from'],
+                    date_to=options['date_to'],
+                )
+            else:
+                queryset, columns = export_clients_queryset(
+                    date_from=options['date_from'],
+                    date_to=options['date_to'],
+                )
+        except ExportError as e:
+            raise CommandError(str(e))
+
+        chunks = iter_export(queryset, columns, options['format'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+                for chunk in chunks:
+                    output.write(chunk)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
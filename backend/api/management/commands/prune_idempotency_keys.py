@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = (
+        "Supprime les clés Idempotency-Key plus anciennes que "
+        "IDEMPOTENCY_KEY_RETENTION_HOURS (une nouvelle tentative après ce délai "
+        "est traitée comme une nouvelle requête)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        hours = getattr(settings, 'IDEMPOTENCY_KEY_RETENTION_HOURS', 24)
+        deleted, _ = IdempotencyKey.objects.using(options['database']).filter(
+            created_at__lt=timezone.now() - timedelta(hours=hours)
+        ).delete()
+        self.stdout.write(self.style.SUCCESS(f"{deleted} clé(s) supprimée(s)"))
@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.models import OrderTombstone
+
+
+class Command(BaseCommand):
+    help = (
+        "Supprime les traces de commandes supprimées plus anciennes que "
+        "ORDER_TOMBSTONE_RETENTION_DAYS (les clients plus anciens resynchronisent tout)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        days = getattr(settings, 'ORDER_TOMBSTONE_RETENTION_DAYS', 90)
+        deleted, _ = OrderTombstone.objects.using(options['database']).filter(
+            deleted_at__lt=timezone.now() - timedelta(days=days)
+        ).delete()
+        self.stdout.write(self.style.SUCCESS(f"{deleted} trace(s) supprimée(s)"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from api.models import ClientSummary
+
+
+class Command(BaseCommand):
+    help = "Recalcule les résumés de commandes des clients à partir des tables (corrige la dérive)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        updated = ClientSummary.rebuild(using=options['database'])
+        self.stdout.write(self.style.SUCCESS(f"{updated} résumé(s) reconstruit(s)"))
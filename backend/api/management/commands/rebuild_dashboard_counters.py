@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from api.models import DashboardStats
+
+
+class Command(BaseCommand):
+    help = "Recalcule les compteurs du dashboard admin à partir des tables (corrige la dérive)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        values = DashboardStats.rebuild(using=options['database'])
+        for name, value in values.items():
+            self.stdout.write(f"{name}: {value}")
+        self.stdout.write(self.style.SUCCESS("Compteurs reconstruits"))
@@ -0,0 +1,162 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+# ----------------------------
+# Mesures par requête
+# ----------------------------
+class QueryBudgetExceeded(AssertionError):
+    """Une vue a dépassé son budget de requêtes SQL (mode strict)"""
+
+
+class RequestMetrics:
+    """
+    Compteurs d'une requête HTTP. L'instance sert aussi de
+    connection.execute_wrapper : chaque requête SQL y est comptée et chronométrée.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.serialization_seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.sql_seconds += time.perf_counter() - start
+
+
+_current = ContextVar('api_request_metrics', default=None)
+
+
+@contextmanager
+def serialization_timer():
+    """
+    Ajoute la durée du bloc au temps de sérialisation de la requête en
+    cours, hors SQL déclenché dans le bloc (querysets évalués par `.data`),
+    déjà compté dans sql_seconds.
+    """
+    metrics = _current.get()
+    start = time.perf_counter()
+    sql_start = metrics.sql_seconds if metrics is not None else 0.0
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            elapsed = time.perf_counter() - start
+            metrics.serialization_seconds += elapsed - (metrics.sql_seconds - sql_start)
+
+
+# ----------------------------
+# Agrégats par vue (format Prometheus)
+# ----------------------------
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class MetricsRegistry:
+    """
+    Totaux par nom de vue depuis le démarrage du processus. Chaque worker
+    a les siens : Prometheus les agrège en interrogeant chaque instance.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._views = {}
+        self._lock = threading.Lock()
+
+    def record(self, view, metrics, wall_seconds):
+        with self._lock:
+            entry = self._views.get(view)
+            if entry is None:
+                entry = self._views[view] = {
+                    'requests': 0,
+                    'queries': 0,
+                    'sql_seconds': 0.0,
+                    'serialization_seconds': 0.0,
+                    'wall_seconds': 0.0,
+                    'buckets': [0] * len(self.buckets),
+                }
+            entry['requests'] += 1
+            entry['queries'] += metrics.queries
+            entry['sql_seconds'] += metrics.sql_seconds
+            entry['serialization_seconds'] += metrics.serialization_seconds
+            entry['wall_seconds'] += wall_seconds
+            for index, bound in enumerate(self.buckets):
+                if wall_seconds <= bound:
+                    entry['buckets'][index] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                view: dict(entry, buckets=list(entry['buckets']))
+                for view, entry in self._views.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+    def render(self):
+        """Exposition au format texte Prometheus (version 0.0.4)"""
+        views = sorted(self.snapshot().items())
+        lines = []
+        counters = [
+            ('han_http_requests_total', 'requests', 'Requêtes traitées'),
+            ('han_db_queries_total', 'queries', 'Requêtes SQL exécutées'),
+            ('han_db_query_seconds_total', 'sql_seconds', 'Temps passé en SQL'),
+            ('han_serialization_seconds_total', 'serialization_seconds', 'Temps de rendu des réponses'),
+        ]
+        for name, field, help_text in counters:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} counter')
+            for view, entry in views:
+                lines.append(f'{name}{{view="{_label(view)}"}} {entry[field]}')
+
+        name = 'han_request_duration_seconds'
+        lines.append(f'# HELP {name} Durée totale des requêtes')
+        lines.append(f'# TYPE {name} histogram')
+        for view, entry in views:
+            label = _label(view)
+            for bound, count in zip(self.buckets, entry['buckets']):
+                lines.append(f'{name}_bucket{{view="{label}",le="{bound}"}} {count}')
+            lines.append(f'{name}_bucket{{view="{label}",le="+Inf"}} {entry["requests"]}')
+            lines.append(f'{name}_sum{{view="{label}"}} {entry["wall_seconds"]}')
+            lines.append(f'{name}_count{{view="{label}"}} {entry["requests"]}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+# ----------------------------
+# Budgets de requêtes
+# ----------------------------
+def get_query_budgets():
+    # Déclarés à côté des routes, dans api/urls.py
+    from .urls import QUERY_BUDGETS
+    return QUERY_BUDGETS
+
+
+def check_query_budget(view, queries):
+    """Avertit (ou lève QueryBudgetExceeded en mode strict) si le budget est dépassé"""
+    budget = get_query_budgets().get(view)
+    if budget is None or queries <= budget:
+        return
+    message = f"{view} : {queries} requêtes SQL pour un budget de {budget}"
+    if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
@@ -0,0 +1,156 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.db import connections
+from django.utils.functional import empty
+
+from . import routers
+from .logs import should_log
+from .metrics import RequestMetrics, _current, check_query_budget, registry
+
+access_logger = logging.getLogger('api.requests')
+
+
+# ----------------------------
+# Instrumentation des requêtes
+# ----------------------------
+def request_user_id(request):
+    """Identifiant de l'utilisateur, sans charger un utilisateur de session resté paresseux"""
+    user = getattr(request, 'user', None)
+    if getattr(user, '_wrapped', None) is empty:
+        # Le charger ici coûterait une requête (interdite en contexte async)
+        return None
+    return getattr(user, 'pk', None)
+
+
+def wrap_connections(stack, metrics):
+    """Compte le SQL de toutes les connexions du thread courant jusqu'à stack.close()"""
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(metrics))
+
+
+class InstrumentationMiddleware:
+    """
+    Mesure, par nom de vue résolu : nombre de requêtes SQL, temps SQL,
+    temps de sérialisation et durée totale, puis vérifie le budget de
+    requêtes de la vue (QUERY_BUDGETS dans api/urls.py) et écrit une
+    ligne de journal d'accès (logger 'api.requests').
+
+    À placer en tête de MIDDLEWARE pour inclure session et authentification.
+    Les réponses en flux (exports) lisent la base après le retour du
+    middleware : ces requêtes-là ne sont pas comptées.
+
+    Synchrone et asynchrone : sous ASGI, la chaîne reste asynchrone
+    (pas de thread par requête pour les vues async).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                wrap_connections(stack, metrics)
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, metrics, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            # L'ORM async exécute le SQL dans le thread de sync_to_async
+            # (thread_sensitive) : les connexions à instrumenter sont les siennes
+            stack = ExitStack()
+            await sync_to_async(wrap_connections)(stack, metrics)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        finally:
+            _current.reset(token)
+        self.finish(request, response, metrics, time.perf_counter() - start)
+        return response
+
+    def finish(self, request, response, metrics, wall_seconds):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match is not None else None
+        self.log_request(request, response, view, metrics, wall_seconds)
+        if view is not None:
+            registry.record(view, metrics, wall_seconds)
+            check_query_budget(view, metrics.queries)
+
+    def log_request(self, request, response, view, metrics, wall_seconds):
+        """Journal d'accès structuré (échantillonné par endpoint, erreurs toujours gardées)"""
+        level = logging.ERROR if response.status_code >= 500 else logging.INFO
+        if not access_logger.isEnabledFor(level) or not should_log(view, level):
+            return
+        access_logger.log(level, 'request', extra={
+            'event': 'request',
+            'endpoint': view,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(wall_seconds * 1000, 2),
+            'queries': metrics.queries,
+            'sql_ms': round(metrics.sql_seconds * 1000, 2),
+            'user_id': request_user_id(request),
+        })
+
+
+# ----------------------------
+# Routage primaire / réplicas
+# ----------------------------
+class DatabaseRoutingMiddleware:
+    """
+    Donne à api.routers.PrimaryReplicaRouter le contexte de la requête :
+    nom de la vue (connu en process_view), écritures effectuées, et
+    utilisateur pour la fenêtre collante après écriture.
+
+    Synchrone et asynchrone, comme InstrumentationMiddleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # Le handler ASGI appelle process_view tel quel, sans thread
+            self.process_view = self.aprocess_view
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = routers.start_request(request)
+        try:
+            return self.get_response(request)
+        finally:
+            routers.end_request(token)
+
+    async def __acall__(self, request):
+        token = routers.start_request(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            await routers.aend_request(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        routers.set_view(request.resolver_match.view_name)
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        routers.set_view(request.resolver_match.view_name)
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:52
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+STATUSES = ['pending', 'confirmed', 'in_progress', 'completed', 'cancelled']
+
+
+def seed_counters(apps, schema_editor):
+    """Initialise la ligne de compteurs avec l'état actuel des tables"""
+    db = schema_editor.connection.alias
+    Order = apps.get_model('api', 'Order')
+    CustomUser = apps.get_model('api', 'CustomUser')
+    DashboardStats = apps.get_model('api', 'DashboardStats')
+
+    aggregates = {'total_orders': Count('id')}
+    for status in STATUSES:
+        aggregates[f'{status}_orders'] = Count('id', filter=Q(status=status))
+    values = Order.objects.using(db).aggregate(**aggregates)
+    values['total_clients'] = CustomUser.objects.using(db).filter(is_staff=False).count()
+    DashboardStats.objects.using(db).create(pk=1, **values)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_orders', models.IntegerField(default=0, verbose_name='إجمالي الطلبات')),
+                ('pending_orders', models.IntegerField(default=0, verbose_name='قيد الانتظار')),
+                ('confirmed_orders', models.IntegerField(default=0, verbose_name='مؤكد')),
+                ('in_progress_orders', models.IntegerField(default=0, verbose_name='قيد التنفيذ')),
+                ('completed_orders', models.IntegerField(default=0, verbose_name='مكتمل')),
+                ('cancelled_orders', models.IntegerField(default=0, verbose_name='ملغي')),
+                ('total_clients', models.IntegerField(default=0, verbose_name='إجمالي العملاء')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='تاريخ التحديث')),
+            ],
+            options={
+                'verbose_name': 'إحصائيات',
+                'verbose_name_plural': 'إحصائيات',
+            },
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_dashboardstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hennatype',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='أحجام الصورة'),
+        ),
+    ]
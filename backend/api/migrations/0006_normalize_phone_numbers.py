@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:59
+
+import logging
+import re
+
+from django.db import migrations
+
+logger = logging.getLogger(__name__)
+
+
+PHONE_FORMATTING = re.compile(r'[\s\-\.\(\)/]')
+PHONE_CANONICAL = re.compile(r'^\+\d+$')
+
+
+def normalize(value):
+    """Copie figée de api.models.normalize_phone_number"""
+    number = PHONE_FORMATTING.sub('', value or '')
+    if number.startswith('00'):
+        number = '+' + number[2:]
+    elif not number.startswith('+'):
+        number = '+' + number
+    return number if PHONE_CANONICAL.match(number) else None
+
+
+def normalize_phone_numbers(apps, schema_editor):
+    """Réécrit les numéros existants sous forme canonique (E.164 sans mise en forme)"""
+    db = schema_editor.connection.alias
+    CustomUser = apps.get_model('api', 'CustomUser')
+
+    taken = set(CustomUser.objects.using(db).values_list('phone_number', flat=True))
+    for pk, phone_number in CustomUser.objects.using(db).values_list('pk', 'phone_number'):
+        canonical = normalize(phone_number)
+        if not canonical or canonical == phone_number:
+            continue
+        if canonical in taken:
+            # Doublon après normalisation : laissé tel quel, à fusionner à la main
+            logger.warning("Numéro en double ignoré : %s (utilisateur %s)", phone_number, pk)
+            continue
+        CustomUser.objects.using(db).filter(pk=pk).update(phone_number=canonical)
+        taken.discard(phone_number)
+        taken.add(canonical)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_hennatype_image_variants'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_phone_numbers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,120 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:23
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+
+# Copie figée de api.search (normalisation et index)
+ARABIC_FOLDING = str.maketrans({
+    '\u0671': '\u0627',
+    '\u0649': '\u064a',
+    '\u0629': '\u0647',
+    '\u0640': None,
+})
+ARABIC_FOLDING.update({zero + n: str(n) for zero in (0x0660, 0x06F0) for n in range(10)})
+NON_WORD = re.compile(r'[^\w]+')
+
+SEARCH_TABLE = 'api_customuser_search'
+
+SQLITE_INSTALL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+        search_text, content='api_customuser', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ai AFTER INSERT ON api_customuser BEGIN
+        INSERT INTO {SEARCH_TABLE}(rowid, search_text) VALUES (new.id, new.search_text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ad AFTER DELETE ON api_customuser BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, search_text) VALUES ('delete', old.id, old.search_text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_au AFTER UPDATE OF search_text ON api_customuser BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, search_text) VALUES ('delete', old.id, old.search_text);
+        INSERT INTO {SEARCH_TABLE}(rowid, search_text) VALUES (new.id, new.search_text);
+    END""",
+    f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')",
+]
+
+SQLITE_UNINSTALL = [
+    f'DROP TRIGGER IF EXISTS {SEARCH_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {SEARCH_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {SEARCH_TABLE}_au',
+    f'DROP TABLE IF EXISTS {SEARCH_TABLE}',
+]
+
+POSTGRES_INSTALL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    """CREATE INDEX IF NOT EXISTS user_search_trgm_idx ON api_customuser
+        USING gin (search_text gin_trgm_ops) WHERE NOT is_staff""",
+]
+
+POSTGRES_UNINSTALL = [
+    'DROP INDEX IF EXISTS user_search_trgm_idx',
+]
+
+
+def normalize(value):
+    text = unicodedata.normalize('NFKD', str(value or ''))
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    text = text.translate(ARABIC_FOLDING).casefold()
+    return ' '.join(NON_WORD.sub(' ', text).replace('_', ' ').split())
+
+
+def search_text(first_name, last_name, username, phone_number):
+    text = normalize(' '.join(part or '' for part in (first_name, last_name, username)))
+    digits = re.sub(r'\D', '', str(phone_number or '').translate(ARABIC_FOLDING))
+    if digits.startswith('00'):
+        digits = digits[2:]
+    return f'{text} {digits}'.strip()
+
+
+def fill_search_text(apps, schema_editor):
+    """Calcule search_text des utilisateurs existants, par paquets"""
+    db = schema_editor.connection.alias
+    CustomUser = apps.get_model('api', 'CustomUser')
+    rows = CustomUser.objects.using(db).values_list(
+        'pk', 'first_name', 'last_name', 'username', 'phone_number'
+    ).iterator(chunk_size=2000)
+    batch = []
+    for pk, *fields in rows:
+        batch.append(CustomUser(pk=pk, search_text=search_text(*fields)))
+        if len(batch) == 2000:
+            CustomUser.objects.using(db).bulk_update(batch, ['search_text'])
+            batch = []
+    if batch:
+        CustomUser.objects.using(db).bulk_update(batch, ['search_text'])
+
+
+def install_search_index(apps, schema_editor):
+    statements = {'sqlite': SQLITE_INSTALL, 'postgresql': POSTGRES_INSTALL}
+    for sql in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def uninstall_search_index(apps, schema_editor):
+    statements = {'sqlite': SQLITE_UNINSTALL, 'postgresql': POSTGRES_UNINSTALL}
+    for sql in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_order_version'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='نص البحث'),
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(condition=models.Q(('is_staff', False)), fields=['-created_at', '-id'], name='user_client_created_idx'),
+        ),
+        migrations.RunPython(fill_search_text, migrations.RunPython.noop),
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:29
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Q, Sum
+
+
+def fill_summaries(apps, schema_editor):
+    """Un résumé par utilisateur, calculé en une agrégation groupée par client"""
+    db = schema_editor.connection.alias
+    CustomUser = apps.get_model('api', 'CustomUser')
+    Order = apps.get_model('api', 'Order')
+    ClientSummary = apps.get_model('api', 'ClientSummary')
+
+    totals = {
+        row['client']: row
+        for row in Order.objects.using(db).order_by().values('client').annotate(
+            order_count=Count('id'),
+            last_order_at=Max('created_at'),
+            lifetime_spend=Sum('henna_type__price', filter=~Q(status='cancelled')),
+        )
+    }
+    summaries = []
+    for pk in CustomUser.objects.using(db).values_list('pk', flat=True).iterator(chunk_size=2000):
+        row = totals.get(pk, {})
+        summaries.append(ClientSummary(
+            user_id=pk,
+            order_count=row.get('order_count', 0),
+            last_order_at=row.get('last_order_at'),
+            lifetime_spend=row.get('lifetime_spend') or Decimal('0'),
+        ))
+    ClientSummary.objects.using(db).bulk_create(summaries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_customuser_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClientSummary',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='order_summary', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='العميل')),
+                ('order_count', models.PositiveIntegerField(default=0, verbose_name='عدد الطلبات')),
+                ('last_order_at', models.DateTimeField(blank=True, null=True, verbose_name='تاريخ آخر طلب')),
+                ('lifetime_spend', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=12, verbose_name='إجمالي الإنفاق')),
+            ],
+            options={
+                'verbose_name': 'ملخص طلبات العميل',
+                'verbose_name_plural': 'ملخصات طلبات العملاء',
+                'indexes': [models.Index(fields=['-lifetime_spend', '-user'], name='summary_spend_idx'), models.Index(fields=['-order_count', '-user'], name='summary_order_count_idx')],
+            },
+        ),
+        migrations.RunPython(fill_summaries, migrations.RunPython.noop),
+    ]
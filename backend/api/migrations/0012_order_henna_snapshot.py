@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:31
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_henna_snapshot(apps, schema_editor):
+    """Commandes existantes : nom et prix actuels du catalogue (un seul UPDATE)"""
+    db = schema_editor.connection.alias
+    Order = apps.get_model('api', 'Order')
+    HennaType = apps.get_model('api', 'HennaType')
+
+    henna_type = HennaType.objects.using(db).filter(pk=OuterRef('henna_type_id'))
+    Order.objects.using(db).update(
+        henna_name=Subquery(henna_type.values('name_ar')[:1]),
+        henna_price=Subquery(henna_type.values('price')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_clientsummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='henna_name',
+            field=models.CharField(default='', editable=False, max_length=100, verbose_name='اسم الحناء'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='henna_price',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), editable=False, max_digits=10, verbose_name='سعر الحناء'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_henna_snapshot, migrations.RunPython.noop),
+    ]
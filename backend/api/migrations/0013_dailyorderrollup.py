@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:35
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def fill_rollups(apps, schema_editor):
+    """Agrégats de toutes les commandes existantes, en une requête groupée"""
+    db = schema_editor.connection.alias
+    Order = apps.get_model('api', 'Order')
+    DailyOrderRollup = apps.get_model('api', 'DailyOrderRollup')
+
+    rows = Order.objects.using(db).order_by().annotate(day=TruncDate('created_at')).values(
+        'day', 'status', 'henna_type_id'
+    ).annotate(order_count=Count('id'), total_price=Sum('henna_price'))
+    DailyOrderRollup.objects.using(db).bulk_create(
+        [DailyOrderRollup(**row) for row in rows], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_order_henna_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyOrderRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='اليوم')),
+                ('status', models.CharField(choices=[('pending', 'قيد الانتظار'), ('confirmed', 'مؤكد'), ('in_progress', 'قيد التنفيذ'), ('completed', 'مكتمل'), ('cancelled', 'ملغي')], max_length=20, verbose_name='الحالة')),
+                ('order_count', models.IntegerField(default=0, verbose_name='عدد الطلبات')),
+                ('total_price', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14, verbose_name='مجموع الأسعار')),
+                ('henna_type', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='api.hennatype', verbose_name='نوع الحناء')),
+            ],
+            options={
+                'verbose_name': 'إحصائيات يومية',
+                'verbose_name_plural': 'إحصائيات يومية',
+                'constraints': [models.UniqueConstraint(fields=('day', 'status', 'henna_type'), name='rollup_day_status_henna_uniq')],
+            },
+        ),
+        migrations.RunPython(fill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:39
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_dailyorderrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_id', models.PositiveBigIntegerField(verbose_name='رقم الطلب')),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='تاريخ الحذف')),
+            ],
+            options={
+                'verbose_name': 'طلب محذوف',
+                'verbose_name_plural': 'طلبات محذوفة',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['client', 'updated_at'], name='order_client_updated_idx'),
+        ),
+        migrations.AddField(
+            model_name='ordertombstone',
+            name='client',
+            field=models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='العميل'),
+        ),
+        migrations.AddIndex(
+            model_name='ordertombstone',
+            index=models.Index(fields=['client', 'deleted_at'], name='tombstone_client_deleted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ordertombstone',
+            index=models.Index(fields=['deleted_at'], name='tombstone_deleted_idx'),
+        ),
+    ]
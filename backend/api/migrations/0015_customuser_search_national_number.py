@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:12
+
+import re
+import unicodedata
+
+from django.db import migrations
+
+
+# Copie figée de api.search (normalisation, numéro national)
+ARABIC_FOLDING = str.maketrans({
+    '\u0671': '\u0627',
+    '\u0649': '\u064a',
+    '\u0629': '\u0647',
+    '\u0640': None,
+})
+ARABIC_FOLDING.update({zero + n: str(n) for zero in (0x0660, 0x06F0) for n in range(10)})
+NON_WORD = re.compile(r'[^\w]+')
+COUNTRY_CODE = '222'
+
+
+def normalize(value):
+    text = unicodedata.normalize('NFKD', str(value or ''))
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    text = text.translate(ARABIC_FOLDING).casefold()
+    return ' '.join(NON_WORD.sub(' ', text).replace('_', ' ').split())
+
+
+def search_text(first_name, last_name, username, phone_number):
+    text = normalize(' '.join(part or '' for part in (first_name, last_name, username)))
+    digits = re.sub(r'\D', '', str(phone_number or '').translate(ARABIC_FOLDING))
+    if digits.startswith('00'):
+        digits = digits[2:]
+    national = digits[len(COUNTRY_CODE):] if digits.startswith(COUNTRY_CODE) else ''
+    return ' '.join(part for part in (text, digits, national) if part)
+
+
+def refresh_search_text(apps, schema_editor):
+    """Ajoute le numéro national à search_text ; l'index suit (triggers / trigramme)"""
+    db = schema_editor.connection.alias
+    CustomUser = apps.get_model('api', 'CustomUser')
+    rows = CustomUser.objects.using(db).values_list(
+        'pk', 'first_name', 'last_name', 'username', 'phone_number', 'search_text'
+    ).iterator(chunk_size=2000)
+    batch = []
+    for pk, *fields, current in rows:
+        value = search_text(*fields)
+        if value == current:
+            continue
+        batch.append(CustomUser(pk=pk, search_text=value))
+        if len(batch) == 2000:
+            CustomUser.objects.using(db).bulk_update(batch, ['search_text'])
+            batch = []
+    if batch:
+        CustomUser.objects.using(db).bulk_update(batch, ['search_text'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_order_sync'),
+    ]
+
+    operations = [
+        migrations.RunPython(refresh_search_text, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,77 @@
+import operator
+import re
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from functools import reduce
+
+from asgiref.sync import sync_to_async
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import RegexValidator
 from django.db import models
 from django.contrib.auth.models import AbstractUser, BaseUserManager
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import RegexValidator
+from django.db import connections, router, transaction
+from django.db.models import Case, Count, F, Max, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest, TruncDate
+from django.utils import timezone
+
+from . import availability
+from .search import build_search_text
+
+
+# ----------------------------
+# Suivi des valeurs chargées
+# ----------------------------
+class TrackLoadedValuesMixin:
+    """
+    Mémorise les valeurs de `tracked_fields` telles que lues en base,
+    pour détecter les changements au save() sans requête supplémentaire.
+    """
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_loaded_values()
+        return instance
+
+    def remember_loaded_values(self):
+        self._loaded_values = {
+            # Fichiers : on garde le nom, l'objet FieldFile étant mutable
+            name: getattr(self.__dict__[name], 'name', self.__dict__[name])
+            for name in self.tracked_fields
+            if name in self.__dict__
+        }
+
+    def loaded_value(self, name, default=None):
+        return getattr(self, '_loaded_values', {}).get(name, default)
+
+
+# ----------------------------
+# Normalisation des numéros de téléphone
+# ----------------------------
+PHONE_FORMATTING = re.compile(r'[\s\-\.\(\)/]')
+PHONE_CANONICAL = re.compile(r'^\+\d+$')
+
+
+def normalize_phone_number(value):
+    """
+    Forme canonique E.164 sans mise en forme : '00222 22-33.44.55' et
+    '22222334455' deviennent '+22222334455'. Retourne None si la valeur
+    n'est pas un numéro (ex. un nom d'utilisateur).
+    """
+    if not value:
+        return None
+    number = PHONE_FORMATTING.sub('', str(value))
+    if number.startswith('00'):
+        number = '+' + number[2:]
+    elif not number.startswith('+'):
+        number = '+' + number
+    return number if PHONE_CANONICAL.match(number) else None
+
 
 # ----------------------------
 # Manager personnalisé pour CustomUser
@@ -56,7 +124,7 @@ class CustomUserManager(BaseUserManager):
 # ----------------------------
 # Modèle CustomUser
 # ----------------------------
-class CustomUser(AbstractUser):
+class CustomUser(TrackLoadedValuesMixin, AbstractUser):
     # ----------------------------
     # Identifiant principal = phone_number
     USERNAME_FIELD = 'phone_number'
@@ -102,6 +170,10 @@ class CustomUser(AbstractUser):
         verbose_name="اللغة المفضلة"
     )
     
+    # Noms, username et téléphone normalisés (api/search.py), indexés en
+    # plein texte (SQLite FTS5) ou en trigrammes (PostgreSQL)
+    search_text = models.TextField(blank=True, default='', editable=False, verbose_name="نص البحث")
+    
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="تاريخ التسجيل")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="تاريخ التحديث")
 
@@ -128,16 +200,59 @@ class CustomUser(AbstractUser):
     class Meta:
         verbose_name = "مستخدم"
         verbose_name_plural = "المستخدمون"
+        indexes = [
+            # admin_clients_list_api / dashboard : is_staff=False
+            models.Index(
+                fields=['id'],
+                condition=models.Q(is_staff=False),
+                name='user_client_idx',
+            ),
+            # Annuaire des clients : pagination par curseur (-created_at, -id)
+            models.Index(
+                fields=['-created_at', '-id'],
+                condition=models.Q(is_staff=False),
+                name='user_client_created_idx',
+            ),
+        ]
+
+    tracked_fields = ('is_staff',)
 
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.phone_number})"
 
+    def normalize_phone_number(self):
+        self.phone_number = normalize_phone_number(self.phone_number) or self.phone_number
+
+    def clean(self):
+        super().clean()
+        # Avant validate_unique : l'unicité est vérifiée sur la forme canonique
+        self.normalize_phone_number()
+
+    def save(self, *args, **kwargs):
+        self.normalize_phone_number()
+        self.search_text = build_search_text(self)
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'search_text'}
+        created = self._state.adding
+        was_staff = self.loaded_value('is_staff', self.is_staff)
+
+        # Compteur des clients mis à jour dans la même transaction
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            if created:
+                delta = 0 if self.is_staff else 1
+                ClientSummary._default_manager.db_manager(self._state.db).create(user=self)
+            else:
+                delta = int(was_staff) - int(self.is_staff)
+            DashboardStats.bump(using=self._state.db, total_clients=delta)
+        self.remember_loaded_values()
+
 
 
 # ----------------------------
 # Modèle Type de Henné
 # ----------------------------
-class HennaType(models.Model):
+class HennaType(TrackLoadedValuesMixin, models.Model):
     name_ar = models.CharField(max_length=100, verbose_name="الاسم بالعربية")
     name_fr = models.CharField(max_length=100, blank=True, verbose_name="الاسم بالفرنسية")
     
@@ -145,6 +260,14 @@ class HennaType(models.Model):
     description_fr = models.TextField(blank=True, verbose_name="الوصف بالفرنسية")
     
     image = models.ImageField(upload_to='henna_types/', verbose_name="صورة")
+
+    # Variantes redimensionnées {format: {largeur: chemin}}, voir api/images.py
+    image_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name="أحجام الصورة"
+    )
     
     price = models.DecimalField(
         max_digits=10,
@@ -161,14 +284,24 @@ class HennaType(models.Model):
         verbose_name = "نوع الحناء"
         verbose_name_plural = "أنواع الحناء"
         ordering = ['name_ar']
+        indexes = [
+            # Catalogue : is_available=True ORDER BY name_ar
+            models.Index(
+                fields=['name_ar'],
+                condition=models.Q(is_available=True),
+                name='henna_available_name_idx',
+            ),
+        ]
     
+    tracked_fields = ('image',)
+
     def __str__(self):
         return self.name_ar
 
 # ----------------------------
 # Modèle Commande
 # ----------------------------
-class Order(models.Model):
+class Order(TrackLoadedValuesMixin, models.Model):
     STATUS_CHOICES = [
         ('pending', 'قيد الانتظار'),      # En attente
         ('confirmed', 'مؤكد'),            # Confirmé
@@ -176,6 +309,18 @@ class Order(models.Model):
         ('completed', 'مكتمل'),           # Terminé
         ('cancelled', 'ملغي'),            # Annulé
     ]
+
+    # Statuts exclus des dépenses et du chiffre d'affaires
+    UNBILLED_STATUSES = ('cancelled',)
+
+    # Transitions de statut autorisées (un statut absent = état final)
+    ALLOWED_TRANSITIONS = {
+        'pending': {'confirmed', 'cancelled'},
+        'confirmed': {'in_progress', 'cancelled'},
+        'in_progress': {'completed', 'cancelled'},
+        'completed': set(),
+        'cancelled': set(),
+    }
     
     client = models.ForeignKey(
         CustomUser,
@@ -191,6 +336,17 @@ class Order(models.Model):
         verbose_name="نوع الحناء"
     )
     
+    # Nom et prix du type de henné au moment de la commande : les listes
+    # de commandes ne lisent plus le catalogue, et un changement de prix
+    # ne réécrit pas l'historique
+    henna_name = models.CharField(max_length=100, editable=False, verbose_name="اسم الحناء")
+    henna_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        editable=False,
+        verbose_name="سعر الحناء"
+    )
+    
     status = models.CharField(
         max_length=20,
         choices=STATUS_CHOICES,
@@ -214,6 +370,9 @@ class Order(models.Model):
         verbose_name="تاريخ الموعد"
     )
     
+    # Incrémentée à chaque écriture : verrou optimiste des mises à jour admin
+    version = models.PositiveIntegerField(default=1, verbose_name="الإصدار")
+    
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="تاريخ الطلب")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="تاريخ التحديث")
     
@@ -221,6 +380,674 @@ class Order(models.Model):
         verbose_name = "طلب"
         verbose_name_plural = "الطلبات"
         ordering = ['-created_at']
+        indexes = [
+            # my_orders_api : client=? ORDER BY -created_at
+            models.Index(fields=['client', '-created_at'], name='order_client_created_idx'),
+            # my_orders_api en mode différentiel : client=? AND updated_at > ?
+            models.Index(fields=['client', 'updated_at'], name='order_client_updated_idx'),
+            # admin_orders_list_api : status=? ORDER BY -created_at, -id
+            models.Index(fields=['status', '-created_at', '-id'], name='order_status_created_idx'),
+            # admin_orders_list_api sans filtre (pagination par curseur)
+            models.Index(fields=['-created_at', '-id'], name='order_created_id_idx'),
+            # Commandes en attente (dashboard, traitement quotidien)
+            models.Index(
+                fields=['-created_at', '-id'],
+                condition=models.Q(status='pending'),
+                name='order_pending_idx',
+            ),
+            # Calendrier des rendez-vous (api/availability.py)
+            models.Index(
+                fields=['appointment_date'],
+                condition=models.Q(status__in=['confirmed', 'in_progress']),
+                name='order_booked_slot_idx',
+            ),
+        ]
     
+    tracked_fields = ('status', 'client_id', 'henna_type_id', 'henna_price')
+
     def __str__(self):
-        return f"طلب #{self.id} - {self.client.first_name} - {self.henna_type.name_ar}"
\ No newline at end of file
+        return f"طلب #{self.id} - {self.client.first_name} - {self.henna_name}"
+
+    def snapshot_henna_type(self, henna_type=None):
+        """Copie le nom et le prix courants du type de henné"""
+        henna_type = henna_type or self.henna_type
+        self.henna_name = henna_type.name_ar
+        self.henna_price = henna_type.price
+
+    def clean(self):
+        super().clean()
+        # Admin Django (formulaire, list_editable) : mêmes transitions que l'API
+        previous_status = self.loaded_value('status', self.status)
+        if not self._state.adding and not self.can_transition(previous_status, self.status):
+            raise ValidationError({
+                'status': f"انتقال غير مسموح به: {previous_status} → {self.status}",
+            })
+
+    def rollup_bucket(self):
+        """Case de DailyOrderRollup de la commande (hors jour) : statut, type, prix"""
+        return (self.status, self.henna_type_id, self.henna_price)
+
+    def loaded_rollup_bucket(self):
+        return (
+            self.loaded_value('status', self.status),
+            self.loaded_value('henna_type_id', self.henna_type_id),
+            self.loaded_value('henna_price', self.henna_price),
+        )
+
+    def save(self, *args, **kwargs):
+        created = self._state.adding
+        previous_status = self.loaded_value('status', self.status)
+        previous_client_id = self.loaded_value('client_id', self.client_id)
+        previous_bucket = self.loaded_rollup_bucket()
+        repriced = self.loaded_value('henna_type_id', self.henna_type_id) != self.henna_type_id
+        if (created and self.henna_price is None) or repriced:
+            self.snapshot_henna_type()
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'henna_name', 'henna_price'}
+        if not created:
+            # Toute écriture par save() (admin Django...) change la version
+            self.version += 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'version'}
+
+        # Compteurs du dashboard mis à jour dans la même transaction
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            using = self._state.db
+            if created:
+                DashboardStats.record_order(None, self.status, using=using)
+                ClientSummary.record([(
+                    self.client_id, 1,
+                    ClientSummary.spend(self.status, self.henna_price),
+                    self.created_at,
+                )], using=using)
+                DailyOrderRollup.record([(self.created_at, None, self.rollup_bucket())], using=using)
+            else:
+                if previous_bucket != self.rollup_bucket():
+                    DailyOrderRollup.record(
+                        [(self.created_at, previous_bucket, self.rollup_bucket())], using=using
+                    )
+                if previous_status != self.status:
+                    DashboardStats.record_order(previous_status, self.status, using=using)
+                if repriced or previous_client_id != self.client_id:
+                    ClientSummary.refresh({previous_client_id, self.client_id}, using=using)
+                elif previous_status != self.status:
+                    price = self.henna_price
+                    ClientSummary.record([(
+                        self.client_id, 0,
+                        ClientSummary.spend(self.status, price) - ClientSummary.spend(previous_status, price),
+                        None,
+                    )], using=using)
+        self.remember_loaded_values()
+
+    def needs_free_slot(self, changed, new_status):
+        """
+        Le rendez-vous doit être libre : passage à un statut qui réserve le
+        créneau, ou nouvelle date d'une commande encore active
+        """
+        appointment_date = changed.get('appointment_date', self.appointment_date)
+        if appointment_date is None:
+            return False
+        if 'status' in changed and new_status in availability.BLOCKING_STATUSES:
+            return True
+        return 'appointment_date' in changed and new_status in ('pending', *availability.BLOCKING_STATUSES)
+
+    @classmethod
+    def can_transition(cls, old_status, new_status):
+        return old_status == new_status or new_status in cls.ALLOWED_TRANSITIONS.get(old_status, ())
+
+    def apply_changes(self, changes, version=None):
+        """
+        Mise à jour optimiste : un seul UPDATE ... WHERE id=? AND version=?
+        qui n'écrit que les champs réellement modifiés de `changes`
+        (nom de champ -> valeur). `version` : celle vue par l'appelant
+        (par défaut celle de l'instance).
+
+        Retourne False si la commande a changé entre-temps (conflit) ;
+        lève InvalidTransition si le changement de statut est interdit et
+        SlotTaken si le rendez-vous tombe sur un créneau déjà réservé.
+        """
+        version = self.version if version is None else version
+        changed = {
+            name: value for name, value in changes.items()
+            if getattr(self, self._meta.get_field(name).attname) != getattr(value, 'pk', value)
+        }
+        old_status = self.status
+        new_status = changed.get('status', old_status)
+        if not self.can_transition(old_status, new_status):
+            raise InvalidTransition(old_status, new_status)
+        if version != self.version:
+            return False
+        if not changed:
+            return True
+        if 'henna_type' in changed:
+            # Nouveau type : nouvel instantané de nom et de prix
+            changed['henna_name'] = changed['henna_type'].name_ar
+            changed['henna_price'] = changed['henna_type'].price
+
+        using = self._state.db
+        old_bucket = self.rollup_bucket()
+        new_bucket = (
+            new_status,
+            changed['henna_type'].pk if 'henna_type' in changed else self.henna_type_id,
+            changed.get('henna_price', self.henna_price),
+        )
+        with transaction.atomic(using=using):
+            # Horodatage une fois le verrou d'écriture obtenu (BEGIN IMMEDIATE
+            # en SQLite) : l'attente du verrou ne recule pas updated_at
+            # derrière le watermark de la synchronisation différentielle
+            now = timezone.now()
+            if self.needs_free_slot(changed, new_status):
+                appointment_date = changed.get('appointment_date', self.appointment_date)
+                if not availability.get_calendar().is_free(appointment_date, exclude_order_id=self.pk):
+                    raise SlotTaken(appointment_date)
+            updated = type(self)._default_manager.db_manager(using).filter(
+                pk=self.pk, version=version
+            ).update(version=F('version') + 1, updated_at=now, **changed)
+            if not updated:
+                return False
+            if new_bucket != old_bucket:
+                DailyOrderRollup.record([(self.created_at, old_bucket, new_bucket)], using=using)
+            # update() ne passe ni par save() ni par les signaux
+            if new_status != old_status:
+                DashboardStats.record_order(old_status, new_status, using=using)
+            if 'status' in changed or 'henna_type' in changed:
+                old_price = self.henna_price
+                new_price = changed.get('henna_price', old_price)
+                ClientSummary.record([(
+                    self.client_id, 0,
+                    ClientSummary.spend(new_status, new_price) - ClientSummary.spend(old_status, old_price),
+                    None,
+                )], using=using)
+            if 'status' in changed or 'appointment_date' in changed:
+                order_id = self.pk
+                appointment_date = changed.get('appointment_date', self.appointment_date)
+                transaction.on_commit(
+                    lambda: availability.record_order(order_id, new_status, appointment_date),
+                    using=using
+                )
+
+        for name, value in changed.items():
+            setattr(self, name, value)
+        self.version = version + 1
+        self.updated_at = now
+        self.remember_loaded_values()
+        return True
+
+
+    @classmethod
+    def transition_many(cls, queryset, new_status, chunk_size=500):
+        """
+        Transition en masse vers `new_status` des commandes de `queryset`,
+        dans la transaction de l'appelant : une lecture des statuts
+        (verrouillée là où la base le permet), puis des UPDATE ensemblistes
+        par paquets d'identifiants. Retourne [(id, ancien statut, résultat)]
+        avec résultat 'updated', 'unchanged', 'invalid_transition' ou
+        'slot_taken' (créneau déjà réservé, y compris par une commande du lot).
+        """
+        rows = list(
+            queryset.select_for_update()
+            .order_by('id')
+            .values_list('id', 'status', 'appointment_date', 'client_id', 'henna_type_id', 'henna_price', 'created_at')
+        )
+        outcomes = []
+        eligible = []
+        summaries = []
+        rollups = []
+        calendar = availability.get_calendar()
+        blocking = new_status in availability.BLOCKING_STATUSES
+        # Créneaux pris par les commandes du lot déjà acceptées
+        claimed = availability.SlotCalendar(calendar.duration)
+        for order_id, old_status, appointment_date, client_id, henna_type_id, price, created_at in rows:
+            if old_status == new_status:
+                outcomes.append((order_id, old_status, 'unchanged'))
+            elif not cls.can_transition(old_status, new_status):
+                outcomes.append((order_id, old_status, 'invalid_transition'))
+            elif blocking and appointment_date is not None and not (
+                calendar.is_free(appointment_date, exclude_order_id=order_id)
+                and claimed.is_free(appointment_date)
+            ):
+                outcomes.append((order_id, old_status, 'slot_taken'))
+            else:
+                if blocking and appointment_date is not None:
+                    claimed.apply(order_id, appointment_date)
+                outcomes.append((order_id, old_status, 'updated'))
+                eligible.append((order_id, old_status, appointment_date))
+                summaries.append((
+                    client_id, 0,
+                    ClientSummary.spend(new_status, price) - ClientSummary.spend(old_status, price),
+                    None,
+                ))
+                rollups.append((created_at, (old_status, henna_type_id, price), (new_status, henna_type_id, price)))
+        if not eligible:
+            return outcomes
+
+        using = queryset.db
+        manager = cls._default_manager.db_manager(using)
+        sources = [status for status, targets in cls.ALLOWED_TRANSITIONS.items() if new_status in targets]
+        # Pris après la lecture verrouillée, dans la transaction (comme apply_changes)
+        now = timezone.now()
+        for start in range(0, len(eligible), chunk_size):
+            ids = [order_id for order_id, _, _ in eligible[start:start + chunk_size]]
+            manager.filter(pk__in=ids, status__in=sources).update(
+                status=new_status, version=F('version') + 1, updated_at=now
+            )
+
+        # Mêmes effets que save() / apply_changes, en une fois
+        DashboardStats.record_orders([(old_status, new_status) for _, old_status, _ in eligible], using=using)
+        ClientSummary.record(summaries, using=using)
+        DailyOrderRollup.record(rollups, using=using)
+        def update_calendar():
+            for order_id, _, appointment_date in eligible:
+                availability.record_order(order_id, new_status, appointment_date)
+
+        transaction.on_commit(update_calendar, using=using)
+        return outcomes
+
+
+class SlotTaken(ValueError):
+    """Rendez-vous sur un créneau déjà réservé par une autre commande"""
+
+    def __init__(self, appointment_date):
+        super().__init__(str(appointment_date))
+        self.appointment_date = appointment_date
+
+
+class InvalidTransition(ValueError):
+    """Changement de statut hors de Order.ALLOWED_TRANSITIONS"""
+
+    def __init__(self, old_status, new_status):
+        super().__init__(f"{old_status} -> {new_status}")
+        self.old_status = old_status
+        self.new_status = new_status
+
+
+# ----------------------------
+# Compteurs du dashboard admin
+# ----------------------------
+class DashboardStats(models.Model):
+    """
+    Ligne unique de compteurs maintenus à chaque écriture sur Order et
+    CustomUser : le dashboard coûte une lecture par clé primaire.
+    """
+    SINGLETON_ID = 1
+
+    total_orders = models.IntegerField(default=0, verbose_name="إجمالي الطلبات")
+    pending_orders = models.IntegerField(default=0, verbose_name="قيد الانتظار")
+    confirmed_orders = models.IntegerField(default=0, verbose_name="مؤكد")
+    in_progress_orders = models.IntegerField(default=0, verbose_name="قيد التنفيذ")
+    completed_orders = models.IntegerField(default=0, verbose_name="مكتمل")
+    cancelled_orders = models.IntegerField(default=0, verbose_name="ملغي")
+    total_clients = models.IntegerField(default=0, verbose_name="إجمالي العملاء")
+
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="تاريخ التحديث")
+
+    class Meta:
+        verbose_name = "إحصائيات"
+        verbose_name_plural = "إحصائيات"
+
+    @staticmethod
+    def status_field(status):
+        return f'{status}_orders'
+
+    @classmethod
+    def compute(cls, using=None):
+        """Recalcule tous les compteurs (agrégation conditionnelle en une passe)"""
+        aggregates = {'total_orders': Count('id')}
+        for value, _ in Order.STATUS_CHOICES:
+            aggregates[cls.status_field(value)] = Count('id', filter=Q(status=value))
+        values = Order._default_manager.db_manager(using).aggregate(**aggregates)
+        values['total_clients'] = (
+            CustomUser._default_manager.db_manager(using).filter(is_staff=False).count()
+        )
+        return values
+
+    @classmethod
+    def rebuild(cls, using=None):
+        """Réécrit la ligne de compteurs à partir des tables (corrige la dérive)"""
+        values = cls.compute(using)
+        cls._default_manager.db_manager(using).update_or_create(
+            pk=cls.SINGLETON_ID, defaults=values
+        )
+        return values
+
+    @classmethod
+    def bump(cls, using=None, **deltas):
+        """Applique des deltas atomiques (UPDATE ... SET x = x + n)"""
+        deltas = {name: delta for name, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        updated = cls._default_manager.db_manager(using).filter(pk=cls.SINGLETON_ID).update(
+            **{name: F(name) + delta for name, delta in deltas.items()}
+        )
+        if not updated:
+            # Pas encore de ligne : l'état courant inclut déjà ce changement
+            cls.rebuild(using)
+
+    @classmethod
+    def record_order(cls, old_status, new_status, using=None):
+        """Création (old_status=None), transition ou suppression (new_status=None)"""
+        cls.record_orders([(old_status, new_status)], using=using)
+
+    @classmethod
+    def record_orders(cls, changes, using=None):
+        """Plusieurs changements (old_status, new_status) en un seul UPDATE"""
+        deltas = {}
+        for old_status, new_status in changes:
+            if old_status is None:
+                deltas['total_orders'] = deltas.get('total_orders', 0) + 1
+            else:
+                field = cls.status_field(old_status)
+                deltas[field] = deltas.get(field, 0) - 1
+            if new_status is None:
+                deltas['total_orders'] = deltas.get('total_orders', 0) - 1
+            else:
+                field = cls.status_field(new_status)
+                deltas[field] = deltas.get(field, 0) + 1
+        cls.bump(using=using, **deltas)
+
+    @classmethod
+    async def asnapshot(cls, using=None):
+        """Variante asynchrone de snapshot() (vues ASGI)"""
+        stats = await cls._default_manager.db_manager(using).filter(pk=cls.SINGLETON_ID).values().afirst()
+        if stats is None:
+            return await sync_to_async(cls.compute)(using)
+        stats.pop('id')
+        stats.pop('updated_at')
+        return stats
+
+    @classmethod
+    def snapshot(cls, using=None):
+        """Compteurs courants ; agrégation directe si la ligne n'existe pas encore"""
+        stats = cls._default_manager.db_manager(using).filter(pk=cls.SINGLETON_ID).values().first()
+        if stats is None:
+            return cls.compute(using)
+        stats.pop('id')
+        stats.pop('updated_at')
+        return stats
+
+
+# ----------------------------
+# Résumé des commandes par client
+# ----------------------------
+class ClientSummary(models.Model):
+    """
+    Nombre de commandes, date de la dernière commande et dépenses cumulées
+    d'un client, maintenus à chaque écriture sur Order : l'annuaire admin
+    les lit (et trie dessus) sans agréger les commandes.
+    """
+    # Chaque commande compte à son prix figé (Order.henna_price), sauf
+    # dans un statut de Order.UNBILLED_STATUSES
+
+    user = models.OneToOneField(
+        CustomUser,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='order_summary',
+        verbose_name="العميل"
+    )
+    order_count = models.PositiveIntegerField(default=0, verbose_name="عدد الطلبات")
+    last_order_at = models.DateTimeField(null=True, blank=True, verbose_name="تاريخ آخر طلب")
+    lifetime_spend = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0'),
+        verbose_name="إجمالي الإنفاق"
+    )
+
+    class Meta:
+        verbose_name = "ملخص طلبات العميل"
+        verbose_name_plural = "ملخصات طلبات العملاء"
+        indexes = [
+            # Annuaire des clients trié par dépenses / nombre de commandes
+            models.Index(fields=['-lifetime_spend', '-user'], name='summary_spend_idx'),
+            models.Index(fields=['-order_count', '-user'], name='summary_order_count_idx'),
+        ]
+
+    @classmethod
+    def spend(cls, status, price):
+        """Part d'une commande dans les dépenses du client"""
+        if status is None or status in Order.UNBILLED_STATUSES:
+            return Decimal('0')
+        return price
+
+    @classmethod
+    def record(cls, changes, using=None):
+        """
+        Applique des changements (client_id, Δ commandes, Δ dépenses,
+        date de commande ou None) en un seul UPDATE ... SET x = x + n.
+        """
+        deltas = {}
+        for client_id, count, spend, ordered_at in changes:
+            current = deltas.setdefault(client_id, [0, Decimal('0'), None])
+            current[0] += count
+            current[1] += spend
+            if ordered_at is not None:
+                current[2] = max(filter(None, [current[2], ordered_at]))
+        deltas = {client_id: delta for client_id, delta in deltas.items() if any(delta)}
+        if not deltas:
+            return
+
+        def per_client(index, field):
+            return Case(
+                *[When(pk=client_id, then=Value(delta[index])) for client_id, delta in deltas.items()],
+                default=Value(0) if index < 2 else F(field.name),
+                output_field=field,
+            )
+
+        fields = {name: cls._meta.get_field(name) for name in ('order_count', 'lifetime_spend', 'last_order_at')}
+        updates = {
+            'order_count': F('order_count') + per_client(0, fields['order_count']),
+            'lifetime_spend': F('lifetime_spend') + per_client(1, fields['lifetime_spend']),
+        }
+        if any(delta[2] for delta in deltas.values()):
+            last = per_client(2, fields['last_order_at'])
+            # Greatest() vaut NULL si un argument est NULL (SQLite)
+            updates['last_order_at'] = Greatest(Coalesce('last_order_at', last), Coalesce(last, 'last_order_at'))
+
+        manager = cls._default_manager.db_manager(using)
+        updated = manager.filter(pk__in=deltas).update(**updates)
+        if updated < len(deltas):
+            # Lignes manquantes : l'état courant inclut déjà ces changements
+            manager.bulk_create([cls(user_id=client_id) for client_id in deltas], ignore_conflicts=True)
+            cls.refresh(list(deltas), using=using)
+
+    @classmethod
+    def refresh(cls, user_ids, using=None):
+        """
+        Recalcule depuis les commandes les résumés de `user_ids` (liste,
+        sous-requête ou None pour tous), en un UPDATE ; ne crée pas de ligne.
+        """
+        orders = Order._default_manager.db_manager(using).filter(client=OuterRef('pk')).order_by().values('client')
+        billed = orders.exclude(status__in=Order.UNBILLED_STATUSES)
+        summaries = cls._default_manager.db_manager(using).all()
+        if user_ids is not None:
+            summaries = summaries.filter(pk__in=user_ids)
+        return summaries.update(
+            order_count=Coalesce(Subquery(orders.annotate(n=Count('id')).values('n')), 0),
+            last_order_at=Subquery(orders.annotate(last=Max('created_at')).values('last')),
+            lifetime_spend=Coalesce(
+                Subquery(billed.annotate(total=Sum('henna_price')).values('total')),
+                Value(Decimal('0')),
+                output_field=cls._meta.get_field('lifetime_spend'),
+            ),
+        )
+
+    @classmethod
+    def rebuild(cls, using=None):
+        """Crée les lignes manquantes et recalcule tous les résumés (corrige la dérive)"""
+        manager = cls._default_manager.db_manager(using)
+        users = CustomUser._default_manager.db_manager(using).filter(order_summary__isnull=True)
+        manager.bulk_create(
+            [cls(user_id=pk) for pk in users.values_list('pk', flat=True)],
+            batch_size=1000, ignore_conflicts=True
+        )
+        return cls.refresh(None, using=using)
+
+
+# ----------------------------
+# Commandes supprimées (synchronisation)
+# ----------------------------
+class OrderTombstone(models.Model):
+    """
+    Trace d'une commande supprimée : la synchronisation différentielle de
+    my_orders_api la signale au client qui la garde en cache. Conservée
+    ORDER_TOMBSTONE_RETENTION_DAYS jours (prune_order_tombstones).
+    """
+    order_id = models.PositiveBigIntegerField(verbose_name="رقم الطلب")
+    # Sans contrainte : écrite pendant la suppression en cascade du client
+    # (effacée ensuite par le signal de suppression du client)
+    client = models.ForeignKey(
+        CustomUser,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,  # couvert par tombstone_client_deleted_idx
+        related_name='+',
+        verbose_name="العميل"
+    )
+    deleted_at = models.DateTimeField(default=timezone.now, verbose_name="تاريخ الحذف")
+
+    class Meta:
+        verbose_name = "طلب محذوف"
+        verbose_name_plural = "طلبات محذوفة"
+        indexes = [
+            models.Index(fields=['client', 'deleted_at'], name='tombstone_client_deleted_idx'),
+            models.Index(fields=['deleted_at'], name='tombstone_deleted_idx'),
+        ]
+
+
+# ----------------------------
+# Agrégats quotidiens des commandes
+# ----------------------------
+class DailyOrderRollup(models.Model):
+    """
+    Nombre de commandes et somme de leurs prix figés par jour de création
+    (fuseau courant), statut actuel et type de henné. Maintenu à chaque
+    écriture sur Order : les analyses lisent au plus une ligne par
+    (jour, statut, type) au lieu de parcourir les commandes.
+    """
+    day = models.DateField(verbose_name="اليوم")
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES, verbose_name="الحالة")
+    # Sans contrainte : la suppression d'un type supprime ses commandes, dont
+    # les signaux décrémentent ces lignes
+    henna_type = models.ForeignKey(
+        HennaType,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+        verbose_name="نوع الحناء"
+    )
+    order_count = models.IntegerField(default=0, verbose_name="عدد الطلبات")
+    total_price = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0'),
+        verbose_name="مجموع الأسعار"
+    )
+
+    class Meta:
+        verbose_name = "إحصائيات يومية"
+        verbose_name_plural = "إحصائيات يومية"
+        constraints = [
+            # Sert aussi les lectures par plage de jours
+            models.UniqueConstraint(fields=['day', 'status', 'henna_type'], name='rollup_day_status_henna_uniq'),
+        ]
+
+    @classmethod
+    def record(cls, changes, using=None):
+        """
+        Applique des changements (created_at, ancienne case, nouvelle case)
+        en une seule requête ; une case (statut, type, prix) vaut None à la
+        création (ancienne) ou à la suppression (nouvelle).
+        """
+        deltas = {}
+        for created_at, old, new in changes:
+            day = timezone.localdate(created_at)
+            for bucket, sign in ((old, -1), (new, 1)):
+                if bucket is None:
+                    continue
+                status, henna_type_id, price = bucket
+                count, total = deltas.get((day, status, henna_type_id), (0, Decimal('0')))
+                deltas[(day, status, henna_type_id)] = (count + sign, total + sign * price)
+        deltas = {key: delta for key, delta in deltas.items() if any(delta)}
+        if not deltas:
+            return
+
+        # INSERT ... ON CONFLICT DO UPDATE (SQLite >= 3.24, PostgreSQL) :
+        # la première commande d'une case crée la ligne, les suivantes
+        # l'incrémentent, sans lecture préalable ni course à la création
+        connection = connections[using or router.db_for_write(cls)]
+        fields = [cls._meta.get_field(name) for name in ('day', 'status', 'henna_type', 'order_count', 'total_price')]
+        params = []
+        for (day, status, henna_type_id), (count, total) in deltas.items():
+            for field, value in zip(fields, (day, status, henna_type_id, count, total)):
+                params.append(field.get_db_prep_save(value, connection))
+        quote = connection.ops.quote_name
+        table = quote(cls._meta.db_table)
+        columns = [quote(field.column) for field in fields]
+        row = '(%s)' % ', '.join(['%s'] * len(fields))
+        increments = ', '.join(f'{column} = {table}.{column} + excluded.{column}' for column in columns[3:])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES {', '.join([row] * len(deltas))} "
+                f"ON CONFLICT ({', '.join(columns[:3])}) DO UPDATE SET {increments}",
+                params
+            )
+
+    @classmethod
+    def rebuild_days(cls, days=None, using=None):
+        """Recalcule depuis les commandes les agrégats des jours `days` (tous si None)"""
+        orders = Order._default_manager.db_manager(using).order_by()
+        rollups = cls._default_manager.db_manager(using).all()
+        if days is not None:
+            days = sorted(days)
+            orders = orders.filter(reduce(operator.or_, [
+                Q(created_at__gte=day_start(day), created_at__lt=day_start(day + timedelta(days=1)))
+                for day in days
+            ]))
+            rollups = rollups.filter(day__in=days)
+
+        rows = orders.annotate(day=TruncDate('created_at')).values('day', 'status', 'henna_type_id').annotate(
+            order_count=Count('id'), total_price=Sum('henna_price'),
+        )
+        with transaction.atomic(using=using):
+            rollups.delete()
+            created = cls._default_manager.db_manager(using).bulk_create(
+                [cls(**row) for row in rows], batch_size=1000
+            )
+        return len(created)
+
+
+def day_start(day):
+    """Début d'un jour dans le fuseau courant"""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+# ----------------------------
+# Clés d'idempotence
+# ----------------------------
+class IdempotencyKey(models.Model):
+    """
+    Réponse enregistrée pour une clé `Idempotency-Key` : une requête
+    rejouée (réseau mobile instable) renvoie la même réponse sans
+    recréer les commandes.
+    """
+    user = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='idempotency_keys',
+        verbose_name="المستخدم"
+    )
+    key = models.CharField(max_length=255, verbose_name="المفتاح")
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response_body = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = "مفتاح عدم التكرار"
+        verbose_name_plural = "مفاتيح عدم التكرار"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='idempotency_user_key_uniq'),
+        ]
@@ -0,0 +1,100 @@
+import base64
+import binascii
+import operator
+from functools import reduce
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+# ----------------------------
+# Pagination par curseur (keyset)
+# ----------------------------
+class InvalidCursor(Exception):
+    """Curseur illisible ou falsifié"""
+
+
+def encode_cursor(*values):
+    """Encode une position (valeurs des clés de tri) en curseur opaque"""
+    raw = '|'.join(
+        value.isoformat() if hasattr(value, 'isoformat') else str(value)
+        for value in values
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, fields):
+    """Décode un curseur opaque -> valeurs typées par les champs de `fields`"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        if len(raw) != len(fields):
+            raise ValueError(cursor)
+        values = [field.to_python(value) for field, value in zip(fields, raw)]
+    except (ValueError, ValidationError, binascii.Error, UnicodeDecodeError):
+        raise InvalidCursor(cursor)
+    if any(value is None for value in values):
+        raise InvalidCursor(cursor)
+    return values
+
+
+def ordering_field(model, key):
+    """Champ désigné par une clé de tri ('-created_at', 'order_summary__lifetime_spend')"""
+    *path, name = key.lstrip('-').split('__')
+    for step in path:
+        model = model._meta.get_field(step).related_model
+    return model._meta.get_field(name)
+
+
+def ordering_value(instance, key):
+    for step in key.lstrip('-').split('__'):
+        instance = getattr(instance, step)
+    return instance
+
+
+def keyset_filter(ordering, values):
+    """Lignes strictement après la position `values` dans l'ordre `ordering`"""
+    # (a < x) OU (a = x ET b < y) OU ...
+    terms = []
+    equal = Q()
+    for key, value in zip(ordering, values):
+        name = key.lstrip('-')
+        lookup = 'lt' if key.startswith('-') else 'gt'
+        terms.append(equal & Q(**{f'{name}__{lookup}': value}))
+        equal &= Q(**{name: value})
+    return reduce(operator.or_, terms)
+
+
+def get_page_size(request, default=None, maximum=None):
+    """Taille de page demandée (?page_size=), bornée par les settings"""
+    default = default or getattr(settings, 'API_PAGE_SIZE', 50)
+    maximum = maximum or getattr(settings, 'API_MAX_PAGE_SIZE', 200)
+    try:
+        page_size = int(request.GET.get('page_size', default))
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(page_size, maximum))
+
+
+def paginate_keyset(queryset, cursor=None, page_size=50, ordering=('-created_at', '-id')):
+    """
+    Retourne une page ordonnée par `ordering` et le curseur suivant. La
+    dernière clé doit être unique (id) pour départager les égalités.
+
+    La position est passée dans un WHERE au lieu d'un OFFSET : chaque
+    page coûte la même requête quelle que soit la taille de la table.
+    """
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        fields = [ordering_field(queryset.model, key) for key in ordering]
+        queryset = queryset.filter(keyset_filter(ordering, decode_cursor(cursor, fields)))
+
+    # Une ligne de plus pour savoir s'il existe une page suivante
+    rows = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(*(ordering_value(last, key) for key in ordering))
+    return rows, next_cursor
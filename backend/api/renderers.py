@@ -0,0 +1,11 @@
+from rest_framework.renderers import JSONRenderer
+
+from .metrics import serialization_timer
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """JSONRenderer dont la durée compte comme temps de sérialisation"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with serialization_timer():
+            return super().render(data, accepted_media_type, renderer_context)
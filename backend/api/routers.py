@@ -0,0 +1,163 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.functional import empty
+
+
+# ----------------------------
+# Routage primaire / réplicas
+# ----------------------------
+# Les lectures d'une requête partent vers un réplica seulement si :
+# - la vue figure dans REPLICA_READ_VIEWS (api/urls.py) ;
+# - la requête n'a encore rien écrit ;
+# - l'utilisateur n'a pas écrit depuis moins de DB_STICKY_SECONDS
+#   (fenêtre « collante » : il relit ses propres écritures sur le primaire) ;
+# - le code ne l'a pas épinglée au primaire (`primary_reads()`, pour ce
+#   qui part dans un cache partagé ou exige des lectures à jour).
+# Tout le reste (écritures, vues hors liste, code hors requête) va au
+# primaire 'default'.
+#
+# Le marqueur de la fenêtre collante vit dans le cache DB_STICKY_CACHE_ALIAS,
+# qui doit être partagé par les workers (voir api/checks.py) : sinon la
+# requête suivante, servie par un autre worker, lirait un réplica en retard.
+
+PRIMARY = 'default'
+
+# Lus juste après leur création (login, session) : jamais sur un réplica
+PRIMARY_ONLY_MODELS = {'authtoken.token', 'sessions.session', 'api.idempotencykey'}
+
+
+class RoutingState:
+    def __init__(self, request):
+        self.request = request
+        self.view = None
+        self.wrote = False
+        self.pinned = 0
+        self._sticky = None
+
+    def is_sticky(self):
+        if self._sticky is None:
+            user = getattr(self.request, 'user', None)
+            if getattr(user, '_wrapped', None) is empty:
+                # Utilisateur de session pas encore chargé (sa lecture est en
+                # cours) : pas de réponse à mémoriser, lecture sur le primaire
+                return True
+            self._sticky = bool(
+                user is not None and user.is_authenticated
+                and sticky_cache().get(sticky_key(user.pk))
+            )
+        return self._sticky
+
+
+_state = ContextVar('api_db_routing', default=None)
+
+
+def sticky_key(user_id):
+    return f'db:sticky:{user_id}'
+
+
+def sticky_cache():
+    return caches[getattr(settings, 'DB_STICKY_CACHE_ALIAS', 'default')]
+
+
+def sticky_timeout():
+    return getattr(settings, 'DB_STICKY_SECONDS', 5)
+
+
+def get_replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def get_replica_read_views():
+    # Déclarées à côté des routes, dans api/urls.py
+    from .urls import REPLICA_READ_VIEWS
+    return REPLICA_READ_VIEWS
+
+
+def start_request(request):
+    """Ouvre l'état de routage d'une requête ; retourne le jeton pour end_request"""
+    return _state.set(RoutingState(request))
+
+
+def set_view(view_name):
+    state = _state.get()
+    if state is not None:
+        state.view = view_name
+
+
+@contextmanager
+def primary_reads():
+    """Lectures du bloc sur le primaire, quelle que soit la vue"""
+    state = _state.get()
+    if state is None:
+        # Hors requête : tout va déjà au primaire
+        yield
+        return
+    state.pinned += 1
+    try:
+        yield
+    finally:
+        state.pinned -= 1
+
+
+def _close(token):
+    """Ferme l'état ; le retourne si la requête a écrit"""
+    state = _state.get()
+    _state.reset(token)
+    return state if state is not None and state.wrote else None
+
+
+def end_request(token):
+    """Ferme l'état ; après une écriture, ouvre la fenêtre collante de l'utilisateur"""
+    state = _close(token)
+    if state is None:
+        return
+    user = getattr(state.request, 'user', None)
+    if user is not None and user.is_authenticated:
+        sticky_cache().set(sticky_key(user.pk), True, timeout=sticky_timeout())
+
+
+async def aend_request(token):
+    """Variante asynchrone de end_request"""
+    state = _close(token)
+    if state is None:
+        return
+    user = getattr(state.request, 'user', None)
+    if getattr(user, '_wrapped', None) is empty:
+        # Utilisateur de session jamais chargé : lecture async
+        user = await state.request.auser()
+    if user is not None and user.is_authenticated:
+        await sticky_cache().aset(sticky_key(user.pk), True, timeout=sticky_timeout())
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = get_replicas()
+        state = _state.get()
+        if (
+            not replicas
+            or state is None
+            or state.wrote
+            or state.pinned
+            or model._meta.label_lower in PRIMARY_ONLY_MODELS
+            or state.view not in get_replica_read_views()
+            or state.is_sticky()
+        ):
+            return PRIMARY
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primaire et réplicas portent les mêmes données
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return True
@@ -0,0 +1,100 @@
+import re
+import unicodedata
+
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+
+# ----------------------------
+# Normalisation du texte de recherche
+# ----------------------------
+# Arabe : les signes diacritiques (tachkil) et la hamza portée sont des
+# marques combinantes après décomposition NFKD, retirées comme les
+# accents latins ; les variantes restantes sont ramenées à une forme.
+ARABIC_FOLDING = str.maketrans({
+    '\u0671': '\u0627',  # ٱ alef wasla -> ا
+    '\u0649': '\u064a',  # ى alef maksura -> ي
+    '\u0629': '\u0647',  # ة ta marbuta -> ه
+    '\u0640': None,      # ـ tatweel
+})
+# Chiffres arabes-indiens (٠-٩, ۰-۹) -> chiffres ASCII
+ARABIC_FOLDING.update({zero + n: str(n) for zero in (0x0660, 0x06F0) for n in range(10)})
+NON_WORD = re.compile(r'[^\w]+')
+PHONE_QUERY = re.compile(r'^[\d\s+\-.()/]+$')
+
+SEARCH_TABLE = 'api_customuser_search'
+
+# Indicatif de la Mauritanie : les numéros sont aussi indexés sans lui
+# (numéro national, ex. 36123456 pour +22236123456)
+COUNTRY_CODE = '222'
+
+
+def normalize_search_text(value):
+    """Minuscules, sans diacritiques ni variantes d'alef ; mots séparés par un espace"""
+    text = unicodedata.normalize('NFKD', str(value or ''))
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    text = text.translate(ARABIC_FOLDING).casefold()
+    return ' '.join(NON_WORD.sub(' ', text).replace('_', ' ').split())
+
+
+def phone_digits(value):
+    digits = re.sub(r'\D', '', str(value or '').translate(ARABIC_FOLDING))
+    return digits[2:] if digits.startswith('00') else digits
+
+
+def national_number(digits):
+    """Numéro sans l'indicatif du pays ('' s'il ne commence pas par COUNTRY_CODE)"""
+    return digits[len(COUNTRY_CODE):] if digits.startswith(COUNTRY_CODE) else ''
+
+
+def build_search_text(user):
+    """
+    Colonne search_text d'un utilisateur : noms, username, chiffres du
+    téléphone et numéro national
+    """
+    parts = [user.first_name, user.last_name, user.username]
+    text = normalize_search_text(' '.join(part or '' for part in parts))
+    digits = phone_digits(user.phone_number)
+    return ' '.join(part for part in (text, digits, national_number(digits)) if part)
+
+
+def query_tokens(query):
+    """Mots de la recherche (un numéro de téléphone forme un seul mot)"""
+    if query and PHONE_QUERY.match(query):
+        digits = phone_digits(query)
+        if query.lstrip().startswith(('+', '00')):
+            # Forme internationale : cherchée sur le numéro national
+            digits = national_number(digits) or digits
+        return [digits] if digits else []
+    return normalize_search_text(query).split()
+
+
+# ----------------------------
+# Recherche par préfixe
+# ----------------------------
+def search_users(queryset, query):
+    """
+    Filtre `queryset` (CustomUser) : chaque mot de `query` doit être le
+    début d'un mot du nom, du username ou du téléphone.
+
+    SQLite : table FTS5 (index de préfixes, tenue à jour par triggers).
+    PostgreSQL : LIKE sur search_text, servi par l'index trigramme.
+    Table, triggers et index sont créés par la migration 0010 ; une
+    migration SQLite qui reconstruit api_customuser supprime les
+    triggers et doit les recréer.
+    """
+    tokens = query_tokens(query)
+    if not tokens:
+        return queryset
+
+    if connections[queryset.db].vendor == 'sqlite':
+        match = ' '.join('"%s"*' % token.replace('"', '""') for token in tokens)
+        return queryset.filter(id__in=RawSQL(
+            f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s', [match]
+        ))
+
+    for token in tokens:
+        queryset = queryset.filter(Q(search_text__startswith=token) | Q(search_text__contains=' ' + token))
+    return queryset
+
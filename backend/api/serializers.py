@@ -1,11 +1,43 @@
+from urllib.parse import urljoin
+
+from django.core.files.storage import FileSystemStorage
+from django.db import models
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce, NullIf
+from django.utils.encoding import filepath_to_uri
 from rest_framework import serializers
-from .models import CustomUser, HennaType, Order
+from rest_framework.validators import UniqueValidator
+
+from .availability import get_calendar
+from .cache import get_request_language
+from .metrics import serialization_timer
+from .models import CustomUser, HennaType, Order, normalize_phone_number
+
+
+# ----------------------------
+# Champ numéro de téléphone (forme canonique)
+# ----------------------------
+class PhoneNumberField(serializers.CharField):
+    """Normalise avant les validateurs : l'unicité porte sur la forme canonique"""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('max_length', 17)
+        kwargs.setdefault('validators', [
+            CustomUser.phone_regex,
+            UniqueValidator(queryset=CustomUser.objects.all()),
+        ])
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        value = super().to_internal_value(data)
+        return normalize_phone_number(value) or value
 
 # ----------------------------
 # Serializer pour l'inscription
 # ----------------------------
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, min_length=6)
+    phone_number = PhoneNumberField()
     
     class Meta:
         model = CustomUser
@@ -24,10 +56,31 @@ class RegisterSerializer(serializers.ModelSerializer):
         return user
 
 
+# ----------------------------
+# Sérialisation chronométrée
+# ----------------------------
+# TimedJSONRenderer ne mesure que json.dumps : le gros du travail
+# (to_representation, évalué par `.data`) est mesuré ici.
+
+class TimedDataMixin:
+    """`.data` compte comme temps de sérialisation de la requête"""
+
+    @property
+    def data(self):
+        with serialization_timer():
+            return super().data
+
+
+class TimedListSerializer(TimedDataMixin, serializers.ListSerializer):
+    pass
+
+
 # ----------------------------
 # Serializer pour le profil utilisateur
 # ----------------------------
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedDataMixin, serializers.ModelSerializer):
+    phone_number = PhoneNumberField()
+    
     class Meta:
         model = CustomUser
         fields = [
@@ -36,22 +89,122 @@ class UserSerializer(serializers.ModelSerializer):
             'language_preference', 'created_at'
         ]
         read_only_fields = ['id', 'username', 'created_at']
+        list_serializer_class = TimedListSerializer
+
+
+# ----------------------------
+# Serializer pour l'annuaire admin des clients
+# ----------------------------
+class ClientSerializer(UserSerializer):
+    """Profil et résumé des commandes (à charger avec select_related('order_summary'))"""
+    order_count = serializers.IntegerField(source='order_summary.order_count', read_only=True)
+    last_order_at = serializers.DateTimeField(source='order_summary.last_order_at', read_only=True)
+    lifetime_spend = serializers.DecimalField(
+        source='order_summary.lifetime_spend',
+        max_digits=12,
+        decimal_places=2,
+        read_only=True
+    )
+    
+    class Meta(UserSerializer.Meta):
+        fields = UserSerializer.Meta.fields + ['order_count', 'last_order_at', 'lifetime_spend']
 
 
 # ----------------------------
 # Serializer pour les types de henné
 # ----------------------------
-class HennaTypeSerializer(serializers.ModelSerializer):
+def localized(column, lang):
+    """Colonne localisée calculée en SQL (repli sur l'arabe si vide)"""
+    if lang == 'fr':
+        text = models.TextField()
+        return Coalesce(
+            NullIf(f'{column}_fr', Value(''), output_field=text),
+            f'{column}_ar',
+            output_field=text,
+        )
+    return F(f'{column}_ar')
+
+
+def image_url_builder(request, storage):
+    """
+    Retourne une fonction nom -> URL absolue. Pour un stockage local, la
+    base absolue des médias est calculée une seule fois.
+    """
+    if request is None:
+        return lambda name: storage.url(name) if name else None
+    if isinstance(storage, FileSystemStorage):
+        base = request.build_absolute_uri(storage.base_url)
+        return lambda name: urljoin(base, filepath_to_uri(name).lstrip('/')) if name else None
+    return lambda name: request.build_absolute_uri(storage.url(name)) if name else None
+
+
+def srcset(variants, image_url):
+    """{format: {largeur: chemin}} -> {format: {largeur: URL}}"""
+    return {
+        ext: {width: image_url(path) for width, path in paths.items()}
+        for ext, paths in (variants or {}).items()
+    }
+
+
+class HennaTypeListSerializer(TimedListSerializer):
+    """
+    Mode compilé de HennaTypeSerializer(many=True) sur un queryset : la
+    langue et la base des médias sont résolues une fois par requête, seules
+    les colonnes de la langue demandée sont lues, puis chaque ligne passe
+    par un plan de champs précalculé.
+    """
+    def to_representation(self, data):
+        if not isinstance(data, models.QuerySet):
+            return super().to_representation(data)
+        rows, render = self.compile(data)
+        return [render(row) for row in rows]
+
+    async def ato_representation(self, queryset):
+        """Variante asynchrone (vues ASGI) : même plan, lecture via l'ORM async"""
+        rows, render = self.compile(queryset)
+        with serialization_timer():
+            return [render(row) async for row in rows]
+
+    def compile(self, queryset):
+        """Retourne (queryset .values() localisé, fonction ligne -> dict)"""
+        request = self.context.get('request')
+        lang = get_request_language(request) if request else 'ar'
+        image_url = image_url_builder(request, HennaType._meta.get_field('image').storage)
+        price = self.child.fields['price'].to_representation
+
+        rows = queryset.values(
+            'id', 'image', 'image_variants', 'price', 'is_available',
+            localized_name=localized('name', lang),
+            localized_description=localized('description', lang),
+        )
+
+        def render(row):
+            return {
+                'id': row['id'],
+                'name': row['localized_name'],
+                'description': row['localized_description'],
+                'image_url': image_url(row['image']),
+                'image_srcset': srcset(row['image_variants'], image_url),
+                'price': price(row['price']),
+                'is_available': row['is_available'],
+            }
+
+        return rows, render
+
+
+class HennaTypeSerializer(TimedDataMixin, serializers.ModelSerializer):
     name = serializers.SerializerMethodField()
     description = serializers.SerializerMethodField()
     image_url = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
     
     class Meta:
         model = HennaType
         fields = [
-            'id', 'name', 'description', 'image_url',
+            'id', 'name', 'description', 'image_url', 'image_srcset',
             'price', 'is_available'
         ]
+        list_serializer_class = HennaTypeListSerializer
     
     def get_name(self, obj):
         request = self.context.get('request')
@@ -74,21 +227,19 @@ class HennaTypeSerializer(serializers.ModelSerializer):
         if obj.image:
             return request.build_absolute_uri(obj.image.url)
         return None
+    
+    def get_image_srcset(self, obj):
+        request = self.context.get('request')
+        image_url = image_url_builder(request, obj.image.storage)
+        return srcset(obj.image_variants, image_url)
 
 
 # ----------------------------
 # Serializer pour les commandes
 # ----------------------------
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(TimedDataMixin, serializers.ModelSerializer):
     client_name = serializers.CharField(source='client.first_name', read_only=True)
     client_phone = serializers.CharField(source='client.phone_number', read_only=True)
-    henna_name = serializers.CharField(source='henna_type.name_ar', read_only=True)
-    henna_price = serializers.DecimalField(
-        source='henna_type.price',
-        max_digits=10,
-        decimal_places=2,
-        read_only=True
-    )
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     
     class Meta:
@@ -97,9 +248,32 @@ class OrderSerializer(serializers.ModelSerializer):
             'id', 'client', 'client_name', 'client_phone',
             'henna_type', 'henna_name', 'henna_price',
             'status', 'status_display', 'notes', 'address',
-            'appointment_date', 'created_at', 'updated_at'
+            'appointment_date', 'version', 'created_at', 'updated_at'
+        ]
+        read_only_fields = [
+            'id', 'client', 'henna_name', 'henna_price', 'version', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'client', 'created_at', 'updated_at']
+        list_serializer_class = TimedListSerializer
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Charge le client dans la même requête (évite le N+1) ; nom et prix
+        du henné sont lus sur la commande, sans jointure du catalogue.
+        """
+        return queryset.select_related('client').only(
+            'id', 'henna_type', 'henna_name', 'henna_price',
+            'status', 'notes', 'address', 'appointment_date',
+            'version', 'created_at', 'updated_at',
+            'client__first_name', 'client__phone_number',
+        )
+
+
+def validate_slot_is_free(value):
+    """Refuse un rendez-vous sur un créneau déjà confirmé (sans parcourir les commandes)"""
+    if value is not None and not get_calendar().is_free(value):
+        raise serializers.ValidationError("هذا الموعد محجوز، يرجى اختيار وقت آخر")
+    return value
 
 
 # ----------------------------
@@ -110,6 +284,38 @@ class CreateOrderSerializer(serializers.ModelSerializer):
         model = Order
         fields = ['henna_type', 'notes', 'address', 'appointment_date']
     
+    def validate_appointment_date(self, value):
+        return validate_slot_is_free(value)
+    
     def create(self, validated_data):
         validated_data['client'] = self.context['request'].user
-        return super().create(validated_data)
\ No newline at end of file
+        return super().create(validated_data)
+
+
+# ----------------------------
+# Serializer pour la création groupée
+# ----------------------------
+# Plus grand identifiant stockable (entier signé 64 bits, SQLite et bigint) :
+# au-delà, l'ORM lève OverflowError au lieu de « introuvable »
+MAX_DB_ID = 2 ** 63 - 1
+
+
+class BulkOrderItemSerializer(serializers.Serializer):
+    """
+    Une commande d'un lot. Les types de henné sont préchargés par la vue
+    (`context['henna_types']`, un dict issu de in_bulk) : aucune requête
+    par élément.
+    """
+    henna_type = serializers.IntegerField(min_value=1, max_value=MAX_DB_ID)
+    notes = serializers.CharField(required=False, allow_blank=True, default='')
+    address = serializers.CharField(required=False, allow_blank=True, default='')
+    appointment_date = serializers.DateTimeField(required=False, allow_null=True, default=None)
+
+    def validate_henna_type(self, value):
+        henna_type = self.context['henna_types'].get(value)
+        if henna_type is None:
+            raise serializers.ValidationError(f'Invalid pk "{value}" - object does not exist.')
+        return henna_type
+
+    def validate_appointment_date(self, value):
+        return validate_slot_is_free(value)
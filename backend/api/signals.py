@@ -0,0 +1,144 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token as AuthToken
+
+from . import availability
+from .authentication import token_cache
+from .cache import bump_catalog_version
+from .db import configure_sqlite
+from .images import schedule_variants
+from .models import (
+    ClientSummary, CustomUser, DailyOrderRollup, DashboardStats, HennaType, Order, OrderTombstone,
+)
+
+
+# ----------------------------
+# Compteurs du dashboard : suppressions
+# ----------------------------
+# Les créations et changements passent par save() ; les suppressions
+# (y compris en cascade) passent par ces signaux, émis par le collector
+# dans la transaction de la suppression.
+
+@receiver(post_delete, sender=Order)
+def order_deleted(sender, instance, using, **kwargs):
+    status = instance.loaded_value('status', instance.status)
+    DashboardStats.record_order(status, None, using=using)
+
+
+@receiver(post_delete, sender=CustomUser)
+def user_deleted(sender, instance, using, **kwargs):
+    if not instance.loaded_value('is_staff', instance.is_staff):
+        DashboardStats.bump(using=using, total_clients=-1)
+
+
+# ----------------------------
+# Résumés par client et agrégats quotidiens
+# ----------------------------
+# Suppression d'une commande : la dernière date de commande ne se déduit
+# pas d'un delta, le résumé du client est recalculé (un UPDATE, sans
+# création de ligne : le client peut être supprimé dans la même cascade).
+
+@receiver(post_delete, sender=Order)
+def order_summary_deleted(sender, instance, using, **kwargs):
+    ClientSummary.refresh([instance.client_id], using=using)
+
+
+@receiver(post_delete, sender=Order)
+def order_rollup_deleted(sender, instance, using, **kwargs):
+    DailyOrderRollup.record([(instance.created_at, instance.loaded_rollup_bucket(), None)], using=using)
+
+
+# ----------------------------
+# Synchronisation différentielle de my_orders_api
+# ----------------------------
+# Une commande supprimée laisse une trace datée ; celles d'un client
+# supprimé (écrites pendant la cascade, avant lui) sont effacées avec lui.
+
+@receiver(post_delete, sender=Order)
+def order_tombstone(sender, instance, using, **kwargs):
+    OrderTombstone._default_manager.db_manager(using).create(
+        order_id=instance.pk, client_id=instance.client_id
+    )
+
+
+@receiver(post_delete, sender=CustomUser)
+def user_tombstones_deleted(sender, instance, using, **kwargs):
+    OrderTombstone._default_manager.db_manager(using).filter(client_id=instance.pk).delete()
+
+
+# ----------------------------
+# Cache du catalogue : invalidation
+# ----------------------------
+# Couvre aussi les modifications `list_editable` de HennaTypeAdmin, qui
+# passent par save(). La version n'est incrémentée qu'après le commit,
+# pour qu'une lecture concurrente ne remette pas l'ancien état en cache.
+
+@receiver(post_save, sender=HennaType)
+@receiver(post_delete, sender=HennaType)
+def henna_type_changed(sender, using, **kwargs):
+    transaction.on_commit(bump_catalog_version, using=using)
+
+
+# ----------------------------
+# Variantes d'images
+# ----------------------------
+
+@receiver(post_save, sender=HennaType)
+def henna_type_image_changed(sender, instance, created, using, raw=False, **kwargs):
+    if raw:
+        return
+    image_name = instance.image.name if instance.image else ''
+    if image_name and (created or image_name != instance.loaded_value('image')):
+        pk = instance.pk
+        transaction.on_commit(lambda: schedule_variants(pk), using=using)
+    instance.remember_loaded_values()
+
+
+# ----------------------------
+# Cache d'authentification par token
+# ----------------------------
+# logout_api et change_password_api suppriment les tokens ; toute
+# modification de l'utilisateur (désactivation, langue...) rafraîchit
+# son instantané.
+
+@receiver(post_delete, sender=AuthToken)
+def auth_token_deleted(sender, instance, **kwargs):
+    token_cache.invalidate(instance.key)
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def user_changed(sender, instance, **kwargs):
+    token_cache.invalidate_user(instance.pk)
+
+
+# ----------------------------
+# Calendrier des rendez-vous
+# ----------------------------
+
+@receiver(post_save, sender=Order)
+def order_slot_changed(sender, instance, using, **kwargs):
+    order_id, status, appointment_date = instance.pk, instance.status, instance.appointment_date
+    transaction.on_commit(
+        lambda: availability.record_order(order_id, status, appointment_date),
+        using=using
+    )
+
+
+@receiver(post_delete, sender=Order)
+def order_slot_released(sender, instance, using, **kwargs):
+    order_id = instance.pk
+    transaction.on_commit(
+        lambda: availability.record_order(order_id, None, None),
+        using=using
+    )
+
+
+# ----------------------------
+# Profil SQLite : PRAGMAs à l'ouverture d'une connexion
+# ----------------------------
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    configure_sqlite(connection)
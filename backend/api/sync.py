@@ -0,0 +1,66 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Order, OrderTombstone
+
+
+# ----------------------------
+# Synchronisation différentielle des commandes d'un client
+# ----------------------------
+# Le client envoie le `watermark` de sa synchronisation précédente et ne
+# reçoit que les commandes modifiées depuis (updated_at, index
+# order_client_updated_idx) et les identifiants des commandes supprimées.
+#
+# Le nouveau watermark est pris avant la lecture, moins une marge : une
+# transaction ouverte avant la lecture mais validée après porte un
+# updated_at antérieur, elle est renvoyée à la synchronisation suivante
+# au lieu d'être perdue. La marge (ORDER_SYNC_OVERLAP_SECONDS) doit donc
+# dépasser l'écart entre l'horodatage d'une écriture, pris dans sa
+# transaction, et sa validation. La lecture se fait sur le primaire (voir
+# my_orders_api). Le client applique les changements par id, les doublons
+# sont sans effet.
+
+class InvalidWatermark(ValueError):
+    """Watermark illisible"""
+
+
+def parse_watermark(value):
+    """'' -> None (première synchronisation) ; sinon datetime aware"""
+    if not value:
+        return None
+    try:
+        # ValueError : format valide mais date impossible (mois 13...)
+        since = parse_datetime(value)
+    except ValueError:
+        since = None
+    if since is None:
+        raise InvalidWatermark(value)
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+
+def order_changes(user, since):
+    """
+    Retourne (commandes, ids supprimés, nouveau watermark, full). `full` :
+    liste complète (première synchronisation ou watermark plus ancien que
+    la conservation des traces de suppression) ; le client remplace alors
+    son cache au lieu de le compléter.
+    """
+    now = timezone.now()
+    watermark = now - timedelta(seconds=getattr(settings, 'ORDER_SYNC_OVERLAP_SECONDS', 5))
+    retention = timedelta(days=getattr(settings, 'ORDER_TOMBSTONE_RETENTION_DAYS', 90))
+
+    orders = Order.objects.filter(client=user)
+    if since is None or since < now - retention:
+        return orders, [], watermark, True
+
+    orders = orders.filter(updated_at__gt=since).order_by('updated_at', 'id')
+    deleted = list(
+        OrderTombstone.objects.filter(client=user, deleted_at__gt=since)
+        .values_list('order_id', flat=True)
+    )
+    return orders, deleted, watermark, False
@@ -0,0 +1,37 @@
+import logging
+import os
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+# ----------------------------
+# Lanceur de tests
+# ----------------------------
+class HanTestRunner(DiscoverRunner):
+    """
+    `manage.py test` (TEST_RUNNER) : budgets de requêtes stricts, aucun
+    réplica actif (les tests de routage l'activent au cas par cas), hachage
+    MD5 des mots de passe (la politique réglée garde ses propres tests) et
+    logs 'api' limités aux avertissements sauf HAN_LOG_LEVEL explicite.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._test_settings = override_settings(
+            QUERY_BUDGET_STRICT=True,
+            DATABASE_REPLICAS=[],
+            # Chaque create_user/login paierait sinon le coût réglé de production
+            PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher', *settings.PASSWORD_HASHERS],
+        )
+        self._test_settings.enable()
+        api_logger = logging.getLogger('api')
+        self._api_log_level = api_logger.level
+        if 'HAN_LOG_LEVEL' not in os.environ:
+            api_logger.setLevel(logging.WARNING)
+
+    def teardown_test_environment(self, **kwargs):
+        logging.getLogger('api').setLevel(self._api_log_level)
+        self._test_settings.disable()
+        super().teardown_test_environment(**kwargs)
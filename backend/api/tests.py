@@ -1,3 +1,1404 @@
-from django.test import TestCase
+import csv
+import json
+import logging
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token as AuthToken
+from rest_framework.test import APIClient, APIRequestFactory
+
+from .authentication import TokenCache, token_cache
+from .availability import SlotCalendar, get_calendar, reset_calendar
+from .backends import PhoneBackend
+from .cache import get_catalog_cache
+from .checks import check_sticky_cache
+from .logs import JsonFormatter, QueueLogHandler, redact, should_log
+from .management.commands.bench_api import Command as BenchApiCommand, api_url_names, build_routes
+from .metrics import QueryBudgetExceeded, registry as metrics_registry
+from .middleware import InstrumentationMiddleware
+from .models import (
+    ClientSummary, CustomUser, DailyOrderRollup, DashboardStats, HennaType, IdempotencyKey, Order,
+    OrderTombstone, normalize_phone_number,
+)
+from .routers import PrimaryReplicaRouter, sticky_key
+from .search import build_search_text, normalize_search_text, query_tokens, search_users
+from .serializers import HennaTypeSerializer
+
+
+# ----------------------------
+# Données de test
+# ----------------------------
+def make_user(username, phone_number, **extra_fields):
+    extra_fields.setdefault('first_name', username)
+    extra_fields.setdefault('last_name', 'Test')
+    extra_fields.setdefault('gender', 'F')
+    extra_fields.setdefault('age', 25)
+    return CustomUser.objects.create_user(
+        username=username,
+        password='secret123',
+        phone_number=phone_number,
+        **extra_fields
+    )
+
+
+def make_henna_type(name_ar='حناء', price='1500.00', **extra_fields):
+    extra_fields.setdefault('description_ar', 'وصف')
+    extra_fields.setdefault('image', 'henna_types/test.jpg')
+    return HennaType.objects.create(
+        name_ar=name_ar,
+        price=Decimal(price),
+        **extra_fields
+    )
+
+
+# ----------------------------
+# Liste admin des commandes (curseur)
+# ----------------------------
+class AdminOrdersListTests(TestCase):
+    def setUp(self):
+        self.admin = make_user('admin', '+22200000001', is_staff=True)
+        self.henna = make_henna_type()
+        self.clients = [
+            make_user(f'client{i}', f'+2221000000{i}') for i in range(3)
+        ]
+        self.orders = [
+            Order.objects.create(client=self.clients[i % 3], henna_type=self.henna)
+            for i in range(7)
+        ]
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+
+    def test_pages_follow_created_at_then_id(self):
+        seen = []
+        cursor = None
+        while True:
+            params = {'page_size': 3}
+            if cursor:
+                params['cursor'] = cursor
+            response = self.api.get('/api/admin/orders/', params)
+            self.assertEqual(response.status_code, 200)
+            seen += [row['id'] for row in response.data['results']]
+            cursor = response.data['next_cursor']
+            if cursor is None:
+                break
+
+        expected = list(
+            Order.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(seen, expected)
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        # 1 requête pour la page (client en jointure, henné figé sur la commande)
+        with self.assertNumQueries(1):
+            response = self.api.get('/api/admin/orders/', {'page_size': 7})
+        self.assertEqual(len(response.data['results']), 7)
+        self.assertEqual(response.data['results'][0]['henna_price'], '1500.00')
+
+    def test_invalid_cursor(self):
+        response = self.api.get('/api/admin/orders/', {'cursor': '!!!'})
+        self.assertEqual(response.status_code, 400)
+
+
+# ----------------------------
+# Plans d'exécution (SQLite)
+# ----------------------------
+class QueryPlanTests(TestCase):
+    """Échoue si une requête des endpoints chauds parcourt toute une table"""
+
+    tables = ('api_order', 'api_hennatype', 'api_customuser', 'api_ordertombstone')
+
+    def setUp(self):
+        get_catalog_cache().clear()
+        self.admin = make_user('admin', '+22200000001', is_staff=True)
+        self.client_user = make_user('client', '+22210000001')
+        henna = make_henna_type()
+        Order.objects.create(client=self.client_user, henna_type=henna)
+        Order.objects.create(client=self.client_user, henna_type=henna, status='completed')
+        self.api = APIClient()
+
+    def query_plans(self, user, url, params=None):
+        """[(ligne d'EXPLAIN QUERY PLAN, SQL)] des SELECT exécutés par la requête"""
+        self.api.force_authenticate(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.api.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+
+        plans = []
+        with connection.cursor() as cursor:
+            for query in ctx.captured_queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT'):
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                plans.extend((row[-1], sql) for row in cursor.fetchall())
+        return plans
+
+    def assert_no_full_scan(self, user, url, params=None):
+        """Pas de parcours de table ; un parcours d'index ordonné (première page) est admis"""
+        for detail, sql in self.query_plans(user, url, params):
+            words = detail.split()
+            if words[0] == 'SCAN' and words[1] in self.tables and 'INDEX' not in detail:
+                self.fail(f'{url}: {detail}\n{sql}')
+
+    def assert_index_search(self, user, url, params=None, table='api_order'):
+        """Requête filtrée ou page suivante : `table` lue par SEARCH (recherche dans l'index)"""
+        plans = [
+            (detail, sql) for detail, sql in self.query_plans(user, url, params)
+            if detail.split()[1] == table
+        ]
+        self.assertTrue(plans, f'{url}: {table} non lue')
+        for detail, sql in plans:
+            if not detail.startswith(f'SEARCH {table} USING'):
+                self.fail(f'{url} {params}: {detail}\n{sql}')
+
+    def next_cursor(self, url, params=None):
+        self.api.force_authenticate(self.admin)
+        return self.api.get(url, {'page_size': 1, **(params or {})}).data['next_cursor']
+
+    def test_my_orders(self):
+        self.assert_index_search(self.client_user, '/api/orders/my-orders/')
+        since = (timezone.now() - timedelta(minutes=1)).isoformat()
+        self.assert_index_search(self.client_user, '/api/orders/my-orders/', {'since': since})
+        self.assert_index_search(
+            self.client_user, '/api/orders/my-orders/', {'since': since}, table='api_ordertombstone'
+        )
+
+    def test_henna_types_list(self):
+        self.assert_no_full_scan(self.client_user, '/api/henna-types/')
+
+    def test_admin_orders_by_status(self):
+        self.assert_index_search(self.admin, '/api/admin/orders/', {'status': 'pending'})
+        self.assert_no_full_scan(self.admin, '/api/admin/orders/')
+        Order.objects.create(client=self.client_user, henna_type=HennaType.objects.get())
+        # Pages suivantes (keyset) : recherche dans l'index, pas de parcours
+        for params in ({}, {'status': 'pending'}):
+            cursor = self.next_cursor('/api/admin/orders/', params)
+            self.assertIsNotNone(cursor)
+            self.assert_index_search(self.admin, '/api/admin/orders/', {**params, 'cursor': cursor})
+
+    def test_admin_clients(self):
+        make_user('client2', '+22210000002')
+        self.assert_no_full_scan(self.admin, '/api/admin/clients/')
+        cursor = self.next_cursor('/api/admin/clients/')
+        self.assert_index_search(self.admin, '/api/admin/clients/', {'cursor': cursor}, table='api_customuser')
+        self.assert_index_search(self.admin, '/api/admin/clients/', {'q': 'cli'}, table='api_customuser')
+
+    def test_admin_dashboard(self):
+        self.assert_no_full_scan(self.admin, '/api/admin/dashboard/')
+
+
+# ----------------------------
+# Compteurs du dashboard
+# ----------------------------
+class DashboardStatsTests(TestCase):
+    def setUp(self):
+        self.admin = make_user('admin', '+22200000001', is_staff=True)
+        self.client_user = make_user('client', '+22210000001')
+        self.henna = make_henna_type()
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+
+    def dashboard(self):
+        return self.api.get('/api/admin/dashboard/').data
+
+    def test_counters_follow_order_writes(self):
+        order = Order.objects.create(client=self.client_user, henna_type=self.henna)
+        Order.objects.create(client=self.client_user, henna_type=self.henna)
+        self.assertEqual(self.dashboard(), {
+            'total_orders': 2, 'pending_orders': 2,
+            'completed_orders': 0, 'total_clients': 1,
+        })
+
+        order = Order.objects.get(pk=order.pk)
+        order.status = 'completed'
+        order.save()
+        order.delete()
+        make_user('client2', '+22210000002')
+        self.assertEqual(self.dashboard(), {
+            'total_orders': 1, 'pending_orders': 1,
+            'completed_orders': 0, 'total_clients': 2,
+        })
+        self.assertEqual(DashboardStats.snapshot(), DashboardStats.compute())
+
+    def test_cascade_delete_and_rebuild(self):
+        Order.objects.create(client=self.client_user, henna_type=self.henna)
+        self.client_user.delete()
+        self.assertEqual(DashboardStats.snapshot(), DashboardStats.compute())
+
+        # Dérive corrigée par la commande de reconstruction
+        DashboardStats.objects.update(total_orders=42)
+        call_command('rebuild_dashboard_counters', stdout=StringIO())
+        self.assertEqual(DashboardStats.snapshot()['total_orders'], 0)
+
+    def test_dashboard_is_one_query(self):
+        Order.objects.create(client=self.client_user, henna_type=self.henna)
+        with self.assertNumQueries(1):
+            self.dashboard()
+
+
+# ----------------------------
+# Cache du catalogue (ETag)
+# ----------------------------
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        get_catalog_cache().clear()
+        self.user = make_user('client', '+22210000001', language_preference='fr')
+        self.henna = make_henna_type(name_fr='Henné')
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def test_etag_and_not_modified(self):
+        response = self.api.get('/api/henna-types/')
+        etag = response['ETag']
+        self.assertEqual(response.data[0]['name'], 'Henné')
+
+        with self.assertNumQueries(0):
+            response = self.api.get('/api/henna-types/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_save_invalidates_catalog(self):
+        etag = self.api.get(f'/api/henna-types/{self.henna.pk}/')['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.henna.price = Decimal('2000.00')
+            self.henna.save()
+
+        response = self.api.get(f'/api/henna-types/{self.henna.pk}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['price'], '2000.00')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_readable_cross_origin(self):
+        # Flutter Web : l'ETag doit être exposé et If-None-Match autorisé
+        response = self.api.get('/api/henna-types/', HTTP_ORIGIN='http://localhost:5000')
+        self.assertIn('etag', response['Access-Control-Expose-Headers'].lower())
+        response = self.api.options(
+            '/api/henna-types/', HTTP_ORIGIN='http://localhost:5000',
+            HTTP_ACCESS_CONTROL_REQUEST_METHOD='GET',
+            HTTP_ACCESS_CONTROL_REQUEST_HEADERS='if-none-match',
+        )
+        self.assertIn('if-none-match', response['Access-Control-Allow-Headers'])
+
+    def test_unknown_type_is_404(self):
+        response = self.api.get('/api/henna-types/999/')
+        self.assertEqual(response.status_code, 404)
+
+
+# ----------------------------
+# Serializer compilé du catalogue
+# ----------------------------
+class HennaTypeListSerializerTests(TestCase):
+    def setUp(self):
+        make_henna_type('أ', name_fr='A', description_fr='Desc A')
+        make_henna_type('ب', description_ar='وصف ب')  # pas de traduction
+        self.factory = APIRequestFactory()
+
+    def test_matches_per_object_serializer(self):
+        for lang in ('ar', 'fr'):
+            request = self.factory.get('/api/henna-types/')
+            phone_number = '+22210000001' if lang == 'ar' else '+22210000002'
+            request.user = make_user(f'user_{lang}', phone_number, language_preference=lang)
+            context = {'request': request}
+            queryset = HennaType.objects.all()
+            compiled = HennaTypeSerializer(queryset, many=True, context=context).data
+            legacy = HennaTypeSerializer(list(queryset), many=True, context=context).data
+            self.assertEqual(list(compiled), [dict(row) for row in legacy])
+
+
+# ----------------------------
+# Variantes d'images
+# ----------------------------
+class ImageVariantsTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(
+            MEDIA_ROOT=self.media_root,
+            IMAGE_VARIANT_WIDTHS=[320, 640, 4000],
+            IMAGE_VARIANTS_ASYNC=False,
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def upload(self, color):
+        from PIL import Image
+        buffer = BytesIO()
+        Image.new('RGB', (1200, 800), color).save(buffer, 'PNG')
+        return SimpleUploadedFile('henna.png', buffer.getvalue(), content_type='image/png')
+
+    def test_variants_generated_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            henna = make_henna_type(image=self.upload('red'))
+        henna.refresh_from_db()
+
+        widths = ['320', '640', '1200']  # pas d'agrandissement
+        self.assertEqual(sorted(henna.image_variants['webp'], key=int), widths)
+        for ext in ('webp', 'jpeg'):
+            for path in henna.image_variants[ext].values():
+                self.assertTrue(henna.image.storage.exists(path))
+                self.assertIn('/variants/', path)
+
+        # Même contenu -> mêmes chemins (adressage par contenu)
+        with self.captureOnCommitCallbacks(execute=True):
+            other = make_henna_type(image=self.upload('red'))
+        other.refresh_from_db()
+        self.assertEqual(other.image_variants, henna.image_variants)
+
+    def test_srcset_exposed_and_backfill(self):
+        henna = make_henna_type(image=self.upload('blue'))  # callbacks non exécutés
+        self.assertEqual(HennaType.objects.get(pk=henna.pk).image_variants, {})
+
+        call_command('backfill_image_variants', stdout=StringIO())
+
+        request = APIRequestFactory().get('/api/henna-types/')
+        request.user = make_user('client', '+22210000001')
+        data = HennaTypeSerializer(HennaType.objects.all(), many=True, context={'request': request}).data
+        self.assertTrue(data[0]['image_srcset']['webp']['320'].startswith('http://testserver/'))
+
+
+# ----------------------------
+# Cache d'authentification
+# ----------------------------
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.user = make_user('client', '+22210000001')
+        self.token = AuthToken.objects.create(user=self.user)
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_steady_state_has_no_auth_query(self):
+        self.assertEqual(self.api.get('/api/profile/').status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.api.get('/api/profile/')
+        self.assertEqual(response.data['username'], 'client')
+        self.assertEqual(token_cache.stats()['hits'], 1)
+        self.assertEqual(token_cache.stats()['misses'], 1)
+
+    def test_logout_invalidates(self):
+        self.api.get('/api/profile/')
+        self.api.post('/api/logout/')
+        self.assertEqual(self.api.get('/api/profile/').status_code, 401)
+
+    def test_deactivation_invalidates(self):
+        self.api.get('/api/profile/')
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.api.get('/api/profile/').status_code, 401)
+
+    def test_revocation_reaches_other_workers(self):
+        # Deux caches locaux (deux workers) partageant l'alias de révocation
+        worker_a = TokenCache(ttl=60, revocations='default')
+        worker_b = TokenCache(ttl=60, revocations='default')
+        for worker in (worker_a, worker_b):
+            worker.set('k1', self.user, None)
+            worker.set('k2', self.user, None)
+        worker_a.invalidate('k1')
+        self.assertIsNone(worker_b.get('k1'))
+        self.assertIsNotNone(worker_b.get('k2'))
+        worker_a.invalidate_user(self.user.pk)
+        self.assertIsNone(worker_b.get('k2'))
+
+    def test_lru_bound(self):
+        cache = TokenCache(max_size=2, ttl=60)
+        for key in ('a', 'b', 'c'):
+            cache.set(key, self.user, None)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['size'], 2)
+
+
+# ----------------------------
+# Connexion par username ou téléphone
+# ----------------------------
+class PhoneBackendTests(TestCase):
+    def setUp(self):
+        self.user = make_user('amina', '00222 22-33-44-55')
+        self.backend = PhoneBackend()
+
+    def test_phone_is_stored_canonical(self):
+        self.assertEqual(self.user.phone_number, '+22222334455')
+        self.assertEqual(normalize_phone_number('22222334455'), '+22222334455')
+        self.assertIsNone(normalize_phone_number('amina'))
+
+    def test_single_query_for_username_and_phone(self):
+        for identifier in ('amina', '+222 22 33 44 55'):
+            with self.assertNumQueries(1):
+                user = self.backend.authenticate(None, username=identifier, password='secret123')
+            self.assertEqual(user, self.user)
+
+    def test_unknown_identifier_still_hashes(self):
+        with mock.patch.object(CustomUser, 'set_password') as set_password:
+            self.assertIsNone(self.backend.authenticate(None, username='nobody', password='x'))
+        set_password.assert_called_once_with('x')
+
+    def test_register_rejects_duplicate_in_other_format(self):
+        response = APIClient().post('/api/register/', {
+            'username': 'other', 'password': 'secret123', 'first_name': 'O',
+            'last_name': 'T', 'phone_number': '+222-22-33-44-55', 'gender': 'F', 'age': 30,
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('phone_number', response.data['details'])
+
+
+# ----------------------------
+# Politique de hachage
+# ----------------------------
+@override_settings(PASSWORD_HASHERS=['api.hashers.TunedPBKDF2PasswordHasher'])
+class PasswordHashingPolicyTests(TestCase):
+    def policy(self, iterations):
+        return override_settings(PASSWORD_HASHING={'PBKDF2': {'ITERATIONS': iterations}})
+
+    def test_outdated_hash_is_upgraded_on_login(self):
+        with self.policy(1000):
+            user = make_user('amina', '+22222334455')
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$1000$'))
+
+        with self.policy(2000):
+            self.assertEqual(
+                PhoneBackend().authenticate(None, username='amina', password='secret123'),
+                user
+            )
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$2000$'))
+        self.assertTrue(user.check_password('secret123'))
+
+
+# ----------------------------
+# Création groupée de commandes
+# ----------------------------
+class BulkCreateOrdersTests(TestCase):
+    def setUp(self):
+        self.user = make_user('agent', '+22210000001')
+        self.henna = make_henna_type()
+        self.other = make_henna_type('حناء 2')
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def post(self, orders, **headers):
+        return self.api.post('/api/orders/bulk-create/', {'orders': orders}, format='json', **headers)
+
+    def test_creates_all_in_fixed_queries(self):
+        orders = [{'henna_type': self.henna.pk, 'notes': f'invitée {i}'} for i in range(15)]
+        orders.append({'henna_type': str(self.other.pk)})
+        # in_bulk, savepoint, bulk_create, compteurs, résumé du client,
+        # agrégats quotidiens, fin du savepoint
+        with self.assertNumQueries(7):
+            response = self.post(orders)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 16)
+        self.assertEqual(Order.objects.filter(client=self.user).count(), 16)
+        self.assertEqual(DashboardStats.snapshot()['pending_orders'], 16)
+        self.assertEqual(ClientSummary.objects.get(pk=self.user.pk).order_count, 16)
+        self.assertEqual(response.data['results'][15]['order']['henna_type'], self.other.pk)
+
+    def test_per_item_errors(self):
+        response = self.post([{'henna_type': self.henna.pk}, {'henna_type': 999}, {}])
+        self.assertEqual(response.status_code, 207)
+        results = response.data['results']
+        self.assertTrue(results[0]['created'])
+        self.assertIn('henna_type', results[1]['errors'])
+        self.assertIn('henna_type', results[2]['errors'])
+
+    def test_out_of_range_henna_type_is_an_item_error(self):
+        response = self.post([{'henna_type': self.henna.pk}, {'henna_type': 10 ** 20}, {'henna_type': -1}])
+        self.assertEqual(response.status_code, 207)
+        self.assertTrue(response.data['results'][0]['created'])
+        self.assertIn('henna_type', response.data['results'][1]['errors'])
+        self.assertIn('henna_type', response.data['results'][2]['errors'])
+
+    def test_idempotency_key_replays(self):
+        orders = [{'henna_type': self.henna.pk}] * 3
+        first = self.post(orders, HTTP_IDEMPOTENCY_KEY='wedding-42')
+        second = self.post(orders, HTTP_IDEMPOTENCY_KEY='wedding-42')
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(Order.objects.count(), 3)
+
+        other = self.post(orders[:1], HTTP_IDEMPOTENCY_KEY='wedding-42')
+        self.assertEqual(other.status_code, 422)
+
+    def test_prune_idempotency_keys(self):
+        orders = [{'henna_type': self.henna.pk}]
+        self.post(orders, HTTP_IDEMPOTENCY_KEY='old')
+        self.post(orders, HTTP_IDEMPOTENCY_KEY='recent')
+        IdempotencyKey.objects.filter(key='old').update(created_at=timezone.now() - timedelta(hours=25))
+        call_command('prune_idempotency_keys', stdout=StringIO())
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['recent'])
+
+
+# ----------------------------
+# Calendrier des rendez-vous
+# ----------------------------
+class AvailabilityTests(TestCase):
+    def setUp(self):
+        reset_calendar()
+        self.addCleanup(reset_calendar)
+        self.user = make_user('client', '+22210000001')
+        self.henna = make_henna_type()
+        self.day = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=2)
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def book(self, hour, status='confirmed'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Order.objects.create(
+                client=self.user, henna_type=self.henna, status=status,
+                appointment_date=self.day + timedelta(hours=hour),
+            )
+
+    def test_calendar_intervals(self):
+        calendar = SlotCalendar(timedelta(hours=1))
+        calendar.load([(1, self.day + timedelta(hours=10)), (2, self.day + timedelta(hours=12))])
+        free = calendar.free_intervals(self.day + timedelta(hours=9), self.day + timedelta(hours=14))
+        self.assertEqual(free, [
+            (self.day + timedelta(hours=9), self.day + timedelta(hours=10)),
+            (self.day + timedelta(hours=11), self.day + timedelta(hours=12)),
+            (self.day + timedelta(hours=13), self.day + timedelta(hours=14)),
+        ])
+        calendar.apply(1, None)
+        self.assertTrue(calendar.is_free(self.day + timedelta(hours=10, minutes=30)))
+        self.assertFalse(calendar.is_free(self.day + timedelta(hours=11, minutes=30)))
+
+    def test_availability_endpoint_follows_order_changes(self):
+        get_calendar()  # chargé avant les écritures : mis à jour incrémentalement
+        order = self.book(10)
+        self.book(11, status='pending')  # ne bloque pas
+
+        params = {
+            'start': (self.day + timedelta(hours=9)).isoformat().replace('+00:00', 'Z'),
+            'end': (self.day + timedelta(hours=12)).isoformat().replace('+00:00', 'Z'),
+        }
+        with self.assertNumQueries(0):
+            response = self.api.get('/api/appointments/availability/', params)
+        self.assertEqual(len(response.data['slots']), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            order.status = 'cancelled'
+            order.save()
+        response = self.api.get('/api/appointments/availability/', params)
+        self.assertEqual(len(response.data['slots']), 3)
+
+    def test_create_order_rejects_double_booking(self):
+        self.book(10)
+        response = self.api.post('/api/orders/create/', {
+            'henna_type': self.henna.pk,
+            'appointment_date': (self.day + timedelta(hours=10, minutes=30)).isoformat(),
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('appointment_date', response.data)
+
+
+# ----------------------------
+# Exports en flux
+# ----------------------------
+class ExportTests(TestCase):
+    def setUp(self):
+        self.admin = make_user('admin', '+22200000001', is_staff=True)
+        client = make_user('client', '+22210000001')
+        henna = make_henna_type()
+        Order.objects.create(client=client, henna_type=henna)
+        Order.objects.create(client=client, henna_type=henna, status='completed')
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+
+    def test_orders_csv_streams_with_filters(self):
+        response = self.api.get('/api/admin/export/orders/', {'status': 'completed'})
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith('id,client_id,'))
+        self.assertIn('completed', lines[1])
+
+    def test_csv_neutralizes_formula_cells(self):
+        Order.objects.filter(status='completed').update(notes='=HYPERLINK("http://x")', address='@SUM(A1)')
+        response = self.api.get('/api/admin/export/orders/', {'status': 'completed'})
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
+        row = next(csv.DictReader(StringIO(content)))
+        self.assertEqual(row['notes'], '\'=HYPERLINK("http://x")')
+        self.assertEqual(row['address'], "'@SUM(A1)")
+        self.assertEqual(row['client_phone'], "'+22210000001")
+        self.assertEqual(row['status'], 'completed')
+
+    def test_clients_jsonl(self):
+        today = timezone.now().date().isoformat()
+        response = self.api.get('/api/admin/export/clients/', {'output': 'jsonl', 'from': today})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([row['username'] for row in rows], ['client'])
+
+    def test_invalid_filter_and_command(self):
+        response = self.api.get('/api/admin/export/orders/', {'from': 'hier'})
+        self.assertEqual(response.status_code, 400)
+        response = self.api.get('/api/admin/export/orders/', {'from': '2024-02-30'})
+        self.assertEqual(response.status_code, 400)
+
+        out = StringIO()
+        call_command('export_data', 'orders', '--format', 'jsonl', stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 2)
+
+
+# ----------------------------
+# Vues asynchrones (ASGI)
+# ----------------------------
+class AsyncViewsTests(TestCase):
+    def setUp(self):
+        get_catalog_cache().clear()
+        token_cache.clear()
+        self.user = make_user('client', '+22210000001')
+        self.admin = make_user('admin', '+22200000001', is_staff=True)
+        henna = make_henna_type()
+        self.order = Order.objects.create(client=self.user, henna_type=henna)
+        self.token = AuthToken.objects.create(user=self.user).key
+        self.admin_token = AuthToken.objects.create(user=self.admin).key
+
+    def sync_get(self, path, token):
+        api = APIClient()
+        api.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+        return api.get(path)
+
+    async def test_same_payload_as_sync_views(self):
+        client = AsyncClient()
+        for path, token in [
+            ('henna-types/', self.token),
+            ('orders/my-orders/', self.token),
+            (f'orders/{self.order.pk}/', self.token),
+            ('admin/dashboard/', self.admin_token),
+        ]:
+            response = await client.get(f'/api/async/{path}', headers={'Authorization': f'Token {token}'})
+            self.assertEqual(response.status_code, 200, path)
+            expected = await sync_to_async(self.sync_get)(f'/api/{path}', token)
+            self.assertEqual(response.json(), json.loads(expected.content), path)
+
+    async def test_auth_and_permissions(self):
+        client = AsyncClient()
+        response = await client.get('/api/async/orders/my-orders/')
+        self.assertEqual(response.status_code, 401)
+        response = await client.get('/api/async/admin/dashboard/', headers={'Authorization': f'Token {self.token}'})
+        self.assertEqual(response.status_code, 403)
+        response = await client.get('/api/async/orders/999/', headers={'Authorization': f'Token {self.token}'})
+        self.assertEqual(response.status_code, 404)
+
+
+# ----------------------------
+# Transitions de statut (verrou optimiste)
+# ----------------------------
+class OrderTransitionTests(TestCase):
+    def setUp(self):
+        reset_calendar()
+        self.admin = make_user('admin', '+22200000001', is_staff=True)
+        client = make_user('client', '+22210000001')
+        self.order = Order.objects.create(client=client, henna_type=make_henna_type(), notes='avant')
+        self.url = f'/api/admin/orders/{self.order.pk}/'
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+
+    def test_admin_list_editable_enforces_transitions(self):
+        superuser = make_user('root', '+22200000002', is_staff=True, is_superuser=True)
+        self.client.force_login(superuser)
+        response = self.client.post('/admin/api/order/', {
+            'form-TOTAL_FORMS': 1, 'form-INITIAL_FORMS': 1,
+            'form-MIN_NUM_FORMS': 0, 'form-MAX_NUM_FORMS': 1000,
+            'form-0-id': self.order.pk, 'form-0-status': 'completed', '_save': 'Save',
+        })
+        self.assertContains(response, 'انتقال غير مسموح به')
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'pending')
+
+        self.order.status = 'confirmed'
+        self.order.full_clean()
+
+    def test_transition_table(self):
+        self.assertTrue(Order.can_transition('pending', 'confirmed'))
+        self.assertTrue(Order.can_transition('completed', 'completed'))
+        self.assertFalse(Order.can_transition('completed', 'pending'))
+        self.assertFalse(Order.can_transition('pending', 'completed'))
+
+    def test_update_writes_only_changed_fields_and_bumps_version(self):
+        start = timezone.now().replace(microsecond=0) + timedelta(days=2)
+        with CaptureQueriesContext(connection) as ctx, self.captureOnCommitCallbacks(execute=True):
+            response = self.api.put(self.url, {
+                'status': 'confirmed', 'notes': 'avant', 'appointment_date': start.isoformat(), 'version': 1,
+            }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['order']['version'], 2)
+        update = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE "api_order"')]
+        self.assertEqual(len(update), 1)
+        self.assertIn('"api_order"."version" = 1', update[0].split('WHERE')[1])
+        self.assertNotIn('"notes"', update[0])
+
+        self.assertEqual(DashboardStats.snapshot()['confirmed_orders'], 1)
+        self.assertFalse(get_calendar().is_free(start))
+
+    def test_stale_version_conflicts(self):
+        Order.objects.filter(pk=self.order.pk).update(version=2)
+        response = self.api.put(self.url, {'status': 'confirmed', 'version': 1}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['order']['version'], 2)
+        self.assertEqual(Order.objects.get().status, 'pending')
+
+    def test_illegal_transition_rejected(self):
+        Order.objects.filter(pk=self.order.pk).update(status='completed')
+        response = self.api.put(self.url, {'status': 'pending'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Order.objects.get().status, 'completed')
+
+    def test_confirming_onto_a_booked_slot_conflicts(self):
+        start = timezone.now().replace(microsecond=0) + timedelta(days=2)
+        Order.objects.filter(pk=self.order.pk).update(appointment_date=start)
+        other = Order.objects.create(client=self.order.client, henna_type=self.order.henna_type, appointment_date=start)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.api.put(self.url, {'status': 'confirmed'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        response = self.api.put(f'/api/admin/orders/{other.pk}/', {'status': 'confirmed'}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Order.objects.get(pk=other.pk).status, 'pending')
+
+        # Déplacer une commande sur le créneau réservé est refusé de même
+        response = self.api.put(
+            f'/api/admin/orders/{other.pk}/', {'appointment_date': (start + timedelta(minutes=30)).isoformat()}, format='json'
+        )
+        self.assertEqual(response.status_code, 409)
+        response = self.api.put(
+            f'/api/admin/orders/{other.pk}/', {'appointment_date': (start + timedelta(days=1)).isoformat()}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+class BatchStatusTests(TestCase):
+    url = '/api/admin/orders/batch-status/'
+
+    def setUp(self):
+        reset_calendar()
+        self.admin = make_user('admin', '+22200000001', is_staff=True)
+        client = make_user('client', '+22210000001')
+        henna = make_henna_type()
+        self.pending = [Order.objects.create(client=client, henna_type=henna) for _ in range(3)]
+        self.completed = Order.objects.create(client=client, henna_type=henna, status='completed')
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+
+    def test_ids_with_per_order_outcomes(self):
+        ids = [order.pk for order in self.pending] + [self.completed.pk, 9999]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.api.post(self.url, {'status': 'confirmed', 'ids': ids}, format='json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(
+            [result['outcome'] for result in response.data['results']],
+            ['updated'] * 3 + ['invalid_transition', 'not_found']
+        )
+        updates = [q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "api_order"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(response.data['dashboard']['pending_orders'], 0)
+        self.assertEqual(response.data['dashboard']['confirmed_orders'], 3)
+        self.assertEqual(DashboardStats.compute()['confirmed_orders'], 3)
+        self.assertEqual(Order.objects.get(pk=self.pending[0].pk).version, 2)
+
+    def test_filter_mode_and_validation(self):
+        response = self.api.post(self.url, {'status': 'confirmed', 'filter': {'status': 'pending'}}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 3)
+
+        response = self.api.post(self.url, {'status': 'confirmed'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.api.post(self.url, {'status': 'pending', 'ids': [self.completed.pk]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        for bad_ids in (str(self.pending[0].pk), [10 ** 20], [True], ['1']):
+            response = self.api.post(self.url, {'status': 'confirmed', 'ids': bad_ids}, format='json')
+            self.assertEqual(response.status_code, 400, bad_ids)
+        self.assertEqual(Order.objects.get(pk=self.pending[0].pk).version, 2)
+        for bad_date in ('2024-13-01', '2024-02-30'):
+            response = self.api.post(
+                self.url, {'status': 'confirmed', 'filter': {'from': bad_date}}, format='json'
+            )
+            self.assertEqual(response.status_code, 400, bad_date)
+
+    def test_orders_sharing_a_slot_are_not_all_confirmed(self):
+        start = timezone.now().replace(microsecond=0) + timedelta(days=2)
+        Order.objects.filter(pk__in=[self.pending[0].pk, self.pending[1].pk]).update(appointment_date=start)
+        ids = [self.pending[0].pk, self.pending[1].pk]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.api.post(self.url, {'status': 'confirmed', 'ids': ids}, format='json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(
+            [result['outcome'] for result in response.data['results']], ['updated', 'slot_taken']
+        )
+        self.assertEqual(Order.objects.get(pk=self.pending[1].pk).status, 'pending')
+        self.assertFalse(get_calendar().is_free(start, exclude_order_id=self.pending[1].pk))
+
+
+# ----------------------------
+# Annuaire des clients (recherche par préfixe)
+# ----------------------------
+class ClientDirectoryTests(TestCase):
+    url = '/api/admin/clients/'
+
+    def setUp(self):
+        self.admin = make_user('admin', '+22200000001', is_staff=True)
+        self.fatima = make_user('fatima', '+22236123456', first_name='فَاطِمَة', last_name='أحمد')
+        self.aicha = make_user('aicha', '+22236654321', first_name='Aïcha', last_name='Mint Salem')
+        self.others = [make_user(f'client{i}', f'+2224100000{i}') for i in range(4)]
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+
+    def search(self, query):
+        return set(search_users(CustomUser.objects.filter(is_staff=False), query))
+
+    def test_normalization(self):
+        # Tachkil, hamza et ta marbuta ; accents latins ; chiffres arabes-indiens
+        self.assertEqual(normalize_search_text('فَاطِمَة أحمد'), 'فاطمه احمد')
+        self.assertEqual(normalize_search_text('Aïcha  MINT-salem'), 'aicha mint salem')
+        self.assertEqual(query_tokens('٣٦١٢'), ['3612'])
+        self.assertEqual(build_search_text(self.fatima), 'فاطمه احمد fatima 22236123456 36123456')
+        self.assertEqual(query_tokens('00222 36 12'), ['3612'])
+
+    def test_prefix_search(self):
+        self.assertEqual(self.search('فاطمة'), {self.fatima})
+        self.assertEqual(self.search('اح'), {self.fatima})
+        self.assertEqual(self.search('aich sal'), {self.aicha})
+        self.assertEqual(self.search('+222 36 65'), {self.aicha})
+        # Numéro national, sans l'indicatif
+        self.assertEqual(self.search('36 12 34'), {self.fatima})
+        self.assertEqual(self.search('3665'), {self.aicha})
+        self.assertEqual(self.search('salem fatima'), set())
+        # Préfixe seulement : pas de correspondance au milieu d'un mot
+        self.assertEqual(self.search('atima'), set())
+
+    def test_index_follows_updates_and_deletes(self):
+        self.fatima.first_name = 'Khadija'
+        self.fatima.save()
+        self.assertEqual(self.search('khad'), {self.fatima})
+        self.assertEqual(self.search('فاطمة'), set())
+        self.aicha.delete()
+        self.assertEqual(self.search('aicha'), set())
+
+    def test_pages_and_search_endpoint(self):
+        seen, cursor = [], None
+        while True:
+            params = {'page_size': 4, **({'cursor': cursor} if cursor else {})}
+            with self.assertNumQueries(1):
+                response = self.api.get(self.url, params)
+            seen += [row['id'] for row in response.data['results']]
+            cursor = response.data['next_cursor']
+            if cursor is None:
+                break
+        expected = CustomUser.objects.filter(is_staff=False).order_by('-created_at', '-id')
+        self.assertEqual(seen, [user.pk for user in expected])
+
+        response = self.api.get(self.url, {'q': 'أحمد'})
+        self.assertEqual([row['id'] for row in response.data['results']], [self.fatima.pk])
+        self.assertEqual(self.api.get(self.url, {'cursor': '!!!'}).status_code, 400)
+
+
+# ----------------------------
+# Nom et prix figés sur la commande
+# ----------------------------
+class OrderHennaSnapshotTests(TestCase):
+    def setUp(self):
+        reset_calendar()
+        self.admin = make_user('admin', '+22200000001', is_staff=True)
+        self.client_user = make_user('client', '+22210000001')
+        self.henna = make_henna_type(price='1000.00')
+        self.other = make_henna_type(name_ar='حناء ملكية', price='4000.00')
+        self.api = APIClient()
+
+    def test_price_change_does_not_rewrite_history(self):
+        self.api.force_authenticate(self.client_user)
+        response = self.api.post('/api/orders/create/', {'henna_type': self.henna.pk}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.api.post('/api/orders/bulk-create/', {'orders': [{'henna_type': self.henna.pk}]}, format='json')
+
+        self.henna.name_ar = 'حناء جديدة'
+        self.henna.price = Decimal('1500.00')
+        self.henna.save()
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.api.get('/api/orders/my-orders/')
+        self.assertEqual([row['henna_price'] for row in response.data], ['1000.00', '1000.00'])
+        self.assertEqual({row['henna_name'] for row in response.data}, {'حناء'})
+        self.assertFalse([q for q in ctx.captured_queries if 'api_hennatype' in q['sql']])
+
+    def test_henna_type_change_takes_new_snapshot(self):
+        order = Order.objects.create(client=self.client_user, henna_type=self.henna)
+        self.assertEqual((order.henna_name, order.henna_price), ('حناء', Decimal('1000.00')))
+
+        self.api.force_authenticate(self.admin)
+        response = self.api.put(f'/api/admin/orders/{order.pk}/', {
+            'henna_type': self.other.pk, 'henna_price': '1.00',
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['order']['henna_price'], '4000.00')
+        self.assertEqual(response.data['order']['henna_name'], 'حناء ملكية')
+        self.assertEqual(ClientSummary.objects.get(pk=self.client_user.pk).lifetime_spend, Decimal('4000.00'))
+
+
+# ----------------------------
+# Résumés des commandes par client
+# ----------------------------
+class ClientSummaryTests(TestCase):
+    def setUp(self):
+        reset_calendar()
+        self.admin = make_user('admin', '+22200000001', is_staff=True)
+        self.client_user = make_user('client', '+22210000001')
+        self.other = make_user('other', '+22210000002')
+        self.henna = make_henna_type(price='1000.00')
+        self.premium = make_henna_type(name_ar='حناء ملكية', price='4000.00')
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+
+    def assert_matches_tables(self):
+        expected = {
+            summary.pk: (summary.order_count, summary.last_order_at, summary.lifetime_spend)
+            for summary in ClientSummary.objects.all()
+        }
+        ClientSummary.rebuild()
+        rebuilt = {
+            summary.pk: (summary.order_count, summary.last_order_at, summary.lifetime_spend)
+            for summary in ClientSummary.objects.all()
+        }
+        self.assertEqual(expected, rebuilt)
+
+    def test_maintained_on_every_write_path(self):
+        first = Order.objects.create(client=self.client_user, henna_type=self.henna)
+        second = Order.objects.create(client=self.client_user, henna_type=self.premium)
+        summary = ClientSummary.objects.get(pk=self.client_user.pk)
+        self.assertEqual((summary.order_count, summary.lifetime_spend), (2, Decimal('5000.00')))
+        self.assertEqual(summary.last_order_at, second.created_at)
+
+        # Annulation et changement de type (apply_changes), transition en masse
+        self.assertTrue(first.apply_changes({'status': 'cancelled'}))
+        self.assertTrue(second.apply_changes({'henna_type': self.henna}))
+        Order.objects.create(client=self.other, henna_type=self.premium)
+        Order.transition_many(Order.objects.filter(status='pending'), 'cancelled')
+        self.assert_matches_tables()
+        self.assertEqual(ClientSummary.objects.get(pk=self.other.pk).lifetime_spend, 0)
+
+        # Changement de prix du catalogue (sans effet : prix figé), suppression
+        third = Order.objects.create(client=self.client_user, henna_type=self.premium)
+        self.premium.price = Decimal('3000.00')
+        self.premium.save()
+        self.assertEqual(ClientSummary.objects.get(pk=self.client_user.pk).lifetime_spend, Decimal('4000.00'))
+        third.delete()
+        summary = ClientSummary.objects.get(pk=self.client_user.pk)
+        self.assertEqual(summary.last_order_at, second.created_at)
+        self.assert_matches_tables()
+
+        # Suppression du client en cascade
+        self.client_user.delete()
+        self.assertFalse(ClientSummary.objects.filter(pk=self.client_user.pk).exists())
+
+    def test_endpoint_sorts_by_spend(self):
+        Order.objects.create(client=self.other, henna_type=self.premium)
+        Order.objects.create(client=self.client_user, henna_type=self.henna)
+        Order.objects.create(client=self.client_user, henna_type=self.henna)
+
+        with self.assertNumQueries(1):
+            response = self.api.get('/api/admin/clients/', {'sort': '-lifetime_spend', 'page_size': 1})
+        self.assertEqual(response.data['results'][0]['id'], self.other.pk)
+        self.assertEqual(response.data['results'][0]['lifetime_spend'], '4000.00')
+        response = self.api.get('/api/admin/clients/', {
+            'sort': '-lifetime_spend', 'page_size': 1, 'cursor': response.data['next_cursor'],
+        })
+        self.assertEqual(response.data['results'][0]['id'], self.client_user.pk)
+        self.assertEqual(response.data['results'][0]['order_count'], 2)
+        self.assertIsNone(response.data['next_cursor'])
+
+        response = self.api.get('/api/admin/clients/', {'sort': 'order_count'})
+        self.assertEqual([row['id'] for row in response.data['results']], [self.other.pk, self.client_user.pk])
+        self.assertEqual(self.api.get('/api/admin/clients/', {'sort': 'password'}).status_code, 400)
+
+
+# ----------------------------
+# Agrégats quotidiens et analyses
+# ----------------------------
+class DailyRollupTests(TestCase):
+    def setUp(self):
+        reset_calendar()
+        self.admin = make_user('admin', '+22200000001', is_staff=True)
+        self.client_user = make_user('client', '+22210000001')
+        self.henna = make_henna_type(price='1000.00')
+        self.premium = make_henna_type(name_ar='حناء ملكية', price='4000.00')
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+
+    def rollup_rows(self):
+        return {
+            (row.day, row.status, row.henna_type_id): (row.order_count, row.total_price)
+            for row in DailyOrderRollup.objects.all()
+            if row.order_count
+        }
+
+    def assert_matches_tables(self):
+        maintained = self.rollup_rows()
+        DailyOrderRollup.rebuild_days()
+        self.assertEqual(maintained, self.rollup_rows())
+
+    def test_maintained_on_every_write_path(self):
+        first = Order.objects.create(client=self.client_user, henna_type=self.henna)
+        second = Order.objects.create(client=self.client_user, henna_type=self.henna)
+        Order.objects.create(client=self.client_user, henna_type=self.premium, status='confirmed')
+        today = timezone.localdate()
+        self.assertEqual(self.rollup_rows()[(today, 'pending', self.henna.pk)], (2, Decimal('2000.00')))
+
+        self.assertTrue(first.apply_changes({'status': 'cancelled'}))
+        self.assertTrue(second.apply_changes({'henna_type': self.premium}))
+        Order.transition_many(Order.objects.filter(status='confirmed'), 'in_progress')
+        second.refresh_from_db()
+        second.status = 'confirmed'
+        second.save()
+        first.delete()
+        self.assert_matches_tables()
+        self.assertEqual(self.rollup_rows()[(today, 'confirmed', self.premium.pk)], (1, Decimal('4000.00')))
+
+    def test_analytics_endpoints_read_rollups(self):
+        today = timezone.localdate()
+        specs = [(2, self.henna, 'completed'), (2, self.premium, 'cancelled'), (0, self.premium, 'pending'), (0, self.henna, 'pending')]
+        for days_ago, henna, order_status in specs:
+            order = Order.objects.create(client=self.client_user, henna_type=henna, status=order_status)
+            Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+        out = StringIO()
+        call_command('backfill_daily_rollups', stdout=out)
+        self.assertIn('4 ligne(s)', out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('backfill_daily_rollups', '--from', '2024-02-30', '--to', '2024-03-01', stdout=out)
+
+        params = {'from': str(today - timedelta(days=3)), 'to': str(today)}
+        with self.assertNumQueries(1):
+            response = self.api.get('/api/admin/analytics/timeseries/', params)
+        series = response.data['series']
+        self.assertEqual(len(series), 4)
+        self.assertEqual(series[1]['orders'], 2)
+        self.assertEqual(series[1]['revenue'], '1000.00')
+        self.assertEqual(series[1]['by_status']['cancelled'], 1)
+        self.assertEqual(series[2]['orders'], 0)
+        self.assertEqual(response.data['totals'], {'orders': 4, 'revenue': '6000.00'})
+
+        response = self.api.get('/api/admin/analytics/timeseries/', {**params, 'henna_type': self.henna.pk})
+        self.assertEqual(response.data['totals'], {'orders': 2, 'revenue': '2000.00'})
+
+        with self.assertNumQueries(1):
+            response = self.api.get('/api/admin/analytics/top-henna-types/', params)
+        self.assertEqual(
+            [(row['name'], row['orders'], row['revenue']) for row in response.data['results']],
+            [('حناء ملكية', 1, '4000.00'), ('حناء', 2, '2000.00')]
+        )
+        response = self.api.get('/api/admin/analytics/top-henna-types/', {**params, 'by': 'orders', 'limit': 1})
+        self.assertEqual([row['henna_type'] for row in response.data['results']], [self.henna.pk])
+
+        for url, bad in [
+            ('/api/admin/analytics/timeseries/', {'from': '2026-13-01'}),
+            ('/api/admin/analytics/timeseries/', {'from': str(today), 'to': str(today - timedelta(days=1))}),
+            ('/api/admin/analytics/timeseries/', {'status': 'lost'}),
+            ('/api/admin/analytics/top-henna-types/', {'by': 'price'}),
+        ]:
+            self.assertEqual(self.api.get(url, bad).status_code, 400)
+
+        for url, bad, message in [
+            ('/api/admin/analytics/timeseries/', {'henna_type': 'abc'}, "henna_type : entier positif attendu"),
+            ('/api/admin/analytics/timeseries/', {'henna_type': str(10 ** 20)}, "henna_type : entier positif attendu"),
+            ('/api/admin/analytics/top-henna-types/', {'limit': 'dix'}, "limit : entier attendu"),
+        ]:
+            response = self.api.get(url, bad)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.data, {"error": message})
+
+
+# ----------------------------
+# Synchronisation différentielle de my_orders_api
+# ----------------------------
+@override_settings(ORDER_SYNC_OVERLAP_SECONDS=0)
+class MyOrdersDeltaTests(TestCase):
+    url = '/api/orders/my-orders/'
+
+    def setUp(self):
+        reset_calendar()
+        self.client_user = make_user('client', '+22210000001')
+        other = make_user('other', '+22210000002')
+        henna = make_henna_type()
+        self.orders = [Order.objects.create(client=self.client_user, henna_type=henna) for _ in range(3)]
+        Order.objects.create(client=other, henna_type=henna)
+        Order.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        self.henna = henna
+        self.api = APIClient()
+        self.api.force_authenticate(self.client_user)
+
+    def test_first_sync_then_only_changes_and_tombstones(self):
+        response = self.api.get(self.url, {'since': ''})
+        self.assertTrue(response.data['full'])
+        self.assertEqual(len(response.data['orders']), 3)
+        watermark = response.data['watermark']
+
+        self.orders[0].refresh_from_db()
+        self.orders[0].apply_changes({'status': 'cancelled'})
+        deleted_id = self.orders[1].pk
+        self.orders[1].delete()
+        created = Order.objects.create(client=self.client_user, henna_type=self.henna)
+
+        with self.assertNumQueries(2):
+            response = self.api.get(self.url, {'since': watermark.isoformat()})
+        self.assertFalse(response.data['full'])
+        self.assertEqual(
+            [(row['id'], row['status']) for row in response.data['orders']],
+            [(self.orders[0].pk, 'cancelled'), (created.pk, 'pending')]
+        )
+        self.assertEqual(response.data['deleted'], [deleted_id])
+
+        response = self.api.get(self.url, {'since': response.data['watermark'].isoformat()})
+        self.assertEqual((response.data['orders'], response.data['deleted']), ([], []))
+
+        # Sans ?since= : liste complète, comme avant
+        self.assertEqual(len(self.api.get(self.url).data), 3)
+
+    def test_expired_or_invalid_watermark(self):
+        expired = timezone.now() - timedelta(days=365)
+        response = self.api.get(self.url, {'since': expired.isoformat()})
+        self.assertTrue(response.data['full'])
+        self.assertEqual(self.api.get(self.url, {'since': 'hier'}).status_code, 400)
+        self.assertEqual(self.api.get(self.url, {'since': '2024-13-01T00:00:00'}).status_code, 400)
+
+    def test_tombstones_go_with_the_client(self):
+        self.orders[0].delete()
+        self.assertEqual(OrderTombstone.objects.filter(client=self.client_user).count(), 1)
+        pk = self.client_user.pk
+        self.client_user.delete()
+        self.assertFalse(OrderTombstone.objects.filter(client_id=pk).exists())
+
+
+# ----------------------------
+# Instrumentation et budgets de requêtes
+# ----------------------------
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        metrics_registry.reset()
+        self.user = make_user('client', '+22210000001')
+        self.admin = make_user('admin', '+22200000001', is_staff=True)
+        henna = make_henna_type()
+        for _ in range(5):
+            Order.objects.create(client=self.user, henna_type=henna)
+        self.api = APIClient()
+
+    def test_my_orders_query_count_is_constant(self):
+        self.api.force_authenticate(self.user)
+        response = self.api.get('/api/orders/my-orders/')
+        self.assertEqual(len(response.data), 5)
+        entry = metrics_registry.snapshot()['my_orders']
+        self.assertEqual(entry['requests'], 1)
+        self.assertEqual(entry['queries'], 1)
+        self.assertGreater(entry['serialization_seconds'], 0)
+
+    async def test_async_chain_is_instrumented(self):
+        async def get_response(request):
+            return None
+        self.assertTrue(iscoroutinefunction(InstrumentationMiddleware(get_response)))
+
+        token = await sync_to_async(AuthToken.objects.create)(user=self.user)
+        response = await AsyncClient().get(
+            '/api/async/orders/my-orders/', headers={'Authorization': f'Token {token.key}'}
+        )
+        self.assertEqual(len(response.json()), 5)
+        entry = metrics_registry.snapshot()['async_my_orders']
+        # Token puis commandes, exécutés dans le thread de sync_to_async
+        self.assertEqual(entry['queries'], 2)
+        self.assertGreater(entry['serialization_seconds'], 0)
+
+    def test_prometheus_endpoint_is_admin_only(self):
+        self.api.force_authenticate(self.user)
+        self.api.get('/api/orders/my-orders/')
+        self.assertEqual(self.api.get('/api/admin/metrics/').status_code, 403)
+
+        self.api.force_authenticate(self.admin)
+        response = self.api.get('/api/admin/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn('han_db_queries_total{view="my_orders"} 1', body)
+        self.assertIn('han_request_duration_seconds_bucket{view="my_orders",le="+Inf"} 1', body)
+
+    def test_budget_exceeded(self):
+        self.api.force_authenticate(self.user)
+        with mock.patch.dict('api.urls.QUERY_BUDGETS', {'my_orders': 0}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.api.get('/api/orders/my-orders/')
+            with override_settings(QUERY_BUDGET_STRICT=False), self.assertLogs('api.metrics', 'WARNING'):
+                self.assertEqual(self.api.get('/api/orders/my-orders/').status_code, 200)
+
+
+# ----------------------------
+# Journalisation structurée
+# ----------------------------
+class StructuredLoggingTests(TestCase):
+    def test_redaction_and_json_format(self):
+        self.assertEqual(
+            redact({'username': 'a', 'password': 'x', 'nested': [{'new_password': 'y'}]}),
+            {'username': 'a', 'password': '[redacted]', 'nested': [{'new_password': '[redacted]'}]}
+        )
+        record = logging.makeLogRecord({
+            'name': 'api', 'levelno': logging.INFO, 'levelname': 'INFO',
+            'msg': 'login.success', 'user_id': 3, 'token': 'abc',
+        })
+        payload = json.loads(JsonFormatter().format(record))
+        self.assertEqual(payload['message'], 'login.success')
+        self.assertEqual(payload['user_id'], 3)
+        self.assertEqual(payload['token'], '[redacted]')
+
+    def test_queue_handler_writes_in_background_and_drops_when_full(self):
+        stream = StringIO()
+        handler = QueueLogHandler(stream=stream, max_size=1)
+        handler.listener.stop()  # file figée : on observe le débordement
+        record = logging.makeLogRecord({'msg': 'event %s', 'args': (1,), 'levelno': logging.INFO, 'levelname': 'INFO'})
+        handler.emit(record)
+        handler.emit(record)
+        self.assertEqual(handler.dropped, 1)
+        handler.listener.start()
+        handler.close()
+        self.assertEqual(json.loads(stream.getvalue())['message'], 'event 1')
+
+    @override_settings(LOG_SAMPLING={'default': 1.0, 'hello_api': 0.0})
+    def test_sampling_per_endpoint(self):
+        self.assertTrue(should_log('login_api'))
+        self.assertFalse(should_log('hello_api'))
+        self.assertTrue(should_log('hello_api', logging.ERROR))
+
+    def test_register_does_not_log_password(self):
+        with self.assertLogs('api', 'INFO') as logs:
+            response = APIClient().post('/api/register/', {
+                'username': 'nouvelle', 'password': 'secret123', 'first_name': 'N',
+                'last_name': 'T', 'phone_number': '+22210000009', 'gender': 'F', 'age': 30,
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        formatter = JsonFormatter()
+        lines = [formatter.format(record) for record in logs.records]
+        self.assertTrue(any('register.success' in line for line in lines))
+        self.assertFalse(any('secret123' in line for line in lines))
+
+    def test_register_error_logs_field_names_only(self):
+        with mock.patch.object(AuthToken.objects, 'get_or_create', side_effect=RuntimeError('boom')):
+            with self.assertLogs('api', 'ERROR') as logs:
+                response = APIClient().post('/api/register/', {
+                    'username': 'nouvelle', 'password': 'secret123', 'first_name': 'Nouvelle',
+                    'last_name': 'T', 'phone_number': '+22210000009', 'gender': 'F', 'age': 30,
+                }, format='json')
+        self.assertEqual(response.status_code, 400)
+        record = logs.records[0]
+        self.assertIn('phone_number', record.fields)
+        line = JsonFormatter().format(record)
+        self.assertNotIn('22210000009', line)
+        self.assertNotIn('Nouvelle', line)
+
+
+# ----------------------------
+# Profil SQLite
+# ----------------------------
+class SqliteProfileTests(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied_on_connection(self):
+        self.assertEqual(self.pragma('synchronous'), 1)  # NORMAL
+        self.assertEqual(self.pragma('busy_timeout'), 20000)
+        self.assertEqual(self.pragma('cache_size'), -64000)
+
+    def test_writers_start_immediate_transactions(self):
+        self.assertEqual(connection.settings_dict['OPTIONS'].get('transaction_mode'), 'IMMEDIATE')
+        self.assertGreater(connection.settings_dict['CONN_MAX_AGE'], 0)
+
+
+# ----------------------------
+# Routage primaire / réplica
+# ----------------------------
+@override_settings(DATABASE_REPLICAS=['replica'], DB_STICKY_SECONDS=60)
+class ReplicaRoutingTests(TestCase):
+    # Deux bases de test distinctes : ce que lit le réplica se voit
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.user = make_user('client', '+22210000001')
+        self.henna = make_henna_type()
+        Order.objects.create(client=self.user, henna_type=self.henna)
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def test_read_views_use_replica_and_others_primary(self):
+        self.assertEqual(self.api.get('/api/orders/my-orders/').json(), [])
+        order = Order.objects.get()
+        self.assertEqual(self.api.get(f'/api/orders/{order.pk}/').status_code, 200)
+        self.assertEqual(PrimaryReplicaRouter().db_for_read(Order), 'default')
+
+    def test_sticky_window_after_write(self):
+        response = self.api.post('/api/orders/create/', {'henna_type': self.henna.pk}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(self.api.get('/api/orders/my-orders/').json()), 2)
+
+        cache.delete(sticky_key(self.user.pk))
+        self.assertEqual(self.api.get('/api/orders/my-orders/').json(), [])
+
+    @override_settings(ORDER_SYNC_OVERLAP_SECONDS=0)
+    def test_delta_sync_reads_primary(self):
+        self.assertEqual(self.api.get('/api/orders/my-orders/').json(), [])
+        response = self.api.get('/api/orders/my-orders/', {'since': ''})
+        self.assertEqual(len(response.json()['orders']), 1)
+
+    def test_catalog_cache_miss_builds_on_primary(self):
+        get_catalog_cache().clear()
+        # Absent du réplica (base de test vide) : lu sur le primaire
+        self.assertEqual(len(self.api.get('/api/henna-types/').json()), 1)
+        self.assertEqual(self.api.get(f'/api/henna-types/{self.henna.pk}/').status_code, 200)
+
+    async def test_async_requests_are_routed(self):
+        token = await sync_to_async(AuthToken.objects.create)(user=self.user)
+        response = await AsyncClient().get(
+            '/api/async/orders/my-orders/', headers={'Authorization': f'Token {token.key}'}
+        )
+        self.assertEqual(response.json(), [])
+
+    def test_sticky_cache_must_be_shared(self):
+        self.assertEqual([error.id for error in check_sticky_cache(None)], ['api.W001'])
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': tempfile.gettempdir(),
+        }}):
+            self.assertEqual(check_sticky_cache(None), [])
+
+
+# ----------------------------
+# Suite de benchmark (bench_api)
+# ----------------------------
+class BenchApiTests(TestCase):
+    def test_every_route_has_a_scenario(self):
+        bench = mock.Mock(client_order_id=1, henna_ids=[1], batch_order_ids=[1], run_id=1)
+        self.assertEqual(set(api_url_names()) - set(build_routes(bench)), set())
+
+    def test_compare_flags_regressions(self):
+        meta = {'volumes': {'users': 1, 'henna_types': 1, 'orders': 1}}
+        baseline = {'meta': meta, 'results': {
+            'my_orders': {'p95_ms': 10.0, 'queries_per_request': 2.0},
+        }}
+        with tempfile.NamedTemporaryFile('w', suffix='.json') as baseline_file:
+            json.dump(baseline, baseline_file)
+            baseline_file.flush()
+            command = BenchApiCommand(stdout=StringIO(), stderr=StringIO())
+
+            command.compare({'meta': meta, 'results': {
+                'my_orders': {'p95_ms': 11.0, 'queries_per_request': 2.0},
+            }}, baseline_file.name, threshold=20)
+
+            with self.assertRaises(CommandError):
+                command.compare({'meta': meta, 'results': {
+                    'my_orders': {'p95_ms': 11.0, 'queries_per_request': 40.0},
+                }}, baseline_file.name, threshold=20)
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 urlpatterns = [
     # Test
@@ -21,12 +21,88 @@ urlpatterns = [
     
     # Commandes client
     path('orders/create/', views.create_order_api, name='create_order'),
+    path('orders/bulk-create/', views.bulk_create_orders_api, name='bulk_create_orders'),
     path('orders/my-orders/', views.my_orders_api, name='my_orders'),
     path('orders/<int:pk>/', views.order_detail_api, name='order_detail'),
     
+    # Rendez-vous
+    path('appointments/availability/', views.availability_api, name='availability'),
+    
     # Dashboard Admin
     path('admin/dashboard/', views.admin_dashboard_api, name='admin_dashboard'),
     path('admin/orders/', views.admin_orders_list_api, name='admin_orders_list'),
     path('admin/orders/<int:pk>/', views.admin_order_detail_api, name='admin_order_detail'),
+    path('admin/orders/batch-status/', views.admin_orders_batch_status_api, name='admin_orders_batch_status'),
     path('admin/clients/', views.admin_clients_list_api, name='admin_clients_list'),
-]
\ No newline at end of file
+    path('admin/analytics/timeseries/', views.admin_analytics_timeseries_api, name='admin_analytics_timeseries'),
+    path('admin/analytics/top-henna-types/', views.admin_analytics_top_henna_types_api, name='admin_analytics_top_henna_types'),
+    path('admin/export/orders/', views.admin_export_orders_api, name='admin_export_orders'),
+    path('admin/export/clients/', views.admin_export_clients_api, name='admin_export_clients'),
+    path('admin/metrics/', views.admin_metrics_api, name='admin_metrics'),
+    
+    # Variantes asynchrones (ASGI) des lectures fréquentes
+    path('async/henna-types/', async_views.henna_types_list_api, name='async_henna_types_list'),
+    path('async/orders/my-orders/', async_views.my_orders_api, name='async_my_orders'),
+    path('async/orders/<int:pk>/', async_views.order_detail_api, name='async_order_detail'),
+    path('async/admin/dashboard/', async_views.admin_dashboard_api, name='async_admin_dashboard'),
+]
+
+
+# ----------------------------
+# Budgets de requêtes SQL par vue
+# ----------------------------
+# Vérifiés par api.middleware.InstrumentationMiddleware (authentification
+# comprise) : avertissement en production, échec des tests si dépassé.
+# Les vues absentes n'ont pas de budget.
+QUERY_BUDGETS = {
+    'hello_api': 0,
+    'register_api': 12,
+    'login_api': 4,
+    'logout_api': 6,
+    'profile_api': 2,
+    'change_password_api': 12,
+    'change_language_api': 5,
+    'henna_types_list': 2,
+    'henna_type_detail': 2,
+    'create_order': 8,
+    'bulk_create_orders': 13,
+    'my_orders': 2,
+    'order_detail': 2,
+    'availability': 2,
+    'admin_dashboard': 2,
+    'admin_orders_list': 2,
+    'admin_order_detail': 7,
+    'admin_orders_batch_status': 10,
+    'admin_clients_list': 2,
+    'admin_analytics_timeseries': 2,
+    'admin_analytics_top_henna_types': 2,
+    'admin_export_orders': 1,
+    'admin_export_clients': 1,
+    'admin_metrics': 1,
+    'async_henna_types_list': 2,
+    'async_my_orders': 2,
+    'async_order_detail': 2,
+    'async_admin_dashboard': 2,
+}
+
+
+# ----------------------------
+# Lectures servies par les réplicas
+# ----------------------------
+# Voir api/routers.py. Les vues qui écrivent ou relisent une écriture
+# (create_order, admin_order_detail...) restent sur le primaire. Les
+# exports lisent la base pendant le flux, hors du contexte de la
+# requête : ils restent aussi sur le primaire.
+REPLICA_READ_VIEWS = {
+    'henna_types_list',
+    'henna_type_detail',
+    'my_orders',
+    'admin_dashboard',
+    'admin_orders_list',
+    'admin_clients_list',
+    'admin_analytics_timeseries',
+    'admin_analytics_top_henna_types',
+    'async_henna_types_list',
+    'async_my_orders',
+    'async_admin_dashboard',
+}
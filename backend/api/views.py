@@ -1,13 +1,36 @@
+import logging
+from datetime import timedelta
+
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
-from django.contrib.auth import authenticate
-from .models import CustomUser, HennaType, Order
+from django.conf import settings
+from django.db import transaction
+from django.contrib.auth import authenticate, update_session_auth_hash
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import ClientSummary, CustomUser, DailyOrderRollup, DashboardStats, HennaType, InvalidTransition, Order, SlotTaken
 from .serializers import (
-    RegisterSerializer, UserSerializer,
-    HennaTypeSerializer, OrderSerializer, CreateOrderSerializer
+    RegisterSerializer, UserSerializer, ClientSerializer,
+    HennaTypeSerializer, OrderSerializer, CreateOrderSerializer,
+    BulkOrderItemSerializer, MAX_DB_ID
+)
+from .analytics import AnalyticsError, parse_day_range, time_series, top_henna_types
+from .availability import get_calendar
+from .cache import etag_matches, get_catalog_entry
+from .exports import (
+    EXPORT_FORMATS, ExportError, export_clients_queryset,
+    export_orders_queryset, iter_export
 )
+from .idempotency import run_idempotent
+from .logs import log_event
+from .metrics import registry as metrics_registry
+from .pagination import InvalidCursor, get_page_size, paginate_keyset
+from .routers import primary_reads
+from .search import search_users
+from .sync import InvalidWatermark, order_changes, parse_watermark
 
 # Import Token avec un nom différent pour éviter les conflits
 from rest_framework.authtoken.models import Token as AuthToken
@@ -62,9 +85,6 @@ def hello_api(request):
 @permission_classes([AllowAny])
 def register_api(request):
     """API d'inscription"""
-    print("=== REGISTER REQUEST ===")
-    print("Data received:", request.data)
-    
     serializer = RegisterSerializer(data=request.data)
     
     if serializer.is_valid():
@@ -76,7 +96,7 @@ def register_api(request):
             
             lang = user.language_preference
             
-            print(f"✅ User created successfully: {user.username}")
+            log_event(request, 'register.success', user_id=user.pk)
             
             return Response({
                 "message": get_message(lang, 'register_success'),
@@ -85,15 +105,15 @@ def register_api(request):
             }, status=status.HTTP_201_CREATED)
         
         except Exception as e:
-            print(f"❌ Error creating user: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            # Noms des champs seulement : les valeurs sont des données personnelles
+            log_event(request, 'register.error', level=logging.ERROR, exc_info=True,
+                      fields=sorted(request.data))
             
             return Response({
                 "error": f"Error creating user: {str(e)}"
             }, status=status.HTTP_400_BAD_REQUEST)
     
-    print("❌ Validation errors:", serializer.errors)
+    log_event(request, 'register.invalid', fields=sorted(serializer.errors))
     return Response({
         "error": "Validation failed",
         "details": serializer.errors
@@ -110,9 +130,6 @@ def login_api(request):
     identifier = request.data.get('username')  # Peut être username ou phone
     password = request.data.get('password')
     
-    print("=== LOGIN REQUEST ===")
-    print(f"Identifier: {identifier}")
-    
     if not identifier or not password:
         return Response(
             {"error": "يرجى إدخال اسم المستخدم وكلمة المرور"},
@@ -127,7 +144,7 @@ def login_api(request):
         token, created = AuthToken.objects.get_or_create(user=user)
         lang = user.language_preference
         
-        print(f"✅ Login successful for: {user.username}")
+        log_event(request, 'login.success', user_id=user.pk)
         
         return Response({
             "message": get_message(lang, 'login_success'),
@@ -135,7 +152,7 @@ def login_api(request):
             "user": UserSerializer(user).data
         })
     
-    print("❌ Authentication failed")
+    log_event(request, 'login.failed')
     return Response(
         {"error": "اسم المستخدم أو كلمة المرور غير صحيحة"},
         status=status.HTTP_400_BAD_REQUEST
@@ -152,8 +169,8 @@ def logout_api(request):
     try:
         # Supprimer le token de l'utilisateur
         AuthToken.objects.filter(user=request.user).delete()
-    except Exception as e:
-        print(f"Error during logout: {e}")
+    except Exception:
+        log_event(request, 'logout.error', level=logging.ERROR, exc_info=True)
     
     lang = request.user.language_preference
     return Response({"message": get_message(lang, 'logout_success')})
@@ -440,7 +457,7 @@ def change_password_api(request):
     
     user.set_password(new_password)
     user.save()
-    login(request, user)
+    update_session_auth_hash(request, user)
     
     lang = user.language_preference
     return Response({"message": get_message(lang, 'password_changed')})
@@ -474,32 +491,51 @@ def change_language_api(request):
 # APIs pour les types de henné
 # ========================================
 
+def catalog_response(request, data, etag):
+    """Réponse du catalogue avec ETag ; 304 sans corps si le client est à jour"""
+    if etag_matches(request, etag):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+    return Response(data, headers={'ETag': etag})
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def henna_types_list_api(request):
-    """Liste tous les types de henné disponibles"""
-    henna_types = HennaType.objects.filter(is_available=True)
-    serializer = HennaTypeSerializer(
-        henna_types,
-        many=True,
-        context={'request': request}
-    )
-    return Response(serializer.data)
+    """Liste tous les types de henné disponibles (cache + ETag)"""
+    def build():
+        henna_types = HennaType.objects.filter(is_available=True)
+        serializer = HennaTypeSerializer(
+            henna_types,
+            many=True,
+            context={'request': request}
+        )
+        return serializer.data
+
+    data, etag = get_catalog_entry(request, 'list', build)
+    return catalog_response(request, data, etag)
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def henna_type_detail_api(request, pk):
-    """Détails d'un type de henné"""
-    try:
-        henna_type = HennaType.objects.get(pk=pk, is_available=True)
-        serializer = HennaTypeSerializer(henna_type, context={'request': request})
-        return Response(serializer.data)
-    except HennaType.DoesNotExist:
+    """Détails d'un type de henné (cache + ETag)"""
+    def build():
+        henna_types = HennaType.objects.filter(pk=pk, is_available=True)
+        serializer = HennaTypeSerializer(
+            henna_types,
+            many=True,
+            context={'request': request}
+        )
+        rows = serializer.data
+        return rows[0] if rows else None
+
+    data, etag = get_catalog_entry(request, f'detail:{pk}', build)
+    if data is None:
         return Response(
             {"error": "نوع الحناء غير موجود"},
             status=status.HTTP_404_NOT_FOUND
         )
+    return catalog_response(request, data, etag)
 
 
 # ========================================
@@ -527,21 +563,135 @@ def create_order_api(request):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_create_orders_api(request):
+    """
+    Créer plusieurs commandes en un appel (ex. mariage avec invitées).
+    Corps : {"orders": [...]} ; en-tête optionnel Idempotency-Key.
+    """
+    items = request.data.get('orders')
+    lang = request.user.language_preference
+    
+    if not isinstance(items, list) or not items:
+        return Response(
+            {"error": get_message(lang, 'missing_fields')},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    max_items = getattr(settings, 'BULK_ORDER_MAX_ITEMS', 100)
+    if len(items) > max_items:
+        return Response(
+            {"error": f"{max_items} commandes maximum par lot"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    def handler():
+        return _bulk_create_orders(request, items)
+    
+    key = request.headers.get('Idempotency-Key')
+    if key:
+        return run_idempotent(request, key, handler)
+    return handler()
+
+
+def _bulk_create_orders(request, items):
+    # Un seul aller-retour pour tous les types de henné référencés
+    henna_ids = set()
+    for item in items:
+        try:
+            henna_id = int(item.get('henna_type'))
+        except (AttributeError, TypeError, ValueError):
+            continue  # signalé par la validation de l'élément
+        if 0 < henna_id <= MAX_DB_ID:
+            henna_ids.add(henna_id)
+    henna_types = HennaType.objects.in_bulk(henna_ids)
+    context = {'request': request, 'henna_types': henna_types}
+    
+    results = [None] * len(items)
+    pending = []
+    for index, item in enumerate(items):
+        serializer = BulkOrderItemSerializer(data=item, context=context)
+        if serializer.is_valid():
+            order = Order(client=request.user, **serializer.validated_data)
+            order.snapshot_henna_type()
+            pending.append((index, order))
+        else:
+            results[index] = {"index": index, "created": False, "errors": serializer.errors}
+    
+    if pending:
+        with transaction.atomic():
+            orders = Order.objects.bulk_create([order for _, order in pending])
+            # bulk_create ne passe pas par save() : compteurs mis à jour ici
+            DashboardStats.record_orders([(None, order.status) for order in orders])
+            ClientSummary.record([
+                (order.client_id, 1, ClientSummary.spend(order.status, order.henna_price), order.created_at)
+                for order in orders
+            ])
+            DailyOrderRollup.record([(order.created_at, None, order.rollup_bucket()) for order in orders])
+        for (index, _), order in zip(pending, orders):
+            results[index] = {"index": index, "created": True, "order": OrderSerializer(order).data}
+    
+    if not pending:
+        response_status = status.HTTP_400_BAD_REQUEST
+    elif len(pending) < len(items):
+        response_status = status.HTTP_207_MULTI_STATUS
+    else:
+        response_status = status.HTTP_201_CREATED
+    
+    lang = request.user.language_preference
+    return Response({
+        "message": get_message(lang, 'order_success') if pending else None,
+        "created": len(pending),
+        "failed": len(items) - len(pending),
+        "results": results
+    }, status=response_status)
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def my_orders_api(request):
-    """Liste des commandes de l'utilisateur connecté"""
-    orders = Order.objects.filter(client=request.user)
+    """
+    Liste des commandes de l'utilisateur connecté.
+    Avec ?since= (watermark précédent, vide la première fois) : mode
+    différentiel, voir api/sync.py.
+    """
+    if 'since' in request.GET:
+        return _my_orders_delta(request)
+    orders = OrderSerializer.setup_eager_loading(Order.objects.filter(client=request.user))
     serializer = OrderSerializer(orders, many=True)
     return Response(serializer.data)
 
 
+def _my_orders_delta(request):
+    try:
+        since = parse_watermark(request.GET['since'])
+    except InvalidWatermark:
+        return Response(
+            {"error": "Watermark invalide"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    # Sur le primaire : un réplica en retard n'aurait pas encore les
+    # changements antérieurs au watermark renvoyé, ils seraient perdus
+    with primary_reads():
+        orders, deleted, watermark, full = order_changes(request.user, since)
+        serializer = OrderSerializer(OrderSerializer.setup_eager_loading(orders), many=True)
+        data = serializer.data
+    return Response({
+        "orders": data,
+        "deleted": deleted,
+        "watermark": watermark,
+        "full": full
+    })
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def order_detail_api(request, pk):
     """Détails d'une commande"""
     try:
-        order = Order.objects.get(pk=pk, client=request.user)
+        order = OrderSerializer.setup_eager_loading(Order.objects.all()).get(pk=pk, client=request.user)
         serializer = OrderSerializer(order)
         return Response(serializer.data)
     except Order.DoesNotExist:
@@ -551,6 +701,43 @@ def order_detail_api(request, pk):
         )
 
 
+# ========================================
+# API Disponibilités (rendez-vous)
+# ========================================
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def availability_api(request):
+    """Créneaux libres entre ?start= et ?end= (ISO 8601)"""
+    try:
+        start = parse_datetime(request.GET.get('start', ''))
+        end = parse_datetime(request.GET.get('end', ''))
+    except ValueError:
+        start = end = None
+    if start is None or end is None or start.tzinfo is None or end.tzinfo is None or end <= start:
+        return Response(
+            {"error": "start/end invalides (ISO 8601 avec fuseau, start < end)"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    max_days = getattr(settings, 'AVAILABILITY_MAX_RANGE_DAYS', 31)
+    if end - start > timedelta(days=max_days):
+        return Response(
+            {"error": f"Intervalle limité à {max_days} jours"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    calendar = get_calendar()
+    return Response({
+        "slot_minutes": int(calendar.duration.total_seconds() // 60),
+        "free": [
+            {"start": free_start, "end": free_end}
+            for free_start, free_end in calendar.free_intervals(start, end)
+        ],
+        "slots": calendar.free_slots(start, end)
+    })
+
+
 # ========================================
 # APIs ADMIN - Dashboard
 # ========================================
@@ -558,32 +745,44 @@ def order_detail_api(request, pk):
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
 def admin_dashboard_api(request):
-    """Dashboard admin - statistiques générales"""
-    total_orders = Order.objects.count()
-    pending_orders = Order.objects.filter(status='pending').count()
-    completed_orders = Order.objects.filter(status='completed').count()
-    total_clients = CustomUser.objects.filter(is_staff=False).count()
+    """Dashboard admin - statistiques générales (compteurs maintenus)"""
+    stats = DashboardStats.snapshot()
     
     return Response({
-        "total_orders": total_orders,
-        "pending_orders": pending_orders,
-        "completed_orders": completed_orders,
-        "total_clients": total_clients
+        "total_orders": stats['total_orders'],
+        "pending_orders": stats['pending_orders'],
+        "completed_orders": stats['completed_orders'],
+        "total_clients": stats['total_clients']
     })
 
 
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
 def admin_orders_list_api(request):
-    """Liste de toutes les commandes pour l'admin"""
+    """Liste paginée (curseur) de toutes les commandes pour l'admin"""
     status_filter = request.GET.get('status')
     
-    orders = Order.objects.all()
+    orders = OrderSerializer.setup_eager_loading(Order.objects.all())
     if status_filter:
         orders = orders.filter(status=status_filter)
     
+    try:
+        orders, next_cursor = paginate_keyset(
+            orders,
+            cursor=request.GET.get('cursor'),
+            page_size=get_page_size(request),
+        )
+    except InvalidCursor:
+        return Response(
+            {"error": "Curseur invalide"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
     serializer = OrderSerializer(orders, many=True)
-    return Response(serializer.data)
+    return Response({
+        "results": serializer.data,
+        "next_cursor": next_cursor
+    })
 
 
 @api_view(['GET', 'PUT'])
@@ -591,7 +790,7 @@ def admin_orders_list_api(request):
 def admin_order_detail_api(request, pk):
     """Détails et modification d'une commande par l'admin"""
     try:
-        order = Order.objects.get(pk=pk)
+        order = Order.objects.select_related('client').get(pk=pk)
     except Order.DoesNotExist:
         return Response(
             {"error": "الطلب غير موجود"},
@@ -604,22 +803,168 @@ def admin_order_detail_api(request, pk):
     
     elif request.method == 'PUT':
         serializer = OrderSerializer(order, data=request.data, partial=True)
-        if serializer.is_valid():
-            serializer.save()
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Version vue par l'admin (verrou optimiste) ; à défaut, celle lue ici
+        try:
+            version = int(request.data.get('version', order.version))
+        except (TypeError, ValueError):
+            return Response({"version": ["قيمة غير صالحة"]}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            applied = order.apply_changes(serializer.validated_data, version=version)
+        except InvalidTransition as e:
+            return Response(
+                {"error": f"انتقال غير مسموح به: {e.old_status} → {e.new_status}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except SlotTaken:
+            return Response(
+                {"error": "هذا الموعد محجوز، يرجى اختيار وقت آخر"},
+                status=status.HTTP_409_CONFLICT
+            )
+        
+        if not applied:
+            current = Order.objects.select_related('client').filter(pk=pk).first()
             return Response({
-                "message": "تم تحديث الطلب بنجاح",
-                "order": serializer.data
-            })
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+                "error": "تم تعديل الطلب من طرف مستخدم آخر، يرجى إعادة التحميل",
+                "order": OrderSerializer(current).data if current else None
+            }, status=status.HTTP_409_CONFLICT)
+        
+        return Response({
+            "message": "تم تحديث الطلب بنجاح",
+            "order": OrderSerializer(order).data
+        })
+
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def admin_orders_batch_status_api(request):
+    """
+    Changer le statut de plusieurs commandes en une transaction.
+    Corps : {"status": ..., "ids": [...]} ou {"status": ..., "filter": {"status", "from", "to"}}
+    """
+    new_status = request.data.get('status')
+    ids = request.data.get('ids')
+    filters = request.data.get('filter')
+    
+    if new_status not in dict(Order.STATUS_CHOICES):
+        return Response({"error": "status invalide"}, status=status.HTTP_400_BAD_REQUEST)
+    if (ids is None) == (filters is None):
+        return Response(
+            {"error": "Préciser soit ids, soit filter"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    max_orders = getattr(settings, 'BATCH_STATUS_MAX_ORDERS', 500)
+    if ids is not None:
+        # Entiers JSON stricts (ni chaîne, ni booléen) tenant sur 64 bits
+        if not isinstance(ids, list) or not all(
+            isinstance(order_id, int) and not isinstance(order_id, bool)
+            and -MAX_DB_ID - 1 <= order_id <= MAX_DB_ID
+            for order_id in ids
+        ):
+            return Response({"error": "ids : liste d'entiers attendue"}, status=status.HTTP_400_BAD_REQUEST)
+        ids = list(dict.fromkeys(ids))
+        if not ids or len(ids) > max_orders:
+            return Response(
+                {"error": f"Entre 1 et {max_orders} commandes par lot"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        queryset = Order.objects.filter(pk__in=ids)
+    else:
+        if not isinstance(filters, dict):
+            return Response({"error": "filter : objet attendu"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            queryset, _ = export_orders_queryset(
+                status=filters.get('status'),
+                date_from=filters.get('from'),
+                date_to=filters.get('to'),
+            )
+        except ExportError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if queryset[max_orders:max_orders + 1].exists():
+            return Response(
+                {"error": f"Plus de {max_orders} commandes correspondent : affiner le filtre"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+    
+    with transaction.atomic():
+        outcomes = Order.transition_many(queryset, new_status)
+    
+    results = [
+        {"id": order_id, "outcome": outcome, "status": new_status if outcome == 'updated' else old_status}
+        for order_id, old_status, outcome in outcomes
+    ]
+    if ids is not None:
+        # Ordre de la demande ; identifiants inconnus signalés
+        by_id = {result['id']: result for result in results}
+        results = [by_id.get(order_id, {"id": order_id, "outcome": "not_found"}) for order_id in ids]
+    
+    succeeded = sum(result['outcome'] in ('updated', 'unchanged') for result in results)
+    if results and not succeeded:
+        response_status = status.HTTP_400_BAD_REQUEST
+    elif succeeded < len(results):
+        response_status = status.HTTP_207_MULTI_STATUS
+    else:
+        response_status = status.HTTP_200_OK
+    
+    return Response({
+        "updated": sum(result['outcome'] == 'updated' for result in results),
+        "failed": len(results) - succeeded,
+        "results": results,
+        "dashboard": DashboardStats.snapshot()
+    }, status=response_status)
+
+
+# Tris de l'annuaire (?sort=) -> clés de pagination ; les tris sur le
+# résumé des commandes suivent les index de ClientSummary
+CLIENT_SORTS = {
+    '-created_at': ('-created_at', '-id'),
+    'created_at': ('created_at', 'id'),
+    '-lifetime_spend': ('-order_summary__lifetime_spend', '-order_summary__user_id'),
+    'lifetime_spend': ('order_summary__lifetime_spend', 'order_summary__user_id'),
+    '-order_count': ('-order_summary__order_count', '-order_summary__user_id'),
+    'order_count': ('order_summary__order_count', 'order_summary__user_id'),
+}
 
 
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
 def admin_clients_list_api(request):
-    """Liste de tous les clients"""
-    clients = CustomUser.objects.filter(is_staff=False)
-    serializer = UserSerializer(clients, many=True)
-    return Response(serializer.data)
+    """
+    Annuaire paginé (curseur) des clients avec le résumé de leurs commandes.
+    ?q= recherche par préfixe, ?sort= un des CLIENT_SORTS (défaut -created_at).
+    """
+    ordering = CLIENT_SORTS.get(request.GET.get('sort', '-created_at'))
+    if ordering is None:
+        return Response(
+            {"error": "Tri invalide", "choices": list(CLIENT_SORTS)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    clients = CustomUser.objects.filter(is_staff=False, order_summary__isnull=False).select_related('order_summary')
+    clients = search_users(clients, request.GET.get('q', ''))
+    
+    try:
+        clients, next_cursor = paginate_keyset(
+            clients,
+            cursor=request.GET.get('cursor'),
+            page_size=get_page_size(request),
+            ordering=ordering,
+        )
+    except InvalidCursor:
+        return Response(
+            {"error": "Curseur invalide"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    serializer = ClientSerializer(clients, many=True)
+    return Response({
+        "results": serializer.data,
+        "next_cursor": next_cursor
+    })
 
 
 
@@ -628,9 +973,6 @@ def admin_clients_list_api(request):
 @permission_classes([AllowAny])
 def register_api(request):
     """API d'inscription"""
-    print("=== REGISTER REQUEST ===")
-    print("Data received:", request.data)
-    
     # Vérifier les champs requis
     required_fields = ['username', 'password', 'first_name', 'last_name', 'phone_number', 'gender', 'age']
     
@@ -653,7 +995,7 @@ def register_api(request):
             
             lang = user.language_preference
             
-            print(f"✅ User created successfully: {user.username}")
+            log_event(request, 'register.success', user_id=user.pk)
             
             return Response({
                 "message": get_message(lang, 'register_success'),
@@ -662,16 +1004,145 @@ def register_api(request):
             }, status=status.HTTP_201_CREATED)
         
         except Exception as e:
-            print(f"❌ Error creating user: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            # Noms des champs seulement : les valeurs sont des données personnelles
+            log_event(request, 'register.error', level=logging.ERROR, exc_info=True,
+                      fields=sorted(request.data))
             
             return Response({
                 "error": f"Error creating user: {str(e)}"
             }, status=status.HTTP_400_BAD_REQUEST)
     
-    print("❌ Validation errors:", serializer.errors)
+    log_event(request, 'register.invalid', fields=sorted(serializer.errors))
     return Response({
         "error": "Validation failed",
         "details": serializer.errors
-    }, status=status.HTTP_400_BAD_REQUEST)    
\ No newline at end of file
+    }, status=status.HTTP_400_BAD_REQUEST)    
+
+
+# ========================================
+# APIs ADMIN - Export (CSV / JSONL en flux)
+# ========================================
+
+def export_response(request, name, build_queryset):
+    """
+    Réponse en flux ; ?output=csv|jsonl, filtres ?from=&to= (AAAA-MM-JJ).
+    (?format= est réservé par DRF à la négociation de contenu.)
+    """
+    export_format = request.GET.get('output', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return Response(
+            {"error": "output doit être csv ou jsonl"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        queryset, columns = build_queryset()
+    except ExportError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    response = StreamingHttpResponse(
+        iter_export(queryset, columns, export_format),
+        content_type=EXPORT_FORMATS[export_format]
+    )
+    filename = f"{name}-{timezone.now():%Y%m%d-%H%M%S}.{export_format}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def admin_export_orders_api(request):
+    """Export de toutes les commandes (filtres : status, from, to)"""
+    return export_response(request, 'orders', lambda: export_orders_queryset(
+        status=request.GET.get('status'),
+        date_from=request.GET.get('from'),
+        date_to=request.GET.get('to'),
+    ))
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def admin_export_clients_api(request):
+    """Export de tous les clients (filtres : from, to sur la date d'inscription)"""
+    return export_response(request, 'clients', lambda: export_clients_queryset(
+        date_from=request.GET.get('from'),
+        date_to=request.GET.get('to'),
+    ))
+
+
+# ========================================
+# APIs ADMIN - Métriques
+# ========================================
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def admin_analytics_timeseries_api(request):
+    """
+    Commandes et chiffre d'affaires par jour (agrégats quotidiens).
+    ?from=&to= (AAAA-MM-JJ, inclus), ?status=, ?henna_type=
+    """
+    status_filter = request.GET.get('status')
+    if status_filter and status_filter not in dict(Order.STATUS_CHOICES):
+        return Response({"error": "Statut invalide"}, status=status.HTTP_400_BAD_REQUEST)
+    henna_type = request.GET.get('henna_type') or None
+    if henna_type is not None:
+        henna_type = int(henna_type) if henna_type.isdecimal() else 0
+        if not 0 < henna_type <= MAX_DB_ID:
+            return Response({"error": "henna_type : entier positif attendu"}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        start, end = parse_day_range(request.GET.get('from'), request.GET.get('to'))
+    except AnalyticsError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    points, totals = time_series(start, end, status=status_filter, henna_type=henna_type)
+    for point in points + [totals]:
+        point['revenue'] = money(point['revenue'])
+    return Response({
+        "from": start,
+        "to": end,
+        "totals": totals,
+        "series": points
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def admin_analytics_top_henna_types_api(request):
+    """
+    Types de henné les plus rentables (?by=revenue) ou les plus commandés
+    (?by=orders) sur la plage ?from=&to= ; ?limit= (10 par défaut, 100 max)
+    """
+    by = request.GET.get('by', 'revenue')
+    if by not in ('revenue', 'orders'):
+        return Response({"error": "by : revenue ou orders"}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 10)), 100))
+    except ValueError:
+        return Response({"error": "limit : entier attendu"}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        start, end = parse_day_range(request.GET.get('from'), request.GET.get('to'))
+    except AnalyticsError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    results = top_henna_types(start, end, limit=limit, by=by)
+    for row in results:
+        row['revenue'] = money(row['revenue'])
+    return Response({
+        "from": start,
+        "to": end,
+        "by": by,
+        "results": results
+    })
+
+
+def money(value):
+    return f'{value:.2f}'
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def admin_metrics_api(request):
+    """Métriques par vue (requêtes SQL, temps SQL / sérialisation / total) au format Prometheus"""
+    return HttpResponse(
+        metrics_registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -38,18 +39,21 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'rest_framework',
+    'rest_framework.authtoken',
     'corsheaders',
     'api',
 
 ]
 
 MIDDLEWARE = [
+    'api.middleware.InstrumentationMiddleware',  # mesures par vue (en premier)
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # ← Important
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.middleware.DatabaseRoutingMiddleware',  # primaire / réplicas
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -93,34 +97,277 @@ LANGUAGES = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.TimedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
+# Lanceur de `manage.py test` : active les budgets stricts et réduit les
+# logs 'api' aux avertissements (api/test_runner.py)
+TEST_RUNNER = 'api.test_runner.HanTestRunner'
+
+# Budgets de requêtes SQL par vue (QUERY_BUDGETS dans api/urls.py) :
+# dépassement = avertissement, ou échec si strict (toujours sous les tests)
+QUERY_BUDGET_STRICT = os.environ.get('HAN_QUERY_BUDGET_STRICT') == '1'
+
+# Journalisation structurée (JSON sur stdout, écrite par un thread dédié
+# via QueueHandler/QueueListener ; champs sensibles masqués)
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'json_queue': {
+            'class': 'api.logs.QueueLogHandler',
+            'max_size': 10000,  # au-delà, les enregistrements sont abandonnés
+        },
+    },
+    'loggers': {
+        'api': {
+            'handlers': ['json_queue'],
+            'level': os.environ.get('HAN_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+# Taux d'échantillonnage des logs INFO par endpoint (nom de route) ;
+# avertissements et erreurs sont toujours gardés
+LOG_SAMPLING = {
+    'default': 1.0,
+    'hello_api': 0.01,
+    'henna_types_list': 0.1,
+    'henna_type_detail': 0.1,
+    'async_henna_types_list': 0.1,
+    'profile_api': 0.1,
+    'availability': 0.1,
+    'admin_metrics': 0.0,
+}
+
+# Cache des tokens d'authentification (par processus)
+# Les révocations (logout, changement de mot de passe, désactivation) ne
+# touchent que le worker courant, sauf si REVOCATION_CACHE_ALIAS désigne
+# un cache partagé par tous les workers (Redis, Memcached). Sans lui, un
+# token révoqué reste accepté ailleurs au plus TTL secondes : garder un
+# TTL court.
+TOKEN_REVOCATION_CACHE_ALIAS = os.environ.get('TOKEN_REVOCATION_CACHE_ALIAS') or None
+TOKEN_AUTH_CACHE = {
+    'MAX_SIZE': 10000,  # nombre de tokens en mémoire (LRU)
+    'TTL': 300 if TOKEN_REVOCATION_CACHE_ALIAS else 30,  # secondes
+    'REVOCATION_CACHE_ALIAS': TOKEN_REVOCATION_CACHE_ALIAS,
 }
 
+# Nombre maximal de commandes par appel à orders/bulk-create/
+BULK_ORDER_MAX_ITEMS = 100
+
+# Conservation des clés Idempotency-Key (heures), purgées par
+# `manage.py prune_idempotency_keys` : au-delà, un rejeu recrée les commandes
+IDEMPOTENCY_KEY_RETENTION_HOURS = 24
+
+# Nombre maximal de commandes par appel à admin/orders/batch-status/
+BATCH_STATUS_MAX_ORDERS = 500
+
+# Rendez-vous : durée d'un créneau, rechargement du calendrier en mémoire
+APPOINTMENT_SLOT_MINUTES = 60
+AVAILABILITY_REFRESH_SECONDS = 300
+AVAILABILITY_MAX_RANGE_DAYS = 31
+
+# Exports admin : lignes lues par paquet (.iterator(chunk_size=...))
+EXPORT_CHUNK_SIZE = 2000
+
+# Synchronisation différentielle de orders/my-orders/?since= : conservation
+# des traces de suppression (jours) ; marge du watermark plus bas
+ORDER_TOMBSTONE_RETENTION_DAYS = 90
+
+# Analyses admin (agrégats quotidiens) : plage par défaut et maximale, en jours
+ANALYTICS_DEFAULT_DAYS = 30
+ANALYTICS_MAX_DAYS = 1096
+
+# Pagination par curseur des listes admin (?page_size=)
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 200
+
 CORS_ALLOW_HEADERS = [
     'accept',
     'accept-encoding',
     'authorization',
     'content-type',
     'dnt',
+    'if-none-match',  # revalidation du catalogue (ETag)
     'origin',
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
 ]
 
+# Flutter Web lit l'ETag du catalogue pour renvoyer If-None-Match
+CORS_EXPOSE_HEADERS = ['ETag']
+
+
 
+# Base de données, choisie par HAN_DB_ENGINE :
+# - 'sqlite' (défaut) : profil SQLite haute concurrence ci-dessous ;
+#   HAN_DB_REPLICA_PATH ajoute un second fichier servant de réplica
+#   (pour essayer le routage en local : copie de db.sqlite3) ;
+# - 'postgres' : primaire HAN_DB_HOST et réplicas HAN_DB_REPLICA_HOSTS
+#   (liste séparée par des virgules), connexions en pool psycopg.
+DB_ENGINE = os.environ.get('HAN_DB_ENGINE', 'sqlite')
 
-DATABASES = {
+
+def postgres_database(host):
+    return {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('HAN_DB_NAME', 'han'),
+        'USER': os.environ.get('HAN_DB_USER', 'han'),
+        'PASSWORD': os.environ.get('HAN_DB_PASSWORD', ''),
+        'HOST': host,
+        'PORT': os.environ.get('HAN_DB_PORT', '5432'),
+        'CONN_MAX_AGE': 0,  # le pool garde les connexions
+        'OPTIONS': {
+            'pool': {
+                'min_size': int(os.environ.get('HAN_DB_POOL_MIN', 2)),
+                'max_size': int(os.environ.get('HAN_DB_POOL_MAX', 10)),
+                'timeout': int(os.environ.get('HAN_DB_POOL_TIMEOUT', 10)),
+            },
+        },
+    }
+
+
+if DB_ENGINE == 'postgres':
+    DATABASES = {'default': postgres_database(os.environ.get('HAN_DB_HOST', 'localhost'))}
+    replica_hosts = [host.strip() for host in os.environ.get('HAN_DB_REPLICA_HOSTS', '').split(',') if host.strip()]
+    for index, host in enumerate(replica_hosts, start=1):
+        DATABASES[f'replica_{index}'] = dict(postgres_database(host), TEST={'MIRROR': 'default'})
+    # Alias utilisés pour les lectures (vidé sous les tests : activé au cas par cas)
+    DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+else:
+    # Profil SQLite haute concurrence :
+    # - connexions persistantes (CONN_MAX_AGE) vérifiées avant réutilisation ;
+    # - transactions en BEGIN IMMEDIATE : un écrivain prend le verrou
+    #   d'écriture dès le début et attend son tour (busy_timeout) au lieu
+    #   d'échouer sur « database is locked » en cours de transaction ;
+    # - PRAGMAs appliqués à chaque connexion par api/db.py.
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'CONN_MAX_AGE': int(os.environ.get('HAN_DB_CONN_MAX_AGE', 600)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
+    }
+    # Alias 'replica' toujours déclaré (connexion ouverte seulement à
+    # l'usage) : les tests de routage en créent une base de test distincte.
+    # Il ne sert aux lectures que si HAN_DB_REPLICA_PATH est défini.
+    replica_path = os.environ.get('HAN_DB_REPLICA_PATH')
+    DATABASES['replica'] = dict(
+        DATABASES['default'],
+        NAME=replica_path or BASE_DIR / 'db_replica.sqlite3',
+    )
+    DATABASE_REPLICAS = ['replica'] if replica_path else []
+
+DATABASE_ROUTERS = ['api.routers.PrimaryReplicaRouter']
+
+# Après une écriture, l'utilisateur relit sur le primaire pendant ce délai
+# (doit couvrir le retard de réplication)
+DB_STICKY_SECONDS = int(os.environ.get('HAN_DB_STICKY_SECONDS', 5))
+# Cache du marqueur de cette fenêtre : partagé par tous les workers
+# (Redis, Memcached) dès qu'il y a des réplicas (vérifié par api/checks.py)
+DB_STICKY_CACHE_ALIAS = os.environ.get('HAN_DB_STICKY_CACHE_ALIAS') or (
+    'shared' if os.environ.get('HAN_REDIS_URL') else 'default'
+)
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',       # lecteurs et écrivain ne se bloquent plus
+    'synchronous': 'NORMAL',     # fsync aux checkpoints seulement (sûr en WAL)
+    'busy_timeout': 20000,       # ms d'attente du verrou d'écriture
+    'cache_size': -64000,        # 64 Mo de cache de pages (négatif = Kio)
+    'mmap_size': 268435456,      # 256 Mo lus par mmap
+    'temp_store': 'MEMORY',
+}
+
+# Marge du watermark de orders/my-orders/?since= (secondes, api/sync.py) :
+# durée maximale d'une transaction d'écriture entre son horodatage et sa
+# validation (en SQLite, busy_timeout : au-delà, les autres écrivains
+# échouent), plus le retard de réplication (DB_STICKY_SECONDS) au cas où
+# la lecture partirait d'un réplica.
+# Trop grande, elle ne coûte que des doublons ; trop petite, des pertes.
+ORDER_SYNC_OVERLAP_SECONDS = int(os.environ.get(
+    'HAN_ORDER_SYNC_OVERLAP_SECONDS',
+    SQLITE_PRAGMAS['busy_timeout'] // 1000 + DB_STICKY_SECONDS,
+))
+
+
+# Cache : LocMemCache par défaut (par processus). En production avec
+# plusieurs workers, configurer un backend partagé (Redis, Memcached)
+# pour que l'invalidation du catalogue soit vue par tous.
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'han-default',
     }
 }
+# Cache partagé optionnel (fenêtre collante des réplicas)
+HAN_REDIS_URL = os.environ.get('HAN_REDIS_URL')
+if HAN_REDIS_URL:
+    CACHES['shared'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': HAN_REDIS_URL,
+    }
+
+# Cache du catalogue de henné (alias dans CACHES, durée en secondes)
+CATALOG_CACHE_ALIAS = 'default'
+CATALOG_CACHE_TIMEOUT = 3600
+
+# Variantes responsives des images du catalogue (api/images.py)
+IMAGE_VARIANT_WIDTHS = [320, 640, 1080]
+IMAGE_VARIANT_WORKERS = 2
+IMAGE_VARIANTS_ASYNC = True
+
+
+# Politique de hachage des mots de passe (api/hashers.py)
+# ALGORITHM : 'pbkdf2', 'argon2' (nécessite argon2-cffi) ou 'scrypt'.
+# Les coûts se calibrent avec `manage.py bench_password_hashers --budget-ms N`.
+PASSWORD_HASHING = {
+    'ALGORITHM': os.environ.get('PASSWORD_HASHER', 'pbkdf2'),
+    'PBKDF2': {
+        # Jamais en dessous du défaut de Django (1 000 000 depuis Django 5.0)
+        'ITERATIONS': int(os.environ.get('PBKDF2_ITERATIONS', 1000000)),
+    },
+    'ARGON2': {
+        'TIME_COST': 2,
+        'MEMORY_COST': 19456,  # KiB
+        'PARALLELISM': 1,
+    },
+    'SCRYPT': {
+        'WORK_FACTOR': 2 ** 14,
+        'BLOCK_SIZE': 8,
+        'PARALLELISM': 1,
+    },
+}
+
+# Le premier hacheur sert aux nouveaux mots de passe ; les autres ne font
+# que vérifier les anciens hachages, réécrits à la connexion suivante.
+_TUNED_HASHERS = {
+    'pbkdf2': 'api.hashers.TunedPBKDF2PasswordHasher',
+    'argon2': 'api.hashers.TunedArgon2PasswordHasher',
+    'scrypt': 'api.hashers.TunedScryptPasswordHasher',
+}
+PASSWORD_HASHERS = [_TUNED_HASHERS[PASSWORD_HASHING['ALGORITHM']]] + [
+    path for name, path in _TUNED_HASHERS.items()
+    if name != PASSWORD_HASHING['ALGORITHM']
+] + [
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
 
 
 # Password validation
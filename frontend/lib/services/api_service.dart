@@ -8,6 +8,15 @@ import '../models/order_model.dart';
 
 class ApiService {
   final String baseUrl = AppConstants.baseUrl;
+
+  // Cache du catalogue (ETag) : évite de retélécharger une liste inchangée
+  String? _hennaTypesEtag;
+  List<HennaTypeModel>? _hennaTypesCache;
+
+  // Cache des commandes (synchronisation différentielle ?since=) : partagé
+  // entre les instances, vidé à la déconnexion
+  static String? _ordersWatermark;
+  static final Map<int, OrderModel> _ordersCache = {};
   
   // Récupérer les cookies de session
   Future<Map<String, String>> _getHeaders() async {
@@ -87,6 +96,8 @@ class ApiService {
 
       if (response.statusCode == 200) {
         await _saveCookies(response);
+        _ordersWatermark = null;
+        _ordersCache.clear();
         return jsonDecode(response.body);
       } else {
         final error = jsonDecode(response.body);
@@ -101,14 +112,21 @@ class ApiService {
   Future<List<HennaTypeModel>> getHennaTypes() async {
     try {
       final headers = await _getHeaders();
+      if (_hennaTypesEtag != null && _hennaTypesCache != null) {
+        headers['If-None-Match'] = _hennaTypesEtag!;
+      }
       final response = await http.get(
         Uri.parse('$baseUrl${AppConstants.hennaTypesEndpoint}'),
         headers: headers,
       );
 
-      if (response.statusCode == 200) {
+      if (response.statusCode == 304 && _hennaTypesCache != null) {
+        return _hennaTypesCache!;
+      } else if (response.statusCode == 200) {
         final List<dynamic> data = jsonDecode(response.body);
-        return data.map((json) => HennaTypeModel.fromJson(json)).toList();
+        _hennaTypesCache = data.map((json) => HennaTypeModel.fromJson(json)).toList();
+        _hennaTypesEtag = response.headers['etag'];
+        return _hennaTypesCache!;
       } else {
         throw Exception('فشل في تحميل أنواع الحناء');
       }
@@ -146,18 +164,31 @@ class ApiService {
     }
   }
 
-  // Get My Orders
+  // Get My Orders (seuls les changements depuis la dernière synchronisation)
   Future<List<OrderModel>> getMyOrders() async {
     try {
       final headers = await _getHeaders();
-      final response = await http.get(
-        Uri.parse('$baseUrl${AppConstants.myOrdersEndpoint}'),
-        headers: headers,
-      );
+      final uri = Uri.parse('$baseUrl${AppConstants.myOrdersEndpoint}')
+          .replace(queryParameters: {'since': _ordersWatermark ?? ''});
+      final response = await http.get(uri, headers: headers);
 
       if (response.statusCode == 200) {
-        final List<dynamic> data = jsonDecode(response.body);
-        return data.map((json) => OrderModel.fromJson(json)).toList();
+        final Map<String, dynamic> data = jsonDecode(response.body);
+        if (data['full'] == true) {
+          _ordersCache.clear();
+        }
+        for (final json in data['orders'] as List<dynamic>) {
+          final order = OrderModel.fromJson(json);
+          _ordersCache[order.id] = order;
+        }
+        for (final id in data['deleted'] as List<dynamic>) {
+          _ordersCache.remove(id);
+        }
+        _ordersWatermark = data['watermark'];
+
+        final orders = _ordersCache.values.toList()
+          ..sort((a, b) => b.createdAt.compareTo(a.createdAt));
+        return orders;
       } else {
         throw Exception('فشل في تحميل الطلبات');
       }
@@ -191,6 +222,8 @@ class ApiService {
       
       final prefs = await SharedPreferences.getInstance();
       await prefs.clear();
+      _ordersWatermark = null;
+      _ordersCache.clear();
     } catch (e) {
       throw Exception('فشل في تسجيل الخروج: $e');
     }